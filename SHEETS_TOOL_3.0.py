@@ -1,20 +1,31 @@
 # Required libraries:
-# pip install google-api-python-client google-auth-httplib2 pandas pygame requests
+# pip install pandas pygame requests
 
 import tkinter as tk
 from tkinter import ttk, font, messagebox
 import configparser
 import logging
+import logging.handlers
 import os
 import time
 import threading
 import queue
-import pandas as pd
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import signal
 import pygame # Import pygame for audio with volume control
-import urllib.request # Added for vMix API calls
-import urllib.error # Added for vMix API error handling
+from sheets_core.engine import SheetsEngine, censor_api_key, LOG_COLOR_RESET, THREAD_TIMEOUT_SECONDS
+from sheets_core.fanout import parse_output_copies, DEFAULT_COPY_TIMEOUT_SECONDS
+from sheets_core.metrics import StageMetrics, MetricsServer, MetricsCsvDumper
+from sheets_core.profiling import LoopProfiler, DEFAULT_PROFILE_DIR, DEFAULT_PROFILE_ITERATIONS
+from sheets_core.projection import parse_columns_setting
+from sheets_core.run_config import RunConfig, DEFAULT_PUSH_DEBOUNCE_SECONDS
+from sheets_core.multicast import DEFAULT_KEYFRAME_SECONDS, DEFAULT_MULTICAST_PORT, DEFAULT_MULTICAST_TTL
+from sheets_core.settle import DEFAULT_SETTLE_POLL_SECONDS
+from sheets_core.shared_snapshot import DEFAULT_SHARED_MEMORY_MB
+from sheets_core.sheet_metadata import DEFAULT_METADATA_REFRESH_SECONDS
+from sheets_core.state import StateStore, DEFAULT_STATE_FILE
+from sheets_core.supervisor import EngineSupervisor, DEFAULT_HANG_SECONDS
+from sheets_core.ui_updates import UiUpdateChannel, EventLoopLagMonitor
+from sheets_core.webhook import WebhookReceiver
 
 # --- Constants ---
 CONFIG_FILE = 'config.ini'
@@ -22,55 +33,130 @@ LOG_FILE = 'log.txt'
 DEFAULT_LOOP_SECONDS = 1.0
 DEFAULT_SOUND_FILE = 'notification.wav'
 DEFAULT_SOUND_VOLUME = 100 # Volume percentage (0-100)
-THREAD_TIMEOUT_SECONDS = 5.0 # Max time for API call thread
-API_CENSOR_STARS = '*' * 20 # Use 20 stars for censoring
+DEFAULT_SOUND_COALESCE_MS = 250 # Sound requests within this window play once
 CONFIG_SAVE_DISPLAY_MS = 2000 # 2 seconds for "CONFIG SAVED" message
 DEFAULT_VMIX_API_HEADER = 'vMixCommand' # Consistent naming
+DEFAULT_LOG_LEVEL = 'INFO'
+DEFAULT_LOG_ROTATION = 'size' # 'size' (rotate at log_max_mb) or 'time' (rotate at midnight)
+DEFAULT_LOG_MAX_MB = 10
+DEFAULT_LOG_BACKUP_COUNT = 5
+DEFAULT_METRICS_CSV_INTERVAL_SECONDS = 60
+DEFAULT_UI_MAX_FPS = 20 # Max rate the GUI applies queued updates from background threads
+DEFAULT_UI_LAG_WARN_MS = 250 # Warn when the GUI event loop is blocked this long
+DEFAULT_PUSH_INTERVAL_SECONDS = 30.0 # Safety polling interval while the webhook receiver is running
+DEFAULT_SOURCE_DEBOUNCE_MS = 20 # Quiet time after a source file change before reading it
+DEFAULT_CONFIG_WATCH_SECONDS = 1.0 # How often config.ini's modification time is checked
+# Settings only read when the tool starts; a reload reports them instead of applying them
+TOOL_RESTART_SETTINGS = ('metrics_port', 'metrics_csv_filename', 'metrics_csv_interval_seconds', 'ui_max_fps',
+                         'ui_lag_warn_ms', 'state_file', 'webhook_port', 'webhook_host', 'webhook_token',
+                         'supervisor_mode', 'supervisor_hang_seconds', 'config_watch_seconds')
 
 # --- Global Variables ---
 config = configparser.ConfigParser()
 is_running = False
-loop_thread = None
-worker_thread = None
-stop_event = threading.Event()
-result_queue = queue.Queue()
-current_api_key_index = 0
-last_data_pulled = None # Stores the previously fetched data (as DataFrame) for comparison
-current_active_worker_instance_id = None # Track the unique ID string of the intended active worker
+engine = None # SheetsEngine running the fetch/write/vMix loop, created in initialize_app
 pygame_mixer_initialized = False # Flag to track mixer initialization
 revert_status_job_id = None # To store the ID of the scheduled status revert task
-force_write_on_next_pull = False # Flag to force writing CSV on the first pull after starting
-last_vmix_api_id = None # Stores the ID of the last executed vMix command
-skip_next_vmix_execution_on_change = False # Flag to skip the *first* vMix execution after start
+sound_queue = queue.Queue() # Play requests for the single audio worker
+sound_worker_thread = None # The audio worker thread
+sound_cache = {} # sound file path -> (mtime, decoded pygame Sound)
+sound_coalesce_seconds = DEFAULT_SOUND_COALESCE_MS / 1000.0
+log_listener = None # QueueListener writing queued log records to file and console
+log_output_settings = None # (rotation, max_mb, backup_count) the listener was built with
+log_tick_summary = False # Log one INFO summary per loop iteration instead of each step
+stage_metrics = StageMetrics() # Rolling per-stage / per-key latency windows
+metrics_server = None # Optional Prometheus-text endpoint (metrics_port > 0)
+metrics_csv_dumper = None # Optional periodic CSV dump (metrics_csv_filename set)
+webhook_receiver = None # Optional change-notification endpoint (webhook_port > 0)
+config_mtime_ns = None # Modification time of config.ini when it was last read or written
+shown_inputs = {} # gui_input_values() as last loaded from or saved to config.ini; a field that differs holds an unsaved edit
+config_watch_job_id = None # ID of the scheduled watch_config_file call
+loop_profiler = LoopProfiler() # Idle until Diagnostics menu / SIGUSR1 asks to profile the next loop iterations
+ui_updates = UiUpdateChannel() # GUI updates posted by background threads, applied by pump_ui_updates
+ui_lag_monitor = None # EventLoopLagMonitor for the pump_ui_updates timer
+ui_pump_job_id = None # ID of the scheduled pump_ui_updates call
 
 # --- Logging Setup ---
+class ConsoleColorFormatter(logging.Formatter):
+    """Formatter that wraps a record in the ANSI colour passed as extra={'color': ...}."""
+    def format(self, record):
+        message = super().format(record)
+        color = getattr(record, 'color', None)
+        return f"{color}{message}{LOG_COLOR_RESET}" if color else message
+
 log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(threadName)s - %(message)s')
+console_formatter = ConsoleColorFormatter('%(asctime)s - %(levelname)s - %(threadName)s - %(message)s')
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# File Handler
-file_handler = logging.FileHandler(LOG_FILE)
-file_handler.setFormatter(log_formatter)
-logger.addHandler(file_handler)
+# Every thread only enqueues records; the listener thread does the file and console I/O
+log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
-# Console Handler
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(log_formatter)
-logger.addHandler(console_handler)
+def configure_log_output(rotation=DEFAULT_LOG_ROTATION, max_mb=DEFAULT_LOG_MAX_MB, backup_count=DEFAULT_LOG_BACKUP_COUNT):
+    """(Re)starts the QueueListener with a rotating file handler and a colour console handler."""
+    global log_listener, log_output_settings
+    settings = (rotation, max_mb, backup_count)
+    if log_listener and settings == log_output_settings:
+        return
+    stop_log_output()
 
-# --- Configuration ---
-# load_config, save_config, revert_status_label, censor_api_key remain unchanged
-def censor_api_key(api_key):
-    """Censors all but the last 4 characters of an API key with many stars."""
-    if isinstance(api_key, str) and len(api_key) > 4:
-        return f"{API_CENSOR_STARS}{api_key[-4:]}"
-    elif isinstance(api_key, str) and len(api_key) > 0:
-         return API_CENSOR_STARS # Censor short keys completely
-    return "EMPTY"
+    if rotation == 'time':
+        file_handler = logging.handlers.TimedRotatingFileHandler(LOG_FILE, when='midnight', backupCount=backup_count, encoding='utf-8')
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=int(max_mb * 1024 * 1024), backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(log_formatter)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(console_formatter)
+
+    log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    log_listener.start()
+    log_output_settings = settings
+
+def stop_log_output():
+    """Flushes queued log records and closes the log handlers."""
+    global log_listener
+    if log_listener:
+        log_listener.stop() # Processes everything already queued before returning
+        for handler in log_listener.handlers:
+            handler.close()
+        log_listener = None
+
+def apply_logging_config():
+    """Applies the log_* settings from the loaded config to the logger and listener."""
+    global log_tick_summary
+    level_name = config.get('Settings', 'log_level', fallback=DEFAULT_LOG_LEVEL).strip().upper()
+    level = logging.getLevelName(level_name)
+    if not isinstance(level, int):
+        logger.warning("Invalid log_level '%s' in config. Using %s.", level_name, DEFAULT_LOG_LEVEL)
+        level = logging.getLevelName(DEFAULT_LOG_LEVEL)
+    logger.setLevel(level)
+
+    rotation = config.get('Settings', 'log_rotation', fallback=DEFAULT_LOG_ROTATION).strip().lower()
+    if rotation not in ('size', 'time'):
+        logger.warning("Invalid log_rotation '%s' in config. Using '%s'.", rotation, DEFAULT_LOG_ROTATION)
+        rotation = DEFAULT_LOG_ROTATION
+    try:
+        max_mb = config.getfloat('Settings', 'log_max_mb', fallback=DEFAULT_LOG_MAX_MB)
+        backup_count = config.getint('Settings', 'log_backup_count', fallback=DEFAULT_LOG_BACKUP_COUNT)
+    except ValueError:
+        logger.error("Invalid log_max_mb or log_backup_count in config. Using defaults.")
+        max_mb, backup_count = DEFAULT_LOG_MAX_MB, DEFAULT_LOG_BACKUP_COUNT
+    configure_log_output(rotation, max_mb, backup_count)
 
+    try:
+        log_tick_summary = config.getboolean('Settings', 'log_tick_summary', fallback=False)
+    except ValueError:
+        log_tick_summary = False
+
+configure_log_output()
+
+# --- Configuration ---
+# load_config, save_config, revert_status_label remain unchanged
 def load_config():
     """Loads configuration from config.ini or creates it with defaults."""
-    global config
+    global config, sound_coalesce_seconds
     defaults = {
         'Settings': {
             'spreadsheet_id': '',
@@ -86,65 +172,124 @@ def load_config():
             'play_sound_on_change': 'False',
             'sound_filename': DEFAULT_SOUND_FILE,
             'sound_volume': str(DEFAULT_SOUND_VOLUME),
+            'sound_coalesce_ms': str(DEFAULT_SOUND_COALESCE_MS),
             'vmix_api_enabled': 'False',
             'vmix_api_header': DEFAULT_VMIX_API_HEADER,
+            'log_level': DEFAULT_LOG_LEVEL,
+            'log_rotation': DEFAULT_LOG_ROTATION,
+            'log_max_mb': str(DEFAULT_LOG_MAX_MB),
+            'log_backup_count': str(DEFAULT_LOG_BACKUP_COUNT),
+            'log_tick_summary': 'False',
+            'sheets_api_base_url': '', # Empty = sheets.googleapis.com; set to point at benchmarks/mock_sheets_server.py
+            'metrics_port': '0',
+            'metrics_csv_filename': '',
+            'metrics_csv_interval_seconds': str(DEFAULT_METRICS_CSV_INTERVAL_SECONDS),
+            'profile_iterations': str(DEFAULT_PROFILE_ITERATIONS),
+            'profile_directory': DEFAULT_PROFILE_DIR,
+            'ui_max_fps': str(DEFAULT_UI_MAX_FPS),
+            'ui_lag_warn_ms': str(DEFAULT_UI_LAG_WARN_MS),
+            'state_file': DEFAULT_STATE_FILE, # Empty = always start cold (forced write, first vMix change skipped)
+            'stream_values': 'False', # Parse the API response row by row (lower peak memory on very large tabs)
+            'chunk_rows': '0', # Above 0, tabs with more rows are fetched as parallel row bands across the API keys
+            'metadata_refresh_seconds': str(DEFAULT_METADATA_REFRESH_SECONDS), # How long sheet IDs/titles/grid sizes are cached
+            'webhook_port': '0', # Above 0, POST http://<webhook_host>:<port>/notify makes the loop fetch at once
+            'webhook_host': '127.0.0.1',
+            'webhook_token': '', # Shared secret the notification must carry (token= or X-Webhook-Token); empty = none
+            'push_interval_seconds': str(DEFAULT_PUSH_INTERVAL_SECONDS), # Polling interval while the webhook is running
+            'push_debounce_ms': str(int(DEFAULT_PUSH_DEBOUNCE_SECONDS * 1000)), # Quiet time after a notification before fetching
+            'columns': '', # Comma-separated header names / column ranges (e.g. Team, Score, F:H) to fetch and write; empty = all
+            'output_copies': '', # Further copies of the output CSV (e.g. \\vmix2\share\scores.csv), separated by ';'
+            'output_copy_timeout_seconds': str(DEFAULT_COPY_TIMEOUT_SECONDS), # A copy write taking longer is reported as stuck
+            'shared_memory_name': '', # Also publish each written table in this shared memory segment for local programs
+            'shared_memory_mb': str(DEFAULT_SHARED_MEMORY_MB), # Largest table (as JSON) that segment holds
+            'multicast_group': '', # Also send each written table to this multicast group (e.g. 239.255.42.99) for LAN receivers
+            'multicast_port': str(DEFAULT_MULTICAST_PORT),
+            'multicast_ttl': str(DEFAULT_MULTICAST_TTL), # Router hops the tables may cross; 1 = this network only
+            'multicast_interface': '', # IP address of the network card to send from; empty = system default
+            'multicast_keyframe_seconds': str(DEFAULT_KEYFRAME_SECONDS), # Longest time between two full tables, for late joiners
+            'settle_ms': '0', # Write a change only once the sheet has stayed the same this long (no half-typed names); 0 = off
+            'settle_poll_ms': str(int(DEFAULT_SETTLE_POLL_SECONDS * 1000)), # Polling interval while a change settles
+            'settle_bypass_columns': '', # Comma-separated names (sheet row 1, or the vmix_api_header cell) of columns whose changes are written at once
+            'record_file': '', # Append each written table to this recording for later replay; empty = off
+            'source_file': '', # Read this local .csv, .xlsx or .json file instead of the sheet, as soon as it changes; empty = off
+            'source_debounce_ms': str(DEFAULT_SOURCE_DEBOUNCE_MS), # Quiet time after the source file changes before reading it
+            'replay_file': '', # Rehearse from this recording instead of the sheet; empty = off
+            'replay_speed': '1.0', # 1 = as recorded, 2 = twice as fast, 0 = every frame as fast as possible
+            'replay_start_seconds': '0', # Start the replay this far into the recording
+            'supervisor_mode': 'False', # Run the polling job in a child process that is restarted if it crashes or hangs
+            'supervisor_hang_seconds': str(DEFAULT_HANG_SECONDS), # A job iteration (or silence) longer than this restarts it
+            'config_watch_seconds': str(DEFAULT_CONFIG_WATCH_SECONDS), # Apply edits to this file while running; 0 = off
         }
     }
     if not os.path.exists(CONFIG_FILE):
-        logger.info(f"Configuration file '{CONFIG_FILE}' not found. Creating with default values.")
+        logger.info("Configuration file '%s' not found. Creating with default values.", CONFIG_FILE)
         config.read_dict(defaults)
         try:
             with open(CONFIG_FILE, 'w') as configfile:
                 config.write(configfile)
-            logger.info(f"Successfully created '{CONFIG_FILE}'. Please edit it with your details.")
+            logger.info("Successfully created '%s'. Please edit it with your details.", CONFIG_FILE)
         except IOError as e:
-            logger.error(f"Failed to create configuration file '{CONFIG_FILE}': {e}")
+            logger.error("Failed to create configuration file '%s': %s", CONFIG_FILE, e)
             messagebox.showerror("Config Error", f"Could not create config file: {e}")
             config = configparser.ConfigParser()
             config.read_dict(defaults)
 
     else:
-        logger.info(f"Loading configuration from '{CONFIG_FILE}'.")
+        logger.info("Loading configuration from '%s'.", CONFIG_FILE)
         try:
             config = configparser.ConfigParser(interpolation=None) # Disable interpolation for safety
             config.read_dict(defaults) # Apply defaults
             config.read(CONFIG_FILE) # Override with file contents
 
             logger.info("Loaded Configuration:")
-            logger.info(f"  Spreadsheet ID: {config.get('Settings', 'spreadsheet_id')}")
-            logger.info(f"  Worksheet Name: {config.get('Settings', 'worksheet_name')}")
+            logger.info("  Spreadsheet ID: %s", config.get('Settings', 'spreadsheet_id'))
+            logger.info("  Worksheet Name: %s", config.get('Settings', 'worksheet_name'))
             for i in range(1, 6):
                 key_name = f'api_key_{i}'
                 key_value = config.get('Settings', key_name)
-                logger.info(f"  API Key {i}: {censor_api_key(key_value)}")
-            logger.info(f"  Loop Seconds: {config.getfloat('Settings', 'loop_seconds')}")
-            logger.info(f"  Output CSV Filename: {config.get('Settings', 'output_csv_filename')}")
-            logger.info(f"  Transpose Data: {config.getboolean('Settings', 'transpose_data')}")
-            logger.info(f"  Play Sound on Change: {config.getboolean('Settings', 'play_sound_on_change')}")
-            logger.info(f"  Sound Filename: {config.get('Settings', 'sound_filename')}")
+                logger.info("  API Key %s: %s", i, censor_api_key(key_value))
+            logger.info("  Loop Seconds: %s", config.getfloat('Settings', 'loop_seconds'))
+            logger.info("  Output CSV Filename: %s", config.get('Settings', 'output_csv_filename'))
+            logger.info("  Transpose Data: %s", config.getboolean('Settings', 'transpose_data'))
+            logger.info("  Play Sound on Change: %s", config.getboolean('Settings', 'play_sound_on_change'))
+            logger.info("  Sound Filename: %s", config.get('Settings', 'sound_filename'))
             try:
                 vol = config.getint('Settings', 'sound_volume')
                 if not (0 <= vol <= 100):
-                    logger.warning(f"Config sound_volume '{vol}' out of range (0-100). Correcting to {DEFAULT_SOUND_VOLUME}.")
+                    logger.warning("Config sound_volume '%s' out of range (0-100). Correcting to %s.", vol, DEFAULT_SOUND_VOLUME)
                     vol = DEFAULT_SOUND_VOLUME
                     config.set('Settings', 'sound_volume', str(vol)) # Correct in config object for consistency
-                logger.info(f"  Sound Volume: {vol}%")
+                logger.info("  Sound Volume: %s%%", vol)
             except ValueError:
-                logger.error(f"Invalid sound_volume in config. Using default {DEFAULT_SOUND_VOLUME}.")
+                logger.error("Invalid sound_volume in config. Using default %s.", DEFAULT_SOUND_VOLUME)
                 config.set('Settings', 'sound_volume', str(DEFAULT_SOUND_VOLUME))
-                logger.info(f"  Sound Volume: {DEFAULT_SOUND_VOLUME}%")
-
-            logger.info(f"  vMix API Enabled: {config.getboolean('Settings', 'vmix_api_enabled')}")
-            logger.info(f"  vMix API Header: {config.get('Settings', 'vmix_api_header')}")
+                logger.info("  Sound Volume: %s%%", DEFAULT_SOUND_VOLUME)
+            try:
+                coalesce_ms = config.getint('Settings', 'sound_coalesce_ms')
+                if coalesce_ms < 0:
+                    logger.warning("Config sound_coalesce_ms '%s' is negative. Correcting to %s.", coalesce_ms, DEFAULT_SOUND_COALESCE_MS)
+                    coalesce_ms = DEFAULT_SOUND_COALESCE_MS
+            except ValueError:
+                logger.error("Invalid sound_coalesce_ms in config. Using default %s.", DEFAULT_SOUND_COALESCE_MS)
+                coalesce_ms = DEFAULT_SOUND_COALESCE_MS
+            sound_coalesce_seconds = coalesce_ms / 1000.0
+            logger.info("  Sound Coalesce Window: %s ms", coalesce_ms)
+
+            logger.info("  vMix API Enabled: %s", config.getboolean('Settings', 'vmix_api_enabled'))
+            logger.info("  vMix API Header: %s", config.get('Settings', 'vmix_api_header'))
+            if config.get('Settings', 'sheets_api_base_url').strip():
+                logger.warning("  Sheets API Base URL override: %s", config.get('Settings', 'sheets_api_base_url'))
+            apply_logging_config()
+            logger.info("  Log Level: %s (rotation: %s, tick summary: %s)", logging.getLevelName(logger.level), log_output_settings[0], log_tick_summary)
 
         except (configparser.Error, ValueError, KeyError) as e:
-            logger.error(f"Error reading configuration file '{CONFIG_FILE}': {e}. Some values might revert to defaults.")
+            logger.error("Error reading configuration file '%s': %s. Some values might revert to defaults.", CONFIG_FILE, e)
             messagebox.showerror("Config Error", f"Error reading config file: {e}\nSome values might use defaults.")
 
 def save_config():
     """Saves current GUI settings to config.ini and shows temporary status."""
-    global config, revert_status_job_id
-    logger.info(f"Attempting to save configuration to '{CONFIG_FILE}'.")
+    global config, config_mtime_ns, shown_inputs
+    logger.info("Attempting to save configuration to '%s'.", CONFIG_FILE)
     previous_status_text = status_label.cget('text')
     previous_status_color = status_label.cget('fg')
 
@@ -152,151 +297,53 @@ def save_config():
         if not config.has_section('Settings'):
             config.add_section('Settings')
 
-        config.set('Settings', 'spreadsheet_id', entry_spreadsheet_id.get())
-        config.set('Settings', 'worksheet_name', entry_worksheet_name.get())
-        for i, entry in enumerate(api_key_entries, 1):
-            config.set('Settings', f'api_key_{i}', entry.get())
-        config.set('Settings', 'loop_seconds', entry_loop_seconds.get())
-        config.set('Settings', 'output_csv_filename', entry_csv_filename.get())
-        config.set('Settings', 'transpose_data', str(transpose_var.get()))
-        config.set('Settings', 'play_sound_on_change', str(sound_var.get()))
+        inputs = gui_input_values()
+        for option, value in inputs.items():
+            config.set('Settings', option, value)
         try:
             current_sound_file = config.get('Settings', 'sound_filename')
             config.set('Settings', 'sound_filename', current_sound_file)
         except (configparser.NoSectionError, configparser.NoOptionError):
              config.set('Settings', 'sound_filename', DEFAULT_SOUND_FILE) # Fallback if missing
 
-        config.set('Settings', 'sound_volume', str(int(volume_var.get())))
-        config.set('Settings', 'vmix_api_enabled', str(vmix_api_enabled_var.get()))
-        config.set('Settings', 'vmix_api_header', entry_vmix_header.get())
-
-
         with open(CONFIG_FILE, 'w') as configfile:
             config.write(configfile)
-        logger.info(f"Successfully saved configuration to '{CONFIG_FILE}'.")
+        config_mtime_ns = config_file_mtime() # Our own write is not a change to reload
+        shown_inputs = inputs
+        logger.info("Successfully saved configuration to '%s'.", CONFIG_FILE)
 
-        set_status("CONFIG SAVED", "orange")
-        if revert_status_job_id:
-            try:
-                root.after_cancel(revert_status_job_id)
-            except ValueError: pass # Ignore if ID is invalid
-        revert_status_job_id = root.after(CONFIG_SAVE_DISPLAY_MS,
-                                          revert_status_label,
-                                          previous_status_text,
-                                          previous_status_color)
+        show_temporary_status("CONFIG SAVED", "orange")
 
     except (IOError, configparser.Error, ValueError, tk.TclError) as e:
-        logger.error(f"Failed to save configuration file '{CONFIG_FILE}': {e}")
+        logger.error("Failed to save configuration file '%s': %s", CONFIG_FILE, e)
         messagebox.showerror("Config Error", f"Could not save config file: {e}")
         if root and status_label: # Check if label still exists
              try:
                  set_status(previous_status_text, previous_status_color) # Revert status immediately on failure
              except tk.TclError: pass # Ignore if GUI is gone
 
+def show_temporary_status(text, color):
+    """Shows text in the status label for CONFIG_SAVE_DISPLAY_MS, then restores the current status."""
+    global revert_status_job_id
+    previous_status_text = status_label.cget('text')
+    previous_status_color = status_label.cget('fg')
+    set_status(text, color) # Also cancels a revert that is still pending
+    revert_status_job_id = root.after(CONFIG_SAVE_DISPLAY_MS,
+                                      revert_status_label,
+                                      previous_status_text,
+                                      previous_status_color)
+
 def revert_status_label(original_text, original_color):
     """Reverts the status label to its previous state."""
     global revert_status_job_id
-    logger.debug(f"Reverting status label to: {original_text} ({original_color})")
+    logger.debug("Reverting status label to: %s (%s)", original_text, original_color)
     if is_running:
-        set_status("RUNNING", "red")
+        set_status(*(engine.status or ("RUNNING", "red"))) # Restore whatever the loop last reported
     else:
         set_status_based_on_inputs() # Re-evaluate READY/NOT READY
     revert_status_job_id = None
 
-# --- Google Sheets Interaction ---
-# fetch_data_worker, get_next_api_key remain unchanged
-def fetch_data_worker(api_key, spreadsheet_id, worksheet_name, result_queue, worker_instance_id):
-    """Fetches data from Google Sheets using a specific API key. Runs in a thread."""
-    global current_active_worker_instance_id
-    logger.info(f"{worker_instance_id}: Attempting to fetch data using API Key: {censor_api_key(api_key)}")
-    try:
-        service = build('sheets', 'v4', developerKey=api_key, cache_discovery=False)
-        sheet = service.spreadsheets()
-        range_name = f"'{worksheet_name}'"
-        result = sheet.values().get(spreadsheetId=spreadsheet_id, range=range_name).execute()
-        values = result.get('values', [])
-
-        if worker_instance_id == current_active_worker_instance_id:
-            result_queue.put({'data': values, 'api_key': api_key, 'worksheet': worksheet_name, 'success': True, 'worker_id': worker_instance_id})
-            logger.info(f"{worker_instance_id}: Successfully fetched data using API key {censor_api_key(api_key)} and queueing result.")
-        else:
-            logger.warning(f"{worker_instance_id}: Data fetched, but the globally active worker is now '{current_active_worker_instance_id}'. Discarding result.")
-
-    except HttpError as err:
-        logger.error(f"{worker_instance_id}: Google API HTTP Error for key {censor_api_key(api_key)}: {err.resp.status} {err.resp.reason} - {err.content}")
-        if worker_instance_id == current_active_worker_instance_id:
-            result_queue.put({'error': err, 'api_key': api_key, 'success': False, 'worker_id': worker_instance_id})
-        else:
-             logger.warning(f"{worker_instance_id}: HTTP Error occurred, but the globally active worker is now '{current_active_worker_instance_id}'. Discarding error.")
-
-    except Exception as e:
-        logger.error(f"{worker_instance_id}: Unexpected error fetching data with key {censor_api_key(api_key)}: {e}", exc_info=True)
-        if worker_instance_id == current_active_worker_instance_id:
-             result_queue.put({'error': e, 'api_key': api_key, 'success': False, 'worker_id': worker_instance_id})
-        else:
-            logger.warning(f"{worker_instance_id}: Exception occurred, but the globally active worker is now '{current_active_worker_instance_id}'. Discarding error.")
-
-def get_next_api_key():
-    """Cycles through the available API keys."""
-    global current_api_key_index
-    api_keys = [entry.get() for entry in api_key_entries if entry.get()]
-    if not api_keys:
-        logger.error("No valid API keys provided.")
-        return None
-    key_to_use = api_keys[current_api_key_index % len(api_keys)]
-    current_api_key_index = (current_api_key_index + 1) % len(api_keys)
-    return key_to_use
-
-
-# --- vMix API Call ---
-# execute_vmix_api, update_vmix_status_label remain unchanged
-def execute_vmix_api(api_url):
-    """
-    Executes a vMix Web API call. Runs Synchronously.
-
-    Args:
-        api_url (str): The full URL for the vMix API call.
-
-    Returns:
-        tuple: (status_code, response_text)
-               status_code is the HTTP status code (e.g., 200, 500) or None on connection errors.
-               response_text is the content returned by vMix or an error message.
-    """
-    if not api_url or not isinstance(api_url, str) or not api_url.startswith(('http://', 'https://')):
-        logger.error(f"[vMix API] Invalid vMix API URL provided: {api_url}")
-        return None, "Invalid API URL format"
-
-    logger.info(f"[vMix API] Executing: {api_url}")
-    try:
-        with urllib.request.urlopen(api_url, timeout=5) as response: # 5 second timeout
-            status_code = response.getcode()
-            response_text = response.read().decode('utf-8', errors='ignore') # Read response body
-            logger.info(f"[vMix API] Response status: {status_code}")
-            if response_text:
-                if status_code != 200 or len(response_text) < 200: # Avoid logging huge success responses
-                    logger.info(f"[vMix API] Response content:\n---\n{response_text}\n---")
-                else:
-                     logger.info("[vMix API] Response content received (likely XML, length > 200).")
-            return status_code, response_text
-    except urllib.error.HTTPError as e:
-        logger.error(f"[vMix API] HTTP Error: {e.code} {e.reason}")
-        error_body = ""
-        try: # Try to read error body if available
-            error_body = e.read().decode('utf-8', errors='ignore')
-            logger.error(f"[vMix API] Error response body:\n---\n{error_body}\n---")
-        except Exception: pass
-        response_text = f"HTTP Error {e.code} {e.reason}" + (f"\n{error_body}" if error_body else "")
-        return e.code, response_text
-    except urllib.error.URLError as e:
-        logger.error(f"[vMix API] URL Error (e.g., connection refused, DNS): {e.reason}")
-        return None, f"URL Error: {e.reason}"
-    except TimeoutError:
-        logger.error("[vMix API] Request timed out.")
-        return None, "Request Timed Out"
-    except Exception as e:
-        logger.error(f"[vMix API] Unexpected error during vMix API call: {e}", exc_info=True)
-        return None, f"Request Failed: {e}"
-
+# --- vMix Status ---
 def update_vmix_status_label(status_code, message=""):
     """Updates the vMix status label in the GUI. MUST be called from the main GUI thread or scheduled."""
     if not root or not vmix_status_label: return # Check if GUI elements exist
@@ -328,433 +375,12 @@ def update_vmix_status_label(status_code, message=""):
              vmix_status_label.config(text=text, fg=color)
 
     except tk.TclError as e:
-        logger.warning(f"Failed to update vMix status label (TclError): {e}")
+        logger.warning("Failed to update vMix status label (TclError): %s", e)
     except Exception as e:
-         logger.error(f"Unexpected error updating vMix status label: {e}", exc_info=True)
-
-
-# --- vMix Processing Function (runs in thread) ---
-def process_vmix_api_call(csv_filename, header_name):
-    """
-    Reads the specified CSV file, checks for the vMix command based on the
-    header name in the first row, compares the API ID from the second row,
-    and executes the API call if needed. Designed to run in a separate thread.
-    Skips execution but updates ID on the first change detected after start.
-    """
-    global last_vmix_api_id, skip_next_vmix_execution_on_change # <<< ADDED GLOBALS HERE
-    logger.info(f"[vMix Thread] Processing CSV '{csv_filename}' for header '{header_name}'.")
-
-    # --- Validate Inputs ---
-    if not header_name or not isinstance(header_name, str):
-        logger.error(f"[vMix Thread] Invalid vMix header name provided: '{header_name}'. Aborting.")
-        root.after(0, update_vmix_status_label, None, "Invalid Header Name")
-        return
-    if not csv_filename or not isinstance(csv_filename, str):
-        logger.error(f"[vMix Thread] Invalid CSV filename provided: '{csv_filename}'. Aborting.")
-        root.after(0, update_vmix_status_label, None, "Invalid CSV Filename")
-        return
-
-    # --- Read CSV File ---
-    try:
-        # Read without header, treat all as strings initially to preserve IDs
-        df_from_csv = pd.read_csv(csv_filename, header=None, dtype=str, keep_default_na=False)
-
-        if df_from_csv.empty:
-            logger.warning(f"[vMix Thread] CSV file '{csv_filename}' is empty. Cannot process.")
-            return
-
-        if df_from_csv.shape[0] < 2:
-             logger.warning(f"[vMix Thread] CSV file '{csv_filename}' has less than 2 rows. Cannot find header and value.")
-             root.after(0, update_vmix_status_label, None, "CSV too short (<2 rows)")
-             return
-
-        # --- Find Header Column and Get Value ---
-        first_row = df_from_csv.iloc[0]
-        target_col_index = -1
-
-        # Find the first column index where the value in the first row matches the header_name
-        for idx, value in enumerate(first_row):
-            # Case-sensitive match after stripping whitespace
-            if isinstance(value, str) and value.strip() == header_name.strip():
-                target_col_index = idx
-                break # Use the first match
-
-        if target_col_index == -1:
-            logger.warning(f"[vMix Thread] Header '{header_name}' not found in the first row of '{csv_filename}'.")
-            root.after(0, update_vmix_status_label, None, f"Header '{header_name}' not found")
-            return
-
-        # Get the value from the second row (index 1) at the found column index
-        cell_value = df_from_csv.iloc[1, target_col_index]
-        found_location = f"row 2, column {target_col_index+1} (header '{header_name}' found in row 1)"
-        logger.debug(f"[vMix Thread] Found value '{cell_value}' at {found_location}")
-
-        # --- Process Value ---
-        if cell_value and isinstance(cell_value, str) and cell_value.strip():
-            if ',' in cell_value:
-                # Split on every comma and trim whitespace from each part
-                parts = [p.strip() for p in cell_value.split(',')]
-                current_api_id = parts[0]
-                commands = parts[1:]
-                
-                # Validate API ID and ensure at least one command is provided
-                if not current_api_id:
-                    logger.warning("\033[91m%s\033[0m", f"[vMix Thread] Extracted API ID is empty from cell value '{cell_value}'. Skipping.")
-                    return
-                if len(commands) == 0:
-                    logger.warning("\033[91m%s\033[0m", "[vMix Thread] No API command provided after the ID. Skipping.")
-                    root.after(0, update_vmix_status_label, None, "No API command provided")
-                    return
-                if len(commands) > 10:
-                    logger.warning("\033[91m%s\033[0m", "[vMix Thread] More than 10 API commands provided. Only executing the first 10.")
-                    commands = commands[:10]
-                
-                # --- Compare ID and Execute ---
-                if current_api_id != last_vmix_api_id:
-                    execute_api = True
-
-                    # --- Skip execution on the first change after start ---
-                    if skip_next_vmix_execution_on_change:
-                        logger.info(f"[vMix Thread] First change detected after start (ID: '{current_api_id}'). Skipping execution, but updating ID tracker.")
-                        execute_api = False
-                        skip_next_vmix_execution_on_change = False  # Consume the flag
-                    logger.info(f"[vMix Thread] Updating last known vMix API ID from '{last_vmix_api_id}' to '{current_api_id}'.")
-                    last_vmix_api_id = current_api_id
-
-                    # Execute the API commands if allowed
-                    if execute_api:
-                        logger.info("\033[38;5;208m%s\033[0m", f"[vMix Thread] New API ID detected and execution allowed. Executing commands for ID '{current_api_id}'.")
-                        responses = []
-                        last_status_code = None
-                        for cmd in commands:
-                            if cmd:  # Ensure command is not empty
-                                status_code, response_msg = execute_vmix_api(cmd)
-                                responses.append(response_msg)
-                                last_status_code = status_code  # Use the last status code (could be adjusted as needed)
-                        combined_response = "|".join(responses)
-                        root.after(0, update_vmix_status_label, last_status_code, combined_response)
-                else:
-                    logger.info(f"[vMix Thread] API ID ('{current_api_id}') hasn't changed since last known ID. Skipping.")
-            else:
-                logger.warning("\033[91m%s\033[0m", f"[vMix Thread] Value in cell ('{cell_value}') is not in the expected '<id>,<command>' format.")
-                root.after(0, update_vmix_status_label, None, "Invalid cell format")
-
-
-    except FileNotFoundError:
-        logger.error(f"[vMix Thread] CSV file not found: '{csv_filename}'")
-        root.after(0, update_vmix_status_label, None, "CSV file not found")
-    except pd.errors.EmptyDataError:
-        logger.warning(f"[vMix Thread] CSV file '{csv_filename}' is empty (Pandas EmptyDataError). Cannot process.")
-        root.after(0, update_vmix_status_label, None, "CSV is empty")
-    except PermissionError:
-         logger.error(f"[vMix Thread] Permission denied reading CSV file: '{csv_filename}'")
-         root.after(0, update_vmix_status_label, None, "CSV permission denied")
-    except IndexError as e:
-         logger.error(f"[vMix Thread] IndexError accessing CSV data in '{csv_filename}' (likely accessing row/col that doesn't exist): {e}", exc_info=True)
-         root.after(0, update_vmix_status_label, None, "CSV data access error")
-    except Exception as e:
-         logger.error(f"[vMix Thread] Unexpected error processing CSV '{csv_filename}' for vMix: {e}", exc_info=True)
-         root.after(0, update_vmix_status_label, None, f"CSV Processing Error: {e}")
-
-
-# --- Main Loop Logic ---
-def run_loop():
-    """The main loop that triggers data fetching periodically."""
-    global is_running, last_data_pulled, worker_thread, current_active_worker_instance_id, force_write_on_next_pull, last_vmix_api_id
-    logger.info("Starting data fetch loop.")
-
-    GREEN = '\033[92m'
-    RESET = '\033[0m'
-
-    while is_running:
-        loop_start_time = time.monotonic()
-        current_status_text = status_label.cget('text')
-        if current_status_text != "RUNNING" and "ERROR" not in current_status_text and "CONFIG SAVED" not in current_status_text:
-             set_status("RUNNING", "red")
-
-        # Get Parameters
-        spreadsheet_id = entry_spreadsheet_id.get()
-        worksheet_name = entry_worksheet_name.get()
-        csv_filename = entry_csv_filename.get() # Crucial for the vMix thread now
-        should_transpose = transpose_var.get()
-        should_play_sound = sound_var.get()
-        try:
-            sound_file = config.get('Settings', 'sound_filename')
-        except (configparser.NoOptionError, configparser.NoSectionError):
-             sound_file = DEFAULT_SOUND_FILE
-        current_vmix_api_enabled = vmix_api_enabled_var.get()
-        current_vmix_api_header = entry_vmix_header.get() # Crucial for the vMix thread
-
-        try:
-            current_volume_percent = int(volume_var.get())
-        except (ValueError, tk.TclError):
-             current_volume_percent = DEFAULT_SOUND_VOLUME
-             logger.warning("Could not read volume slider value, using default.")
-        try:
-            loop_interval = float(entry_loop_seconds.get())
-            if loop_interval <= 0: loop_interval = DEFAULT_LOOP_SECONDS
-        except ValueError:
-            loop_interval = DEFAULT_LOOP_SECONDS
-            logger.warning("Invalid loop interval format. Using default.")
-
-        # --- Google API Fetch Start ---
-        api_key = get_next_api_key()
-        if not api_key:
-            set_status("ERROR: No API Keys", "red")
-            time.sleep(1) # Prevent tight loop with no keys
-            continue
-
-        while not result_queue.empty():
-            try: old_result = result_queue.get_nowait()
-            except queue.Empty: break
-            logger.debug(f"Loop: Discarding stale result from queue: {old_result.get('worker_id', 'Unknown')}")
-
-        worker_instance_id = f"Worker-{int(loop_start_time * 1000)}"
-        current_active_worker_instance_id = worker_instance_id # Mark this worker as the one we expect results from
-        logger.info(f"Loop: Intending to start {worker_instance_id} (setting as active).")
-        worker_thread = threading.Thread(
-            target=fetch_data_worker,
-            args=(api_key, spreadsheet_id, worksheet_name, result_queue, worker_instance_id),
-            daemon=True, name=worker_instance_id)
-        worker_thread.start()
-        logger.info(f"Loop: Thread for {worker_instance_id} started with key {censor_api_key(api_key)}.")
-        # --- Google API Fetch End ---
-
-        # --- Wait for Result ---
-        result = None
-        try:
-            logger.debug(f"Loop: Waiting for result from active worker '{current_active_worker_instance_id}'...")
-            result = result_queue.get(timeout=THREAD_TIMEOUT_SECONDS)
-            if result and result.get('worker_id') != current_active_worker_instance_id:
-               logger.warning(f"Loop: Received result from unexpected worker '{result.get('worker_id')}', expected '{current_active_worker_instance_id}'. Discarding.")
-               result = None # Discard the stale result
-        except queue.Empty:
-            logger.warning(f"Loop: Timed out waiting for worker '{current_active_worker_instance_id}' after {THREAD_TIMEOUT_SECONDS} seconds (using key {censor_api_key(api_key)}).")
-            if current_active_worker_instance_id == worker_instance_id:
-                 current_active_worker_instance_id = None
-                 logger.info(f"Loop: Cleared active worker ID due to timeout for {worker_instance_id}.")
-            set_status("ERROR: API Timeout", "red")
-        # --- End Wait for Result ---
-
-        # --- Process Result ---
-        if result:
-            processed_worker_id = result.get('worker_id', 'Unknown')
-            logger.debug(f"Loop: Processing result received from {processed_worker_id}")
-
-            if result.get('success'):
-                data = result.get('data')
-                used_api_key = result.get('api_key')
-                fetched_worksheet = result.get('worksheet')
-                current_data = None # DataFrame placeholder
-
-                # --- DataFrame Creation/Padding Logic (largely unchanged) ---
-                if not data:
-                    logger.warning(f"No data returned from {fetched_worksheet} using key {censor_api_key(used_api_key)}.")
-                    current_status = status_label.cget('text')
-                    if current_status != "RUNNING (No Data)" and "CONFIG SAVED" not in current_status:
-                        set_status("RUNNING (No Data)", "orange")
-                    current_data = pd.DataFrame()
-                elif isinstance(data, list) and len(data) > 0:
-                    header = data[0]
-                    num_columns = len(header) if header else 0
-                    data_rows = data[1:]
-
-                    if not header:
-                        logger.warning("Sheet data received but has no header row. Treating all as data.")
-                        current_data = pd.DataFrame(data_rows)
-                    elif not data_rows and header:
-                       logger.warning("Sheet contains only a header row.")
-                       current_data = pd.DataFrame(columns=header)
-                       current_status_text = status_label.cget('text')
-                       if ("ERROR" in current_status_text or "orange" in status_label.cget('fg')) and "CONFIG SAVED" not in current_status_text :
-                          set_status("RUNNING", "red")
-                    elif data_rows:
-                       processed_data_rows = []
-                       row_num = 1
-                       for row in data_rows:
-                           row_len = len(row)
-                           if row_len == num_columns:
-                               processed_data_rows.append(row)
-                           elif row_len < num_columns:
-                               padding = [''] * (num_columns - row_len)
-                               processed_data_rows.append(row + padding)
-                           else: # row_len > num_columns
-                               logger.warning(f"Data row #{row_num} found with {row_len} items, header has {num_columns}. Truncating row.")
-                               processed_data_rows.append(row[:num_columns])
-                           row_num += 1
-                       try:
-                           current_data = pd.DataFrame(processed_data_rows, columns=header)
-                           logger.debug(f"DataFrame created successfully with shape {current_data.shape}")
-                           current_status_text = status_label.cget('text')
-                           if ("ERROR" in current_status_text or "orange" in status_label.cget('fg')) and "CONFIG SAVED" not in current_status_text:
-                               set_status("RUNNING", "red")
-                       except Exception as df_creation_err:
-                           logger.error(f"Error creating DataFrame after padding/processing: {df_creation_err}", exc_info=True)
-                           set_status("ERROR: DataFrame Creation", "red")
-                           set_error_message(f"DataFrame Error: {df_creation_err}")
-                           current_data = None # Indicate failure
-                    else: # Only header row existed case already handled
-                       logger.warning("Data list was not empty but failed header/data rows check.")
-                       current_data = pd.DataFrame(columns=header) # Empty DF with headers
-                elif isinstance(data, list) and len(data) == 0: # Empty list returned
-                     logger.warning(f"Empty list returned from {fetched_worksheet} using key {censor_api_key(used_api_key)}.")
-                     current_status = status_label.cget('text')
-                     if current_status != "RUNNING (No Data)" and "CONFIG SAVED" not in current_status:
-                         set_status("RUNNING (No Data)", "orange")
-                     current_data = pd.DataFrame()
-                else: # Unexpected data format
-                     logger.error(f"Unexpected data format received: {type(data)}. Skipping processing.")
-                     set_status("ERROR: Bad Data Format", "red")
-                     set_error_message(f"Bad Data Format: {type(data)}")
-                     current_data = None # Indicate failure
-                # --- End DataFrame Creation ---
-
-
-                # --- Process DataFrame if successfully created/handled ---
-                if current_data is not None: # Proceed only if DataFrame creation didn't fail
-                    try:
-                        # --- Determine if data changed or needs forced write ---
-                        data_changed = False
-                        change_reason = ""
-                        if force_write_on_next_pull:
-                             data_changed = True
-                             change_reason = "First iteration after start."
-                             logger.info("First iteration after start: Forcing data write.")
-                             force_write_on_next_pull = False # Reset flag after use
-                             logger.info("Resetting vMix API ID tracking on forced write.")
-                        elif last_data_pulled is None:
-                            data_changed = True
-                            change_reason = "Initial data load."
-                            logger.info("Initial data load.")
-                            logger.info("Resetting vMix API ID tracking on initial load.")
-                        elif not current_data.equals(last_data_pulled):
-                            data_changed = True
-                            change_reason = "Data content changed."
-                            logger.info("Data change detected compared to last pull.")
-
-                        # --- Perform actions only if data changed/forced ---
-                        if data_changed:
-                             # Play sound only if change was due to content and enabled
-                             if change_reason == "Data content changed." and should_play_sound:
-                                 logger.info("DATA UPDATE DETECTED - PLAYING SOUND")
-                                 play_notification_sound(sound_file, current_volume_percent)
-
-                             # --- Transpose right before writing, only if needed ---
-                             df_to_write = current_data # Start with the original fetched data
-                             if should_transpose:
-                                 if not df_to_write.empty:
-                                     logger.debug("Transposing data before writing.")
-                                     try:
-                                         df_to_write = df_to_write.T
-                                     except Exception as transpose_err:
-                                         logger.error(f"Error during data transposition: {transpose_err}")
-                                         set_status("ERROR: Transpose failed", "red")
-                                         df_to_write = None # Prevent further processing if transpose fails
-                                 else:
-                                     logger.debug("Skipping transpose for empty DataFrame.")
-
-                             # --- CSV Write and vMix API Trigger ---
-                             csv_written_successfully = False # Flag for vMix logic
-                             if df_to_write is not None: # Proceed only if transpose didn't fail
-                                 try:
-                                     # Unconditionally append '.csv' to the provided filename
-                                     csv_filename = entry_csv_filename.get() + ".csv"
-                                     # --- Write to CSV ---
-                                     df_to_write.to_csv(csv_filename, index=False, header=False)
-                                     csv_written_successfully = True
-
-                                     if change_reason == "Data content changed.": log_prefix = "DATA UPDATE DETECTED"
-                                     elif change_reason == "First iteration after start.": log_prefix = "FORCED WRITE (POST-START)"
-                                     else: log_prefix = "INITIAL WRITE"
-                                     logger.info(f"{GREEN}{log_prefix} - WRITING TO '{csv_filename}' (Worker: {processed_worker_id}){RESET}")
-
-                                     current_status_text = status_label.cget('text')
-                                     if "CONFIG SAVED" not in current_status_text:
-                                          clear_error_message()
-                                          if current_status_text != "RUNNING":
-                                              set_status("RUNNING", "red")
-
-                                     last_data_pulled = current_data.copy() # Update last *original* data
-
-                                     # --- Trigger vMix API Call (if enabled and CSV written) ---
-                                     # Use the actual CSV filename now
-                                     if csv_written_successfully and current_vmix_api_enabled and current_vmix_api_header:
-                                         logger.info(f"[vMix Trigger] CSV written, vMix enabled. Starting vMix processing thread for header '{current_vmix_api_header}' in file '{csv_filename}'.")
-                                         vmix_thread = threading.Thread(
-                                             target=process_vmix_api_call,
-                                             args=(csv_filename, current_vmix_api_header), # Pass filename and header name
-                                             daemon=True,
-                                             name="vMixAPIThread"
-                                         )
-                                         vmix_thread.start()
-                                     elif csv_written_successfully and current_vmix_api_enabled and not current_vmix_api_header:
-                                          logger.warning("[vMix Trigger] vMix API Check: Enabled, but no vMix API header specified in the text field.")
-                                          root.after(0, update_vmix_status_label, None, "Header not specified")
-
-                                 except (IOError, PermissionError) as write_err:
-                                     logger.error(f"Cannot write to disk '{csv_filename}': {write_err}")
-                                     set_error_message(f"CANNOT WRITE TO DISK: {write_err}")
-                                     set_status("ERROR: File Write", "red")
-                                     csv_written_successfully = False # Ensure flag is false on error
-                                 except Exception as general_write_err:
-                                     logger.error(f"Unexpected error writing CSV '{csv_filename}': {general_write_err}", exc_info=True)
-                                     set_error_message(f"CSV WRITE FAILED: {general_write_err}")
-                                     set_status("ERROR: File Write", "red")
-                                     csv_written_successfully = False # Ensure flag is false on error
-                             # --- End CSV Write and vMix API Trigger Section ---
-
-                        else: # Data has not changed
-                            logger.info("No data change detected. Skipping write and vMix check.")
-                            current_status_text = status_label.cget('text')
-                            if "CONFIG SAVED" not in current_status_text:
-                                clear_error_message()
-                                if current_status_text != "RUNNING":
-                                    set_status("RUNNING", "red")
-
-                    except Exception as process_err:
-                         logger.error(f"Unexpected error during data comparison or write preparation: {process_err}", exc_info=True)
-                         set_status("ERROR: Processing Failed", "red")
-                         set_error_message(f"Processing Error: {process_err}")
-                # --- End Process DataFrame ---
-
-            else: # Fetch failed (result['success'] was False)
-                 error_info = result.get('error', 'Unknown fetch error')
-                 failed_api_key = result.get('api_key')
-                 logger.error(f"Data fetch failed using API key {censor_api_key(failed_api_key)}. Error: {error_info}")
-                 set_status("ERROR: API Fetch", "red")
-                 if isinstance(error_info, HttpError):
-                     set_error_message(f"API Error: {error_info.resp.status} {error_info.resp.reason}")
-                 else:
-                     set_error_message(f"Fetch Error: {error_info}")
-        # --- End Process Result ---
-
-        # --- Calculate Sleep Time ---
-        loop_end_time = time.monotonic()
-        elapsed_time = loop_end_time - loop_start_time
-        sleep_time = loop_interval - elapsed_time
-        if is_running: # Check again in case stop was pressed during processing
-            if sleep_time > 0:
-                interrupted = stop_event.wait(sleep_time)
-                if interrupted:
-                    logger.info("Loop sleep interrupted by stop event.")
-                    break # Exit loop immediately
-            else:
-                logger.warning(f"Loop took {elapsed_time:.2f}s, which is longer than the interval of {loop_interval:.2f}s.")
-                interrupted = stop_event.wait(0.01)
-                if interrupted:
-                    logger.info("Loop yield interrupted by stop event.")
-                    break # Exit loop immediately
-        # --- End Sleep Time ---
-
-    # --- Loop cleanup ---
-    logger.info("Data fetch loop stopped.")
-    current_active_worker_instance_id = None # Clear active worker ID
-    set_status_based_on_inputs() # Set status based on inputs (READY/NOT READY)
-    update_ui_element_states() # Update UI elements to reflect stopped state
+         logger.error("Unexpected error updating vMix status label: %s", e, exc_info=True)
 
 
 # --- Sound ---
-# initialize_pygame_mixer, play_notification_sound remain unchanged
 def initialize_pygame_mixer():
     """Initializes pygame.mixer, handling potential errors."""
     global pygame_mixer_initialized
@@ -765,42 +391,486 @@ def initialize_pygame_mixer():
         logger.info("Pygame mixer initialized successfully.")
         return True
     except pygame.error as e:
-        logger.error(f"Failed to initialize pygame mixer: {e}")
+        logger.error("Failed to initialize pygame mixer: %s", e)
         pygame_mixer_initialized = False
         return False
     except Exception as e:
-        logger.error(f"Unexpected error initializing pygame mixer: {e}")
+        logger.error("Unexpected error initializing pygame mixer: %s", e)
         pygame_mixer_initialized = False
         return False
 
-def play_notification_sound(sound_file, volume_percent):
-    """Plays the notification sound using pygame, respecting volume. Runs in a thread."""
-    if not pygame_mixer_initialized:
-        if not initialize_pygame_mixer():
-            logger.error("Cannot play sound, mixer not initialized.")
-            return
-    if not os.path.exists(sound_file):
-        logger.error(f"Sound file not found: {sound_file}")
-        # Schedule error message on main thread
-        root.after(0, set_error_message, f"SOUND FILE NOT FOUND: {sound_file}")
-        return
+def get_cached_sound(sound_file):
+    """
+    Returns a decoded pygame Sound for sound_file, decoding from disk only when the
+    file is new or its mtime changed since the last load. Call from the audio worker only.
 
-    def _play():
+    Raises:
+        FileNotFoundError: If the sound file does not exist.
+        pygame.error: If pygame cannot decode the file.
+    """
+    mtime = os.stat(sound_file).st_mtime # Raises FileNotFoundError if missing
+    cached = sound_cache.get(sound_file)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    logger.info("Loading sound file into cache: %s", sound_file)
+    sound = pygame.mixer.Sound(sound_file)
+    sound_cache[sound_file] = (mtime, sound)
+    return sound
+
+def sound_worker():
+    """
+    Single audio worker. Takes play requests from sound_queue, coalesces requests that
+    arrive within sound_coalesce_seconds of the first one into a single playback, and
+    plays the most recent request. A None item stops the worker.
+    """
+    while True:
+        request = sound_queue.get()
+        if request is None:
+            break
+
+        # --- Coalesce burst of requests into one ---
+        deadline = time.monotonic() + sound_coalesce_seconds
+        coalesced = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                next_request = sound_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if next_request is None:
+                return
+            if next_request[1] is None and request[1] is not None:
+                continue # Keep the pending play request over a preload-only request
+            request = next_request
+            coalesced += 1
+        if coalesced:
+            logger.debug("Coalesced %s sound request(s) into one playback.", coalesced)
+
+        sound_file, volume_percent = request
+        if not pygame_mixer_initialized:
+            if not initialize_pygame_mixer():
+                logger.error("Cannot play sound, mixer not initialized.")
+                continue
         try:
-            logger.info(f"Attempting to play sound: {sound_file} at {volume_percent}% volume.")
-            sound = pygame.mixer.Sound(sound_file)
+            sound = get_cached_sound(sound_file)
+            if volume_percent is None: # Preload only
+                continue
+            logger.info("Attempting to play sound: %s at %s%% volume.", sound_file, volume_percent)
             volume_float = max(0.0, min(1.0, volume_percent / 100.0))
             sound.set_volume(volume_float)
+            sound.stop() # Never overlap with a previous playback of the same sound
             sound.play()
+        except FileNotFoundError:
+            logger.error("Sound file not found: %s", sound_file)
+            sound_cache.pop(sound_file, None)
+            post_error_message(f"SOUND FILE NOT FOUND: {sound_file}")
         except pygame.error as e:
-             logger.error(f"Pygame error playing sound {sound_file}: {e}")
-             root.after(0, set_error_message, f"Pygame sound error: {e}")
+             logger.error("Pygame error playing sound %s: %s", sound_file, e)
+             post_error_message(f"Pygame sound error: {e}")
         except Exception as e:
-             logger.error(f"Unexpected error playing sound {sound_file}: {e}")
-             root.after(0, set_error_message, f"Sound play error: {e}")
+             logger.error("Unexpected error playing sound %s: %s", sound_file, e)
+             post_error_message(f"Sound play error: {e}")
 
-    sound_thread = threading.Thread(target=_play, daemon=True, name="SoundPlayer")
-    sound_thread.start()
+def ensure_sound_worker():
+    """Starts the audio worker thread if it is not already running."""
+    global sound_worker_thread
+    if sound_worker_thread is None or not sound_worker_thread.is_alive():
+        sound_worker_thread = threading.Thread(target=sound_worker, daemon=True, name="SoundPlayer")
+        sound_worker_thread.start()
+
+def play_notification_sound(sound_file, volume_percent):
+    """Queues the notification sound for the audio worker. Never blocks the caller."""
+    ensure_sound_worker()
+    sound_queue.put_nowait((sound_file, volume_percent))
+
+def preload_notification_sound(sound_file):
+    """Queues a decode of sound_file on the audio worker so the first playback is instant."""
+    ensure_sound_worker()
+    sound_queue.put_nowait((sound_file, None))
+
+def stop_sound_worker():
+    """Stops the audio worker thread and drops the decoded sound cache."""
+    global sound_worker_thread
+    if sound_worker_thread and sound_worker_thread.is_alive():
+        sound_queue.put(None)
+        sound_worker_thread.join(timeout=1.0)
+    sound_worker_thread = None
+    sound_cache.clear()
+
+
+# --- Metrics Outputs ---
+def start_metrics_outputs():
+    """Starts the opt-in metrics endpoint and CSV dumper configured in config.ini."""
+    global metrics_server, metrics_csv_dumper
+    try:
+        port = config.getint('Settings', 'metrics_port', fallback=0)
+        csv_name = config.get('Settings', 'metrics_csv_filename', fallback='').strip()
+        interval = config.getfloat('Settings', 'metrics_csv_interval_seconds', fallback=DEFAULT_METRICS_CSV_INTERVAL_SECONDS)
+    except ValueError as e:
+        logger.error("Invalid metrics settings in config: %s. Metrics outputs disabled.", e)
+        return
+    if port > 0 and metrics_server is None:
+        try:
+            metrics_server = MetricsServer(stage_metrics, port)
+            metrics_server.start()
+        except OSError as e:
+            logger.error("Could not start metrics endpoint on port %s: %s", port, e)
+            metrics_server = None
+    if csv_name and metrics_csv_dumper is None:
+        if interval <= 0: interval = DEFAULT_METRICS_CSV_INTERVAL_SECONDS
+        metrics_csv_dumper = MetricsCsvDumper(stage_metrics, csv_name, interval)
+        metrics_csv_dumper.start()
+
+def stop_metrics_outputs():
+    """Stops the metrics endpoint and writes a final metrics CSV snapshot."""
+    global metrics_server, metrics_csv_dumper
+    if metrics_server:
+        metrics_server.stop()
+        metrics_server = None
+    if metrics_csv_dumper:
+        metrics_csv_dumper.stop()
+        metrics_csv_dumper = None
+
+
+# --- Change Notifications ---
+def start_webhook_receiver():
+    """Starts the opt-in webhook that lets an edit trigger (or a relay) wake the loop."""
+    global webhook_receiver
+    try:
+        port = config.getint('Settings', 'webhook_port', fallback=0)
+    except ValueError as e:
+        logger.error("Invalid webhook_port in config: %s. Webhook disabled.", e)
+        return
+    if port > 0 and webhook_receiver is None:
+        host = config.get('Settings', 'webhook_host', fallback='127.0.0.1').strip() or '127.0.0.1'
+        token = config.get('Settings', 'webhook_token', fallback='').strip()
+        if host not in ('127.0.0.1', 'localhost', '::1') and not token:
+            logger.warning("[Webhook] Listening on %s without a webhook_token; anyone on the network can trigger fetches.", host)
+        try:
+            webhook_receiver = WebhookReceiver(engine.notify_change, port, host, token)
+            webhook_receiver.start()
+        except OSError as e:
+            logger.error("Could not start webhook receiver on %s:%s: %s", host, port, e)
+            webhook_receiver = None
+
+def stop_webhook_receiver():
+    global webhook_receiver
+    if webhook_receiver:
+        webhook_receiver.stop()
+        webhook_receiver = None
+
+
+# --- Config Reload ---
+def config_file_mtime():
+    try:
+        return os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+def start_config_watch():
+    """Starts checking config.ini for edits every config_watch_seconds (0 turns it off)."""
+    global config_mtime_ns, config_watch_job_id
+    config_mtime_ns = config_file_mtime()
+    try:
+        interval = config.getfloat('Settings', 'config_watch_seconds', fallback=DEFAULT_CONFIG_WATCH_SECONDS)
+    except ValueError:
+        logger.error("Invalid config_watch_seconds in config. Using default %s.", DEFAULT_CONFIG_WATCH_SECONDS)
+        interval = DEFAULT_CONFIG_WATCH_SECONDS
+    if interval <= 0:
+        logger.info("Watching '%s' for changes is turned off.", CONFIG_FILE)
+        return
+    interval_ms = max(100, int(interval * 1000))
+    config_watch_job_id = root.after(interval_ms, watch_config_file, interval_ms)
+
+def watch_config_file(interval_ms):
+    """Reloads config.ini when its modification time changed and reschedules itself (Tk thread)."""
+    global config_watch_job_id
+    mtime = config_file_mtime()
+    if mtime is not None and mtime != config_mtime_ns:
+        reload_config()
+    try:
+        config_watch_job_id = root.after(interval_ms, watch_config_file, interval_ms)
+    except tk.TclError:
+        config_watch_job_id = None # Window is being destroyed
+
+def reload_config():
+    """
+    Re-reads config.ini, shows it in the GUI and applies what it can to the running loop (Tk thread).
+
+    GUI fields the operator edited since the last load or save keep the edit instead of the value
+    from the file. The engine keeps its caches, connections and change tracking; settings that need
+    a Stop/Start or a restart of the tool are logged and shown in the status label instead.
+    """
+    global config, config_mtime_ns, sound_coalesce_seconds, shown_inputs
+    config_mtime_ns = config_file_mtime()
+    new_config = configparser.ConfigParser(interpolation=None)
+    new_config.read_dict(config) # Options missing from the file keep their current values
+    try:
+        new_config.read(CONFIG_FILE)
+    except configparser.Error as e:
+        logger.error("Could not reload '%s': %s. Keeping the current settings.", CONFIG_FILE, e)
+        return
+    changed = [option for option in new_config.options('Settings')
+               if new_config.get('Settings', option) != config.get('Settings', option, fallback=None)]
+    if not changed:
+        return
+    logger.info("'%s' changed on disk; reloading: %s", CONFIG_FILE, ", ".join(changed))
+    config = new_config
+
+    apply_logging_config()
+    engine.tick_summary = log_tick_summary
+    if 'sound_coalesce_ms' in changed:
+        try:
+            sound_coalesce_seconds = max(0, config.getint('Settings', 'sound_coalesce_ms')) / 1000.0
+        except ValueError:
+            logger.error("Invalid sound_coalesce_ms in config. Keeping %s ms.", int(sound_coalesce_seconds * 1000))
+    try:
+        edited = {option: value for option, value in gui_input_values().items() if value != shown_inputs.get(option)}
+        populate_inputs_from_config()
+        shown_inputs = gui_input_values()
+        for option, value in edited.items():
+            set_gui_input(option, value)
+    except (ValueError, tk.TclError) as e:
+        logger.error("Could not show the reloaded settings: %s", e)
+        return
+    if edited:
+        logger.warning("Kept unsaved edits to %s in the GUI instead of the reloaded values; Save Config to keep them.",
+                       ", ".join(edited))
+
+    needs_restart = []
+    if is_running:
+        if sound_var.get() and (pygame_mixer_initialized or initialize_pygame_mixer()):
+            preload_notification_sound(config.get('Settings', 'sound_filename', fallback=DEFAULT_SOUND_FILE))
+        needs_restart = engine.reconfigure(snapshot_run_config())
+    tool_settings = [option for option in changed if option in TOOL_RESTART_SETTINGS]
+    if tool_settings:
+        logger.warning("Changed settings that only apply after restarting the tool: %s", ", ".join(tool_settings))
+    if needs_restart or tool_settings:
+        show_temporary_status("CONFIG RELOADED - RESTART NEEDED", "orange")
+    else:
+        show_temporary_status("CONFIG RELOADED", "orange")
+
+# --- Profiling ---
+def request_profiling(trace_memory=False):
+    """Profiles the next profile_iterations loop iterations (Diagnostics menu, SIGUSR1/SIGUSR2)."""
+    try:
+        iterations = config.getint('Settings', 'profile_iterations', fallback=DEFAULT_PROFILE_ITERATIONS)
+    except ValueError:
+        logger.error("Invalid profile_iterations in config. Using default %s.", DEFAULT_PROFILE_ITERATIONS)
+        iterations = DEFAULT_PROFILE_ITERATIONS
+    loop_profiler.output_dir = config.get('Settings', 'profile_directory', fallback=DEFAULT_PROFILE_DIR).strip() or DEFAULT_PROFILE_DIR
+    if loop_profiler.request(iterations, trace_memory) and not is_running:
+        logger.info("Profiling will begin when the loop is started.")
+
+def install_profiling_signal_handlers():
+    """SIGUSR1 profiles the next loop iterations, SIGUSR2 adds memory snapshots (not available on Windows)."""
+    if not hasattr(signal, 'SIGUSR1'):
+        return
+    # Handlers run on the Tk thread; hand the request to the event loop instead of taking locks here
+    signal.signal(signal.SIGUSR1, lambda signum, frame: root.after(0, request_profiling))
+    signal.signal(signal.SIGUSR2, lambda signum, frame: root.after(0, request_profiling, True))
+    logger.debug("Profiling signal handlers installed (SIGUSR1, SIGUSR2).")
+
+
+# --- GUI Update Channel ---
+# Background threads never call Tk directly: they post to ui_updates and pump_ui_updates applies the
+# latest update per key on the Tk thread, at most ui_max_fps times per second.
+def post_status(text, color):
+    """Queues a status label change from the loop thread (the engine already drops repeats)."""
+    ui_updates.post('status', apply_loop_status, text, color)
+
+def post_error_message(text):
+    """Queues an error message from a background thread."""
+    ui_updates.post('error', set_error_message, text)
+
+def post_clear_error():
+    """Queues clearing the error message from a background thread."""
+    ui_updates.post('error', clear_error_message)
+
+def post_vmix_status(status_code, message=""):
+    """Queues a vMix status label update from a background thread."""
+    ui_updates.post('vmix_status', update_vmix_status_label, status_code, message)
+
+def apply_loop_status(text, color):
+    """Applies a status posted by the loop (Tk thread). Leaves "CONFIG SAVED" up unless it is an error."""
+    if revert_status_job_id and "ERROR" not in text:
+        return # revert_status_label restores engine.status once "CONFIG SAVED" times out
+    set_status(text, color)
+
+def on_loop_stopped():
+    """Resets the status and re-enables inputs after the loop thread exits (Tk thread)."""
+    set_status_based_on_inputs() # Set status based on inputs (READY/NOT READY)
+    update_ui_element_states() # Update UI elements to reflect stopped state
+
+def post_loop_stopped():
+    """Queues on_loop_stopped from the loop thread as it exits."""
+    ui_updates.post('loop_stopped', on_loop_stopped)
+
+def create_engine():
+    """Builds the SheetsEngine (or, in supervisor mode, its child-process supervisor) with callbacks that hand every GUI update to the Tk thread."""
+    state_file = config.get('Settings', 'state_file', fallback=DEFAULT_STATE_FILE).strip()
+    try:
+        supervisor_mode = config.getboolean('Settings', 'supervisor_mode', fallback=False)
+    except ValueError:
+        logger.error("Invalid supervisor_mode in config. Running the job in-process.")
+        supervisor_mode = False
+    if supervisor_mode:
+        try:
+            hang_seconds = config.getfloat('Settings', 'supervisor_hang_seconds', fallback=DEFAULT_HANG_SECONDS)
+        except ValueError:
+            logger.error("Invalid supervisor_hang_seconds in config. Using default %s.", DEFAULT_HANG_SECONDS)
+            hang_seconds = DEFAULT_HANG_SECONDS
+        logger.info("Supervisor mode: the polling job runs in a child process (restarted after %ss without progress).", hang_seconds)
+        return EngineSupervisor(stage_metrics=stage_metrics,
+                                on_status=post_status, on_error=post_error_message, on_clear_error=post_clear_error,
+                                on_vmix_status=post_vmix_status, on_sound=play_notification_sound,
+                                on_stopped=post_loop_stopped, state_file=state_file,
+                                hang_seconds=max(hang_seconds, 2 * THREAD_TIMEOUT_SECONDS))
+    return SheetsEngine(stage_metrics=stage_metrics, profiler=loop_profiler,
+                        on_status=post_status, on_error=post_error_message, on_clear_error=post_clear_error,
+                        on_vmix_status=post_vmix_status, on_sound=play_notification_sound,
+                        on_stopped=post_loop_stopped, state_store=StateStore(state_file) if state_file else None)
+
+def pump_ui_updates(frame_ms):
+    """Applies queued background-thread updates and reschedules itself every frame_ms (Tk thread)."""
+    global ui_pump_job_id
+    ui_lag_monitor.beat()
+    ui_updates.drain()
+    try:
+        ui_pump_job_id = root.after(frame_ms, pump_ui_updates, frame_ms)
+    except tk.TclError:
+        ui_pump_job_id = None # Window is being destroyed
+
+def start_ui_updates():
+    """Starts the capped-rate GUI update pump and its event-loop lag monitor."""
+    global ui_lag_monitor
+    try:
+        max_fps = config.getfloat('Settings', 'ui_max_fps', fallback=DEFAULT_UI_MAX_FPS)
+        lag_warn_ms = config.getfloat('Settings', 'ui_lag_warn_ms', fallback=DEFAULT_UI_LAG_WARN_MS)
+    except ValueError as e:
+        logger.error("Invalid UI update settings in config: %s. Using defaults.", e)
+        max_fps, lag_warn_ms = DEFAULT_UI_MAX_FPS, DEFAULT_UI_LAG_WARN_MS
+    if max_fps <= 0: max_fps = DEFAULT_UI_MAX_FPS
+    frame_ms = max(1, int(1000 / max_fps))
+    ui_lag_monitor = EventLoopLagMonitor(frame_ms / 1000.0, lag_warn_ms / 1000.0, stage_metrics)
+    logger.debug("GUI update pump running every %s ms.", frame_ms)
+    pump_ui_updates(frame_ms)
+
+def snapshot_run_config():
+    """Reads the GUI inputs into the immutable RunConfig the engine runs with (Tk thread)."""
+    try:
+        loop_interval = float(entry_loop_seconds.get())
+        if loop_interval <= 0: loop_interval = DEFAULT_LOOP_SECONDS
+    except ValueError:
+        loop_interval = DEFAULT_LOOP_SECONDS
+        logger.warning("Invalid loop interval format. Using default.")
+    try:
+        volume_percent = int(volume_var.get())
+    except (ValueError, tk.TclError):
+        volume_percent = DEFAULT_SOUND_VOLUME
+        logger.warning("Could not read volume slider value, using default.")
+    try:
+        stream_values = config.getboolean('Settings', 'stream_values', fallback=False)
+    except ValueError:
+        logger.error("Invalid stream_values in config. Using False.")
+        stream_values = False
+    try:
+        chunk_rows = max(0, config.getint('Settings', 'chunk_rows', fallback=0))
+    except ValueError:
+        logger.error("Invalid chunk_rows in config. Fetching the whole tab in one request.")
+        chunk_rows = 0
+    try:
+        metadata_refresh_seconds = config.getfloat('Settings', 'metadata_refresh_seconds', fallback=DEFAULT_METADATA_REFRESH_SECONDS)
+    except ValueError:
+        logger.error("Invalid metadata_refresh_seconds in config. Using %s.", DEFAULT_METADATA_REFRESH_SECONDS)
+        metadata_refresh_seconds = DEFAULT_METADATA_REFRESH_SECONDS
+    try:
+        output_copy_timeout = config.getfloat('Settings', 'output_copy_timeout_seconds', fallback=DEFAULT_COPY_TIMEOUT_SECONDS)
+    except ValueError:
+        logger.error("Invalid output_copy_timeout_seconds in config. Using %s.", DEFAULT_COPY_TIMEOUT_SECONDS)
+        output_copy_timeout = DEFAULT_COPY_TIMEOUT_SECONDS
+    try:
+        shared_memory_mb = config.getfloat('Settings', 'shared_memory_mb', fallback=DEFAULT_SHARED_MEMORY_MB)
+        if shared_memory_mb <= 0: raise ValueError(shared_memory_mb)
+    except ValueError:
+        logger.error("Invalid shared_memory_mb in config. Using %s.", DEFAULT_SHARED_MEMORY_MB)
+        shared_memory_mb = DEFAULT_SHARED_MEMORY_MB
+    try:
+        multicast_port = config.getint('Settings', 'multicast_port', fallback=DEFAULT_MULTICAST_PORT)
+        multicast_ttl = config.getint('Settings', 'multicast_ttl', fallback=DEFAULT_MULTICAST_TTL)
+        multicast_keyframe_seconds = config.getfloat('Settings', 'multicast_keyframe_seconds', fallback=DEFAULT_KEYFRAME_SECONDS)
+        if not 0 < multicast_port < 65536 or not 0 <= multicast_ttl < 256 or multicast_keyframe_seconds <= 0:
+            raise ValueError((multicast_port, multicast_ttl, multicast_keyframe_seconds))
+    except ValueError:
+        logger.error("Invalid multicast_port, multicast_ttl or multicast_keyframe_seconds in config. Using defaults.")
+        multicast_port, multicast_ttl, multicast_keyframe_seconds = DEFAULT_MULTICAST_PORT, DEFAULT_MULTICAST_TTL, DEFAULT_KEYFRAME_SECONDS
+    try:
+        settle_seconds = max(0.0, config.getfloat('Settings', 'settle_ms', fallback=0) / 1000.0)
+        settle_poll_interval = config.getfloat('Settings', 'settle_poll_ms', fallback=DEFAULT_SETTLE_POLL_SECONDS * 1000) / 1000.0
+        if settle_poll_interval <= 0: raise ValueError(settle_poll_interval)
+    except ValueError:
+        logger.error("Invalid settle_ms or settle_poll_ms in config. Writing changes at once.")
+        settle_seconds, settle_poll_interval = 0.0, DEFAULT_SETTLE_POLL_SECONDS
+    try:
+        replay_speed = max(0.0, config.getfloat('Settings', 'replay_speed', fallback=1.0))
+        replay_start_seconds = max(0.0, config.getfloat('Settings', 'replay_start_seconds', fallback=0.0))
+    except ValueError:
+        logger.error("Invalid replay_speed or replay_start_seconds in config. Replaying from the start in real time.")
+        replay_speed, replay_start_seconds = 1.0, 0.0
+    push_interval, push_debounce = 0.0, DEFAULT_PUSH_DEBOUNCE_SECONDS
+    source_file = config.get('Settings', 'source_file', fallback='').strip()
+    if source_file: # The file is watched; polling only catches changes the watch missed
+        try:
+            push_interval = max(loop_interval, config.getfloat('Settings', 'push_interval_seconds', fallback=DEFAULT_PUSH_INTERVAL_SECONDS))
+            push_debounce = max(0.0, config.getfloat('Settings', 'source_debounce_ms', fallback=DEFAULT_SOURCE_DEBOUNCE_MS) / 1000.0)
+        except ValueError:
+            logger.error("Invalid push_interval_seconds or source_debounce_ms in config. Using defaults.")
+            push_interval, push_debounce = max(loop_interval, DEFAULT_PUSH_INTERVAL_SECONDS), DEFAULT_SOURCE_DEBOUNCE_MS / 1000.0
+    elif webhook_receiver is not None: # Notifications bring changes in; polling only catches missed ones
+        try:
+            push_interval = max(loop_interval, config.getfloat('Settings', 'push_interval_seconds', fallback=DEFAULT_PUSH_INTERVAL_SECONDS))
+            push_debounce = max(0.0, config.getfloat('Settings', 'push_debounce_ms', fallback=DEFAULT_PUSH_DEBOUNCE_SECONDS * 1000) / 1000.0)
+        except ValueError:
+            logger.error("Invalid push_interval_seconds or push_debounce_ms in config. Using defaults.")
+            push_interval, push_debounce = max(loop_interval, DEFAULT_PUSH_INTERVAL_SECONDS), DEFAULT_PUSH_DEBOUNCE_SECONDS
+    return RunConfig(
+        spreadsheet_id=entry_spreadsheet_id.get(),
+        worksheet_name=entry_worksheet_name.get(),
+        api_keys=tuple(entry.get() for entry in api_key_entries if entry.get()),
+        loop_interval=loop_interval,
+        csv_filename=entry_csv_filename.get(),
+        transpose=transpose_var.get(),
+        play_sound=sound_var.get(),
+        sound_file=config.get('Settings', 'sound_filename', fallback=DEFAULT_SOUND_FILE),
+        sound_volume=volume_percent,
+        vmix_api_enabled=vmix_api_enabled_var.get(),
+        vmix_api_header=entry_vmix_header.get(),
+        sheets_api_base_url=config.get('Settings', 'sheets_api_base_url', fallback='').strip(),
+        stream_values=stream_values,
+        chunk_rows=chunk_rows,
+        metadata_refresh_seconds=metadata_refresh_seconds,
+        columns=parse_columns_setting(config.get('Settings', 'columns', fallback='')),
+        push_interval=push_interval,
+        push_debounce=push_debounce,
+        output_copies=parse_output_copies(config.get('Settings', 'output_copies', fallback='')),
+        output_copy_timeout=output_copy_timeout,
+        shared_memory_name=config.get('Settings', 'shared_memory_name', fallback='').strip(),
+        shared_memory_mb=shared_memory_mb,
+        multicast_group=config.get('Settings', 'multicast_group', fallback='').strip(),
+        multicast_port=multicast_port,
+        multicast_ttl=multicast_ttl,
+        multicast_interface=config.get('Settings', 'multicast_interface', fallback='').strip(),
+        multicast_keyframe_seconds=multicast_keyframe_seconds,
+        settle_seconds=settle_seconds,
+        settle_poll_interval=settle_poll_interval,
+        settle_bypass_columns=parse_columns_setting(config.get('Settings', 'settle_bypass_columns', fallback='')),
+        record_file=config.get('Settings', 'record_file', fallback='').strip(),
+        source_file=source_file,
+        replay_file=config.get('Settings', 'replay_file', fallback='').strip(),
+        replay_speed=replay_speed,
+        replay_start_seconds=replay_start_seconds)
 
 
 # --- GUI Functions ---
@@ -813,10 +883,10 @@ def set_status(text, color):
     if revert_status_job_id:
         try:
             root.after_cancel(revert_status_job_id)
-            logger.debug(f"Cancelled pending status revert job ID: {revert_status_job_id}")
+            logger.debug("Cancelled pending status revert job ID: %s", revert_status_job_id)
             revert_status_job_id = None
         except (tk.TclError, ValueError) as e: # ValueError can happen if ID is invalid
-            logger.warning(f"Could not cancel status revert job (may already have run or window closing): {e}")
+            logger.warning("Could not cancel status revert job (may already have run or window closing): %s", e)
             revert_status_job_id = None
 
     if root and status_label:
@@ -825,27 +895,27 @@ def set_status(text, color):
             current_color = status_label.cget('fg')
             if current_text != text or current_color != color:
                  status_label.config(text=text, fg=color)
-                 logger.debug(f"Status label set to: {text} ({color})")
+                 logger.debug("Status label set to: %s (%s)", text, color)
         except tk.TclError as e:
-            logger.error(f"Failed to update status label (TclError): {e}")
+            logger.error("Failed to update status label (TclError): %s", e)
         except Exception as e:
-            logger.error(f"Unexpected error updating status label: {e}", exc_info=True)
+            logger.error("Unexpected error updating status label: %s", e, exc_info=True)
 
 def set_error_message(text):
     """Displays an error message at the bottom."""
     if root and error_label:
         try:
             if error_label.cget('text') != text: error_label.config(text=text)
-        except tk.TclError as e: logger.error(f"Failed to update error label: {e}")
-        except Exception as e: logger.error(f"Unexpected error updating error label: {e}", exc_info=True)
+        except tk.TclError as e: logger.error("Failed to update error label: %s", e)
+        except Exception as e: logger.error("Unexpected error updating error label: %s", e, exc_info=True)
 
 def clear_error_message():
     """Clears the error message."""
     if root and error_label:
         try:
             if error_label.cget('text') != "": error_label.config(text="")
-        except tk.TclError as e: logger.error(f"Failed to clear error label: {e}")
-        except Exception as e: logger.error(f"Unexpected error clearing error label: {e}", exc_info=True)
+        except tk.TclError as e: logger.error("Failed to clear error label: %s", e)
+        except Exception as e: logger.error("Unexpected error clearing error label: %s", e, exc_info=True)
 
 def update_ui_element_states(*args):
     """Enables/disables GUI elements based on the running state and input validity."""
@@ -855,18 +925,13 @@ def update_ui_element_states(*args):
 
     try:
         if not is_running:
-            required_filled = bool(
-                entry_spreadsheet_id.get() and
-                entry_worksheet_name.get() and
-                entry_csv_filename.get() and
-                any(entry.get() for entry in api_key_entries)
-            )
+            required_filled = required_inputs_filled()
         if root and vmix_api_enabled_var:
             vmix_is_currently_enabled = vmix_api_enabled_var.get()
 
     except tk.TclError: logger.warning("update_ui_element_states checking state during potential GUI shutdown.")
     except NameError: logger.warning("update_ui_element_states checking state before all GUI elements defined.")
-    except Exception as e: logger.error(f"Error getting state in update_ui_element_states: {e}")
+    except Exception as e: logger.error("Error getting state in update_ui_element_states: %s", e)
 
     if is_running:
         general_state = tk.DISABLED
@@ -912,44 +977,46 @@ def update_ui_element_states(*args):
 
     except tk.TclError: logger.warning("update_ui_element_states encountered TclError, likely during shutdown.")
     except NameError: logger.warning("update_ui_element_states called before all GUI elements defined.")
-    except Exception as e: logger.error(f"Error applying state in update_ui_element_states: {e}", exc_info=True)
+    except Exception as e: logger.error("Error applying state in update_ui_element_states: %s", e, exc_info=True)
+
+def uses_local_source():
+    """True if config.ini sets a source_file or replay_file, so the sheet and API keys are not needed."""
+    return bool(config.get('Settings', 'source_file', fallback='').strip() or
+                config.get('Settings', 'replay_file', fallback='').strip())
+
+def required_inputs_filled():
+    """True if a run can start: an output filename, and either a local source/replay file or the sheet and an API key."""
+    if not (root and entry_spreadsheet_id and entry_worksheet_name and entry_csv_filename and api_key_entries):
+        return False
+    return bool(entry_csv_filename.get()) and (uses_local_source() or bool(
+        entry_spreadsheet_id.get() and
+        entry_worksheet_name.get() and
+        any(entry.get() for entry in api_key_entries if entry) # Check entry exists
+    ))
 
 def set_status_based_on_inputs(*args):
     """Sets the status label to READY or NOT READY based on inputs, only if not running."""
     if is_running or revert_status_job_id: return
 
-    required_filled = False
     try:
-        if (root and entry_spreadsheet_id and entry_worksheet_name and
-            entry_csv_filename and api_key_entries):
-            required_filled = bool(
-                entry_spreadsheet_id.get() and
-                entry_worksheet_name.get() and
-                entry_csv_filename.get() and
-                any(entry.get() for entry in api_key_entries if entry) # Check entry exists
-            )
-            if required_filled:
-                set_status("READY", "green")
-            else:
-                set_status("NOT READY", "gray")
+        if required_inputs_filled():
+            set_status("READY", "green")
         else:
-             set_status("NOT READY", "gray") # Default if GUI elements missing
+            set_status("NOT READY", "gray") # Also the default if GUI elements are missing
 
         update_ui_element_states()
     except tk.TclError: logger.warning("set_status_based_on_inputs called while GUI is potentially shutting down.")
     except NameError: logger.warning("set_status_based_on_inputs called before all GUI elements defined.")
-    except Exception as e: logger.error(f"Error in set_status_based_on_inputs: {e}", exc_info=True)
+    except Exception as e: logger.error("Error in set_status_based_on_inputs: %s", e, exc_info=True)
 
 def toggle_loop():
     """Starts or stops the data fetching loop."""
-    global is_running, loop_thread, force_write_on_next_pull, last_vmix_api_id
-    global skip_next_vmix_execution_on_change # <<< ADDED GLOBAL
+    global is_running
 
     if is_running:
         logger.info("Stop button pressed.")
         is_running = False
-        skip_next_vmix_execution_on_change = False # <<< RESET FLAG ON STOP
-        stop_event.set() # Signal the loop and any waiting threads to stop
+        engine.stop() # Signal the loop and any waiting threads to stop
         if start_stop_button:
             try:
                 start_stop_button.config(text="Stopping...", state=tk.DISABLED)
@@ -957,28 +1024,27 @@ def toggle_loop():
     else:
         required_filled = False
         try:
-             if (root and entry_spreadsheet_id and entry_worksheet_name and
-                entry_csv_filename and api_key_entries):
-                required_filled = bool(
-                    entry_spreadsheet_id.get() and
-                    entry_worksheet_name.get() and
-                    entry_csv_filename.get() and
-                    any(entry.get() for entry in api_key_entries if entry)
-                )
+            required_filled = required_inputs_filled()
         except tk.TclError: pass # Ignore if GUI closing
 
         if not required_filled:
             logger.warning("Start pressed but requirements not met.")
-            messagebox.showwarning("Not Ready", "Please fill in Spreadsheet ID, Worksheet Name, Output CSV Filename, and at least one API Key.")
+            messagebox.showwarning("Not Ready", "Please fill in the Output CSV Filename, and either set a source_file or replay_file in config.ini "
+                                   "or fill in Spreadsheet ID, Worksheet Name and at least one API Key.")
             return
 
         if sound_var.get() and not pygame_mixer_initialized:
             if not initialize_pygame_mixer():
                  messagebox.showwarning("Audio Warning", "Failed to initialize audio playback.\nSound notifications will not work, but proceeding anyway.")
+        if sound_var.get() and pygame_mixer_initialized:
+            try:
+                preload_notification_sound(config.get('Settings', 'sound_filename'))
+            except (configparser.NoOptionError, configparser.NoSectionError):
+                preload_notification_sound(DEFAULT_SOUND_FILE)
 
         logger.info("Start button pressed.")
+        run_cfg = snapshot_run_config() # The loop reads only this snapshot, never the widgets
         is_running = True
-        stop_event.clear() # Clear the stop signal for the new run
         clear_error_message() # Clear any previous errors
         set_status("RUNNING", "red")
         if vmix_status_label:
@@ -986,16 +1052,9 @@ def toggle_loop():
                 vmix_status_label.config(text="No vMix API Response yet", fg="gray")
             except tk.TclError: pass # Ignore if GUI closing
 
-        force_write_on_next_pull = True # Set flag for initial write
-        skip_next_vmix_execution_on_change = True # <<< SET FLAG ON START
-        # Reset last vMix ID on start to ensure the first read value is treated as 'new'
-        # but execution will be skipped by the flag above.
-        last_vmix_api_id = None
-        logger.info("Flags set to force write and skip first vMix execution on change after start. vMix API ID tracker reset.")
-
         update_ui_element_states() # Disable inputs immediately
-        loop_thread = threading.Thread(target=run_loop, daemon=True, name="MainLoopThread")
-        loop_thread.start()
+        engine.tick_summary = log_tick_summary
+        engine.start(run_cfg) # Resumes from the state file, or forces the first write and skips the first vMix change
 
 def on_api_focus_in(event):
     """Show API key content on focus if not running."""
@@ -1060,6 +1119,13 @@ root.title("Google Sheet Exporter")
 root.geometry("400x820")
 root.minsize(400, 750) # Set a minimum size
 
+menu_bar = tk.Menu(root)
+diagnostics_menu = tk.Menu(menu_bar, tearoff=0)
+diagnostics_menu.add_command(label="Profile Next Loop Iterations", command=request_profiling)
+diagnostics_menu.add_command(label="Profile Next Loop Iterations + Memory", command=lambda: request_profiling(trace_memory=True))
+menu_bar.add_cascade(label="Diagnostics", menu=diagnostics_menu)
+root.config(menu=menu_bar)
+
 try:
     large_font = font.Font(family="Helvetica", size=12)
     label_font = font.Font(family="Helvetica", size=10)
@@ -1160,56 +1226,101 @@ error_label = tk.Label(root, text="", font=error_font, fg="red", anchor=tk.CENTE
 error_label.pack(fill=tk.X, side=tk.BOTTOM, pady=(5, 10)) # Error message at the very bottom
 
 
+def set_entry_text(entry, text):
+    """Replaces the text of an Entry, also while it is disabled during a run."""
+    state = entry.cget('state')
+    if state == tk.DISABLED: entry.config(state=tk.NORMAL)
+    entry.delete(0, tk.END)
+    entry.insert(0, text)
+    if state == tk.DISABLED: entry.config(state=state)
+
+def gui_input_entries():
+    """The config option shown in each GUI Entry."""
+    entries = {'spreadsheet_id': entry_spreadsheet_id, 'worksheet_name': entry_worksheet_name}
+    entries.update((f'api_key_{i}', entry) for i, entry in enumerate(api_key_entries, 1))
+    entries.update({'loop_seconds': entry_loop_seconds, 'output_csv_filename': entry_csv_filename,
+                    'vmix_api_header': entry_vmix_header})
+    return entries
+
+def gui_input_values():
+    """The config option -> value (as saved to config.ini) of every GUI input."""
+    values = {option: entry.get() for option, entry in gui_input_entries().items()}
+    values.update({'transpose_data': str(transpose_var.get()), 'play_sound_on_change': str(sound_var.get()),
+                   'sound_volume': str(int(volume_var.get())), 'vmix_api_enabled': str(vmix_api_enabled_var.get())})
+    return values
+
+def set_gui_input(option, value):
+    """Shows value (as returned by gui_input_values) in the GUI input for option."""
+    entries = gui_input_entries()
+    if option in entries:
+        set_entry_text(entries[option], value)
+    elif option == 'sound_volume':
+        volume_var.set(float(value))
+        update_volume_label()
+    else:
+        {'transpose_data': transpose_var, 'play_sound_on_change': sound_var,
+         'vmix_api_enabled': vmix_api_enabled_var}[option].set(value == 'True')
+
+def populate_inputs_from_config():
+    """Fills the GUI inputs from the loaded config (at start-up and when config.ini is reloaded)."""
+    set_entry_text(entry_spreadsheet_id, config.get('Settings', 'spreadsheet_id'))
+    set_entry_text(entry_worksheet_name, config.get('Settings', 'worksheet_name'))
+    for i, entry in enumerate(api_key_entries, 1):
+        key = config.get('Settings', f'api_key_{i}')
+        set_entry_text(entry, key)
+        if key: entry.config(show='*')
+        else: entry.config(show='')
+
+    try:
+        loop_sec_str = config.get('Settings', 'loop_seconds')
+        loop_sec = float(loop_sec_str)
+        if loop_sec <= 0: loop_sec = DEFAULT_LOOP_SECONDS
+    except (ValueError, configparser.NoOptionError, configparser.NoSectionError):
+        logger.warning("Invalid or missing loop_seconds in config, using default %s.", DEFAULT_LOOP_SECONDS)
+        loop_sec = DEFAULT_LOOP_SECONDS
+    set_entry_text(entry_loop_seconds, str(loop_sec))
+
+    set_entry_text(entry_csv_filename, config.get('Settings', 'output_csv_filename'))
+    transpose_var.set(config.getboolean('Settings', 'transpose_data'))
+    sound_var.set(config.getboolean('Settings', 'play_sound_on_change'))
+
+    try:
+        vol_str = config.get('Settings', 'sound_volume')
+        vol = int(vol_str)
+        vol = max(0, min(100, vol)) # Clamp between 0 and 100
+    except (ValueError, configparser.NoOptionError, configparser.NoSectionError):
+        logger.warning("Invalid or missing sound_volume in config, using default %s.", DEFAULT_SOUND_VOLUME)
+        vol = DEFAULT_SOUND_VOLUME
+    volume_var.set(float(vol))
+    update_volume_label() # Update label based on initial value
+
+    vmix_api_enabled_var.set(config.getboolean('Settings', 'vmix_api_enabled'))
+    set_entry_text(entry_vmix_header, config.get('Settings', 'vmix_api_header'))
+
 # --- Initialization ---
 # initialize_app remains unchanged
 def initialize_app():
     """Loads config and populates the GUI."""
-    global config # Ensure we're using the global config object
+    global config, engine, shown_inputs # Ensure we're using the global config object
 
     load_config() # Loads or creates config, applies defaults
+    engine = create_engine()
     initialize_pygame_mixer() # Attempt mixer init early
+    start_metrics_outputs()
+    start_webhook_receiver()
+    install_profiling_signal_handlers()
+    start_ui_updates()
+    start_config_watch()
 
     try:
-        entry_spreadsheet_id.insert(0, config.get('Settings', 'spreadsheet_id'))
-        entry_worksheet_name.insert(0, config.get('Settings', 'worksheet_name'))
-        for i, entry in enumerate(api_key_entries, 1):
-            key = config.get('Settings', f'api_key_{i}')
-            entry.insert(0, key)
-            if key: entry.config(show='*')
-            else: entry.config(show='')
-
-        try:
-            loop_sec_str = config.get('Settings', 'loop_seconds')
-            loop_sec = float(loop_sec_str)
-            if loop_sec <= 0: loop_sec = DEFAULT_LOOP_SECONDS
-        except (ValueError, configparser.NoOptionError, configparser.NoSectionError):
-            logger.warning(f"Invalid or missing loop_seconds in config, using default {DEFAULT_LOOP_SECONDS}.")
-            loop_sec = DEFAULT_LOOP_SECONDS
-        entry_loop_seconds.insert(0, str(loop_sec))
-
-        entry_csv_filename.insert(0, config.get('Settings', 'output_csv_filename'))
-        transpose_var.set(config.getboolean('Settings', 'transpose_data'))
-        sound_var.set(config.getboolean('Settings', 'play_sound_on_change'))
-
-        try:
-            vol_str = config.get('Settings', 'sound_volume')
-            vol = int(vol_str)
-            vol = max(0, min(100, vol)) # Clamp between 0 and 100
-        except (ValueError, configparser.NoOptionError, configparser.NoSectionError):
-            logger.warning(f"Invalid or missing sound_volume in config, using default {DEFAULT_SOUND_VOLUME}.")
-            vol = DEFAULT_SOUND_VOLUME
-        volume_var.set(float(vol))
-        update_volume_label() # Update label based on initial value
-
-        vmix_api_enabled_var.set(config.getboolean('Settings', 'vmix_api_enabled'))
-        entry_vmix_header.insert(0, config.get('Settings', 'vmix_api_header'))
-
+        populate_inputs_from_config()
+        shown_inputs = gui_input_values()
         set_status_based_on_inputs() # Sets READY/NOT READY and calls update_ui_element_states
 
     except tk.TclError as e:
-         logger.error(f"Error initializing GUI elements (TclError): {e}")
+         logger.error("Error initializing GUI elements (TclError): %s", e)
     except Exception as e:
-        logger.critical(f"Fatal error during application initialization: {e}", exc_info=True)
+        logger.critical("Fatal error during application initialization: %s", e, exc_info=True)
         try: # Try to show error before exiting
             messagebox.showerror("Initialization Error", f"Failed to initialize application:\n{e}\n\nCheck log for details.")
         except tk.TclError: pass # Ignore if GUI failed even for messagebox
@@ -1218,35 +1329,48 @@ def initialize_app():
 # on_closing remains unchanged
 def on_closing():
     """Handles window close event."""
-    global is_running, revert_status_job_id
+    global is_running, revert_status_job_id, ui_pump_job_id, config_watch_job_id
     logger.info("Window close requested.")
     if revert_status_job_id:
         try:
             root.after_cancel(revert_status_job_id)
-            logger.debug(f"Cancelled pending status revert job {revert_status_job_id} during closing.")
+            logger.debug("Cancelled pending status revert job %s during closing.", revert_status_job_id)
             revert_status_job_id = None
         except (tk.TclError, ValueError): pass # Ignore errors on cancel during shutdown
 
     if is_running:
         logger.info("Signaling loop and threads to stop...")
         is_running = False # Prevent new loop iterations
-        stop_event.set() # Signal waiting threads/loop sleep
-        if loop_thread and loop_thread.is_alive():
-            logger.info("Waiting briefly for main loop thread to join...")
-            loop_thread.join(timeout=0.5) # Give loop thread a moment to exit cleanly
-
+        engine.stop() # Signal waiting threads/loop sleep
+        logger.info("Waiting briefly for main loop thread to join...")
+        engine.join(timeout=0.5) # Give loop thread a moment to exit cleanly
+    engine.close()
+
+    stop_sound_worker()
+    stop_metrics_outputs()
+    stop_webhook_receiver()
+    if ui_pump_job_id:
+        try:
+            root.after_cancel(ui_pump_job_id)
+        except (tk.TclError, ValueError): pass # Ignore errors on cancel during shutdown
+        ui_pump_job_id = None
+    if config_watch_job_id:
+        try:
+            root.after_cancel(config_watch_job_id)
+        except (tk.TclError, ValueError): pass
+        config_watch_job_id = None
     if pygame_mixer_initialized:
         try:
             pygame.mixer.stop()
             pygame.mixer.quit()
             logger.info("Pygame mixer stopped and quit.")
-        except Exception as pg_quit_err: logger.error(f"Error during pygame mixer quit: {pg_quit_err}")
+        except Exception as pg_quit_err: logger.error("Error during pygame mixer quit: %s", pg_quit_err)
 
     logger.info("Destroying root window.")
     try:
         root.destroy()
     except tk.TclError as e:
-        logger.error(f"Error destroying root window (may already be destroyed): {e}")
+        logger.error("Error destroying root window (may already be destroyed): %s", e)
     logger.info("Application shutdown sequence finished.")
 
 
@@ -1259,12 +1383,12 @@ if __name__ == "__main__":
         root.mainloop()
     except tk.TclError as e:
         if "invalid command name" not in str(e):
-             logger.critical(f"Unhandled TclError in main execution scope: {e}", exc_info=True)
+             logger.critical("Unhandled TclError in main execution scope: %s", e, exc_info=True)
              app_exit_code = 1
         else:
-            logger.warning(f"Ignoring TclError likely related to widget destruction during exit: {e}")
+            logger.warning("Ignoring TclError likely related to widget destruction during exit: %s", e)
     except Exception as main_err:
-         logger.critical(f"Unhandled exception in main execution scope: {main_err}", exc_info=True)
+         logger.critical("Unhandled exception in main execution scope: %s", main_err, exc_info=True)
          app_exit_code = 1
          try:
              if root and root.winfo_exists():
@@ -1273,5 +1397,6 @@ if __name__ == "__main__":
              print(f"FATAL ERROR (GUI unavailable): {main_err}") # Fallback to console
     finally:
         logger.info("Application exited.")
+        stop_log_output() # Flush queued log records before the interpreter exits
         # import sys
         # sys.exit(app_exit_code)
@@ -2,8 +2,9 @@ import threading
 import time
 import tkinter as tk
 import configparser
-import pandas as pd
 import requests
+from sheets_core.exporter import LegacyExporter
+from sheets_core.http_fetch import PooledValuesFetcher, SHEETS_API_BASE_URL
 
 
 # Libraries used:
@@ -11,6 +12,11 @@ import requests
 # pandas: pip install pandas
 # tkinter: pip install tkinter
 
+# Google Sheets API root is SHEETS_API_BASE_URL; override with api_base_url in config.ini
+# (e.g. benchmarks/mock_sheets_server.py)
+# Log the per-API-key request counters every this many ticks
+KEY_STATS_LOG_EVERY = 60
+
 class SheetsExtractProgram:
 
     # this dunder always starts as soon as the class is called/instantiated
@@ -26,12 +32,12 @@ class SheetsExtractProgram:
         self.api_key_5 = ""
         self.seconds = 1
         self.filename = ""
+        self.api_base_url = SHEETS_API_BASE_URL
         self.threadRunning = False
         self.errorMessage = None
         self.thread = None
         self.config_file = "config.ini"
         self.config = configparser.ConfigParser()
-        self.api_key_index = 0
 
         # load config file or set config file if it doesn't exist
         try:
@@ -65,6 +71,12 @@ class SheetsExtractProgram:
 
             with open(self.config_file, 'w') as configfile:
                 self.config.write(configfile)
+        # optional, not written to config.ini unless added by hand
+        self.api_base_url = self.config.get('MAIN', 'api_base_url', fallback=SHEETS_API_BASE_URL).rstrip('/')
+        # one pooled keep-alive session for every request; request_timeout / tick_deadline are optional too
+        self.fetcher = PooledValuesFetcher.from_config(self.config, 'MAIN', self.api_base_url)
+        self.exporter = LegacyExporter(self.fetcher) # Skips the rewrite when the sheet has not changed
+        self.fetch_count = 0
 
         # Create the GUI with the text boxes, buttons and status box
         self.window = tk.Tk()
@@ -213,7 +225,7 @@ class SheetsExtractProgram:
         with open(self.config_file, 'w') as configfile:
             self.config.write(configfile)
 
-    # Define a function to get the sheet data and transpose it using the pandas library
+    # Define a function to get the sheet data and write it transposed (see sheets_core.pipeline.legacy_rows)
     def get_sheet_data(self):
     # Filter out empty API keys
         valid_api_keys = [key for key in [self.api_key_1, self.api_key_2, self.api_key_3, self.api_key_4, self.api_key_5] if key]
@@ -223,37 +235,27 @@ class SheetsExtractProgram:
             self.log("No valid API keys provided")
             return
 
-        api_key_index = getattr(self, 'api_key_index', 0)  # get the current index, or 0 if it doesn't exist
-
+        self.fetch_count += 1
+        if self.fetch_count % KEY_STATS_LOG_EVERY == 0:
+            self.log(f"API key stats: {self.fetcher.stats_summary()}")
         try:
-            # Get the next API key from the list
-            api_key = valid_api_keys[api_key_index % len(valid_api_keys)]
-            self.api_key_index = api_key_index + 1  # increment the index for the next call
-
-            response = requests.get(
-                f"https://sheets.googleapis.com/v4/spreadsheets/{self.spreadsheet_id}/values/{self.worksheet}"
-                f"?key={api_key}", timeout=2)
-            response.raise_for_status()
-            data = response.json()
-            rows = data["values"]
-            rows.pop(0)
-            tmp = {k[0]: k[1:] for k in rows}
-            tmp = pd.DataFrame.from_dict(tmp, orient='index')
-            tmp = tmp.transpose()
-            tmp.to_csv(self.filename + ".csv", index=False,
-                   encoding="utf-8")  # Changed to use the filename variable as the output file name
+            # Start with the next API key in rotation; a failed key fails over to the next one in this same tick
+            written, api_key = self.exporter.export(self.spreadsheet_id, self.worksheet, valid_api_keys,
+                                                    self.filename + ".csv",  # Changed to use the filename variable as the output file name
+                                                    on_failover=self.log_failover)
             self.error_message = ""
             # Log the success message
-            self.log(
-            f"Successfully wrote to {self.filename}.csv using API Key: {api_key}")  # Changed to show the filename in the log message
-        except requests.exceptions.ConnectionError:
-            # Log the connection error message
-            self.log(f"Connection error While using {api_key}. Moving on to the next API key.")
-            time.sleep(1)
+            if written:
+                self.log(
+                f"Successfully wrote to {self.filename}.csv using API Key: {api_key}")  # Changed to show the filename in the log message
+            else:
+                self.log(f"No change, kept {self.filename}.csv using API Key: {api_key}")
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            # Every key failed (or the tick deadline passed); the next tick starts over
+            self.log(f"Connection error on every API key: {e}")
         except requests.exceptions.HTTPError as e:
             # Log the HTTP error message
             self.log(f"HTTP Error: {e}")
-            time.sleep(1)
         except PermissionError as e:
             # Log and show the permission error message
             self.error_message = "CANNOT WRITE TO DISK, FILE IN USE"
@@ -265,6 +267,10 @@ class SheetsExtractProgram:
             time.sleep(1)
 
 
+    # Define a function to log a key that failed before the fetcher moves on to the next one
+    def log_failover(self, api_key, error):
+        self.log(f"{type(error).__name__} While using {api_key}. Moving on to the next API key.")
+
     def export_thread(self):
 
         while self.threadRunning:
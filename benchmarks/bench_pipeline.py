@@ -0,0 +1,258 @@
+"""
+Microbenchmarks for the fetch-to-CSV processing stages of all three front ends.
+
+Runs without Tk windows or network access on recorded and synthetic 'values'
+payloads (see payloads.py) and reports median/min time and peak traced memory
+per (case, target, stage):
+
+    sheets_tool  - the stages SheetsEngine runs for SHEETS_TOOL_3.0.py: values_digest, build_snapshot
+                   (cold, and next to the previous snapshot with one cell changed), diff, write_snapshot_csv
+                   (transposed), read_csv (vMix); next to the pandas stages they replaced (build_dataframe,
+                   pandas_diff, transpose, to_csv). Every case first checks both write identical bytes.
+    legacy       - the stages LegacyExporter runs for program.py and Sheets_Program_5_key.py:
+                   values_digest, legacy_rows, write_legacy_csv, next to the pandas transform they replaced
+                   (pandas_transform, pandas_to_csv). Every case first checks both write identical bytes.
+
+Usage:
+    python benchmarks/bench_pipeline.py                         # print results
+    python benchmarks/bench_pipeline.py --json baseline.json    # save results
+    python benchmarks/bench_pipeline.py --baseline baseline.json --threshold 0.25
+        # exits with status 1 if any stage got more than 25% slower or larger than the baseline
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+import pandas as pd # noqa: E402
+
+from sheets_core import pipeline # noqa: E402
+from sheets_core.snapshot import build_snapshot, write_snapshot_csv # noqa: E402
+from benchmarks import payloads # noqa: E402
+
+DEFAULT_REPEATS = 5
+DEFAULT_THRESHOLD = 0.25 # Allowed fractional slowdown / memory growth vs the baseline
+DEFAULT_MIN_MS = 0.5 # Timings below this are too noisy to flag as regressions
+
+
+def load_legacy_program(filename, module_name):
+    """Imports a legacy entry script as a module (its GUI only starts under __main__)."""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(REPO_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.SheetsExtractProgram
+
+
+def changed_copy(values):
+    """A freshly parsed copy of values (new string objects, as after a fetch) with its last cell changed."""
+    fresh = json.loads(json.dumps(values))
+    if len(fresh) > 1 and fresh[-1]:
+        fresh[-1][-1] = fresh[-1][-1] + '*'
+    return fresh
+
+
+def check_snapshot_output(values, csv_path):
+    """Raises AssertionError unless write_snapshot_csv writes the same bytes as the pandas stages, both ways."""
+    current_data, _ = pipeline.build_dataframe(values)
+    for transpose in (False, True):
+        pipeline.write_output_csv(pipeline.prepare_output(current_data, transpose), csv_path)
+        with open(csv_path, 'rb') as f:
+            expected = f.read()
+        write_snapshot_csv(build_snapshot(values), csv_path, transpose)
+        with open(csv_path, 'rb') as f:
+            assert f.read() == expected, "write_snapshot_csv output differs from the pandas stages"
+
+
+def sheets_tool_stages(values, tmp_dir):
+    """Stages of SheetsEngine's run_loop and vMix thread, and the pandas stages they replaced, as (stage, setup, fn)."""
+    csv_path = os.path.join(tmp_dir, 'sheets_tool.csv')
+    check_snapshot_output(values, csv_path)
+    snapshot = build_snapshot(values)
+    previous_snapshot = build_snapshot(json.loads(json.dumps(values))) # Unchanged data: the common tick, full comparison
+    write_snapshot_csv(snapshot, csv_path, True)
+    current_data, _ = pipeline.build_dataframe(values)
+    previous_data = current_data.copy()
+    df_to_write = pipeline.prepare_output(current_data, True)
+    return [
+        ('values_digest', None, lambda _: pipeline.values_digest(values)),
+        ('build_snapshot', None, lambda _: build_snapshot(values)),
+        ('build_snapshot_reuse', lambda: changed_copy(values), lambda fresh: build_snapshot(fresh, snapshot)),
+        ('diff', None, lambda _: snapshot != previous_snapshot),
+        ('write_snapshot_csv', None, lambda _: write_snapshot_csv(snapshot, csv_path, True)),
+        ('read_csv', None, lambda _: pipeline.read_output_csv(csv_path)),
+        ('build_dataframe', None, lambda _: pipeline.build_dataframe(values)),
+        ('pandas_diff', None, lambda _: pipeline.data_changed(current_data, previous_data)),
+        ('transpose', None, lambda _: pipeline.prepare_output(current_data, True)),
+        ('to_csv', None, lambda _: pipeline.write_output_csv(df_to_write, csv_path)),
+    ]
+
+
+def pandas_transform(rows):
+    """The transform program.py / Sheets_Program_5_key.py ran before legacy_rows (pops the header row)."""
+    rows.pop(0)
+    tmp = {k[0]: k[1:] for k in rows}
+    tmp = pd.DataFrame.from_dict(tmp, orient='index')
+    return tmp.transpose()
+
+
+def check_legacy_output(values, csv_path):
+    """Raises AssertionError unless write_legacy_csv writes the same bytes as the pandas transform."""
+    expected = io.BytesIO()
+    pandas_transform(list(values)).to_csv(expected, index=False, encoding="utf-8")
+    pipeline.write_legacy_csv(pipeline.legacy_rows(values), csv_path)
+    with open(csv_path, 'rb') as f:
+        assert f.read() == expected.getvalue(), "legacy_rows output differs from the pandas transform"
+
+
+def legacy_stages(values, tmp_dir):
+    """Stages of a legacy get_sheet_data (LegacyExporter) and of the pandas transform, as (stage, setup, fn)."""
+    csv_path = os.path.join(tmp_dir, 'legacy.csv')
+    try:
+        check_legacy_output(values, csv_path)
+        rows = pipeline.legacy_rows(values)
+        frame = pandas_transform(list(values))
+    except IndexError:
+        rows = frame = None # Both fail on this payload; reported by their own stages
+    stages = [
+        ('values_digest', None, lambda _: pipeline.values_digest(values)),
+        ('legacy_rows', None, lambda _: pipeline.legacy_rows(values)),
+        # pandas_transform pops the header row, so every run gets a fresh outer list
+        ('pandas_transform', lambda: list(values), pandas_transform),
+    ]
+    if rows is not None:
+        stages.append(('write_legacy_csv', None, lambda _: pipeline.write_legacy_csv(rows, csv_path)))
+        stages.append(('pandas_to_csv', None, lambda _: frame.to_csv(csv_path, index=False, encoding="utf-8")))
+    return stages
+
+
+def measure(fn, setup, repeats):
+    """Times fn over `repeats` runs after one warm-up, then measures peak traced memory of one more run."""
+    fn(setup() if setup else None) # Warm-up, and surfaces errors before timing
+    times = []
+    for _ in range(repeats):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    try:
+        fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_ms': statistics.median(times) * 1000,
+        'min_ms': min(times) * 1000,
+        'peak_kib': peak / 1024,
+    }
+
+
+def run(repeats, sizes, name_filter=None):
+    """
+    Runs every stage on every case.
+
+    Returns:
+        dict: 'case/target/stage' -> result dict (or {'error': '...'} if the stage raised).
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='sheets_bench_') as tmp_dir:
+        for case, values in payloads.all_cases(sizes).items():
+            stage_sets = [
+                ('sheets_tool', lambda: sheets_tool_stages(values, tmp_dir)),
+                ('legacy', lambda: legacy_stages(values, tmp_dir)),
+            ]
+            for target, make_stages in stage_sets:
+                for stage, setup, fn in make_stages():
+                    name = f"{case}/{target}/{stage}"
+                    if name_filter and name_filter not in name:
+                        continue
+                    try:
+                        results[name] = measure(fn, setup, repeats)
+                    except Exception as e:
+                        results[name] = {'error': type(e).__name__}
+    return results
+
+
+def compare(results, baseline, threshold, min_ms):
+    """Returns a list of regression descriptions for results worse than baseline by more than threshold."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or 'error' in result or 'error' in base:
+            continue
+        if result['median_ms'] >= min_ms and result['median_ms'] > base['median_ms'] * (1 + threshold):
+            regressions.append(f"{name}: median {base['median_ms']:.3f} -> {result['median_ms']:.3f} ms")
+        if result['peak_kib'] > base['peak_kib'] * (1 + threshold) and result['peak_kib'] - base['peak_kib'] > 64:
+            regressions.append(f"{name}: peak {base['peak_kib']:.1f} -> {result['peak_kib']:.1f} KiB")
+    return regressions
+
+
+def print_table(results, baseline=None):
+    print(f"{'case/target/stage':<48} {'median ms':>10} {'min ms':>10} {'peak KiB':>10} {'vs base':>8}")
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"{name:<48} {'error: ' + result['error']:>32}")
+            continue
+        delta = ""
+        base = (baseline or {}).get(name)
+        if base and 'error' not in base and base['median_ms'] > 0:
+            delta = f"{(result['median_ms'] / base['median_ms'] - 1) * 100:+.0f}%"
+        print(f"{name:<48} {result['median_ms']:>10.3f} {result['min_ms']:>10.3f} {result['peak_kib']:>10.1f} {delta:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fetch-to-CSV processing stages.")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help="Timed runs per stage (default %(default)s)")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in payloads.SYNTHETIC_SIZES),
+                        help="Comma separated synthetic sheet sizes in cells (default %(default)s)")
+    parser.add_argument('--filter', dest='name_filter', help="Only run stages whose case/target/stage name contains this")
+    parser.add_argument('--json', dest='json_path', help="Write results to this JSON file (use as a later --baseline)")
+    parser.add_argument('--baseline', help="Compare against results saved with --json")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Fractional slowdown/memory growth that counts as a regression (default %(default)s)")
+    parser.add_argument('--min-ms', type=float, default=DEFAULT_MIN_MS,
+                        help="Ignore timing regressions on stages faster than this (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR) # Per-row truncation warnings would swamp the output
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    results = run(args.repeats, sizes, args.name_filter)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
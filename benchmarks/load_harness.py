@@ -0,0 +1,285 @@
+"""
+End-to-end load harness: runs a polling loop against benchmarks/mock_sheets_server.py
+for N minutes and reports what a show machine would see.
+
+Targets:
+    sheets_tool  - the SheetsEngine SHEETS_TOOL_3.0.py runs, without its window
+    program      - program.py's SheetsExtractProgram.export_thread, without its window
+    five_key     - Sheets_Program_5_key.py's export_thread, without its window
+
+Reports achieved tick rate, change-to-disk latency (time from a mock data mutation
+until the output CSV contains it), requests/errors per key, and thread/RSS growth.
+
+    python benchmarks/load_harness.py --target sheets_tool --minutes 2 --interval 1 --keys 3 \
+        --latency-ms 150 --jitter-ms 50 --rate-429 0.02 --rate-5xx 0.01 --mutate-every 3
+"""
+
+import argparse
+import collections
+import contextlib
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from benchmarks import payloads # noqa: E402
+from benchmarks.bench_pipeline import load_legacy_program # noqa: E402
+from benchmarks.mock_sheets_server import MockSheetsServer, MARKER_PREFIX # noqa: E402
+from sheets_core.engine import SheetsEngine, THREAD_TIMEOUT_SECONDS # noqa: E402
+from sheets_core.exporter import LegacyExporter # noqa: E402
+from sheets_core.metrics import ALL_KEYS_LABEL # noqa: E402
+from sheets_core.http_fetch import PooledValuesFetcher # noqa: E402
+from sheets_core.run_config import RunConfig # noqa: E402
+from sheets_core.webhook import WebhookReceiver # noqa: E402
+
+CSV_POLL_SECONDS = 0.005
+SAMPLE_SECONDS = 1.0
+TAB = 'LoadTest'
+MARKER_RE = re.compile(re.escape(MARKER_PREFIX) + r'(\d+)')
+
+
+def rss_bytes():
+    """Current resident set size from /proc (Linux), or None elsewhere."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def start_sheets_tool_engine(server, keys, interval, transpose, csv_base, stream_values=False, chunk_rows=0,
+                             push_interval=0.0):
+    """
+    Starts a headless SheetsEngine the way toggle_loop does, without sound or vMix.
+
+    With push_interval > 0 the mock's mutations are announced to a WebhookReceiver (returned
+    second, else None) and the engine only polls every push_interval seconds on its own.
+    """
+    engine = SheetsEngine()
+    engine.tick_summary = True # One log line per tick, like log_tick_summary = true
+    receiver = None
+    if push_interval > 0:
+        receiver = WebhookReceiver(engine.notify_change, 0)
+        receiver.start()
+        server.notify_url = receiver.url
+    engine.start(RunConfig(spreadsheet_id=server.spreadsheet_id, worksheet_name=TAB, api_keys=tuple(keys),
+                           loop_interval=interval, csv_filename=csv_base, transpose=transpose,
+                           play_sound=False, sound_file='', sound_volume=0,
+                           vmix_api_enabled=False, vmix_api_header='', sheets_api_base_url=server.base_url,
+                           stream_values=stream_values, chunk_rows=chunk_rows, push_interval=push_interval))
+    return engine, receiver
+
+
+def engine_counters(engine, counters):
+    """Adds the engine's tick/write/timeout/error counts (from its stage metrics) to counters."""
+    stage_counts = {row['stage']: row['count'] for row in engine.stage_metrics.snapshot() if row['api_key'] == ALL_KEYS_LABEL}
+    counters['ticks'] += stage_counts.get('tick', 0)
+    counters['writes'] += stage_counts.get('csv_write', 0)
+    counters['timeouts'] += stage_counts.get('fetch_timeout', 0)
+    counters['fetch_errors'] += stage_counts.get('fetch_failed', 0)
+
+
+def start_legacy_program(target, server, keys, interval, csv_base, counters):
+    """Creates a legacy SheetsExtractProgram without running __init__ (which builds the window) and starts export_thread."""
+    filename = 'program.py' if target == 'program' else 'Sheets_Program_5_key.py'
+    program_class = load_legacy_program(filename, f"legacy_{target}")
+    program = program_class.__new__(program_class)
+    program.error_message = ""
+    program.spreadsheet_id = server.spreadsheet_id
+    program.worksheet = TAB
+    program.seconds = interval
+    program.filename = csv_base
+    program.api_base_url = server.base_url.rstrip('/')
+    program.api_key = keys[0]
+    for i in range(1, 6):
+        setattr(program, f"api_key_{i}", keys[i - 1] if i <= len(keys) else "")
+    program.fetcher = PooledValuesFetcher(program.api_base_url)
+    program.exporter = LegacyExporter(program.fetcher)
+    program.fetch_count = 0
+    program.log = print # program.py's log() writes to its Tk text widget
+
+    get_sheet_data = program.get_sheet_data
+
+    def counted_get_sheet_data():
+        get_sheet_data()
+        counters['ticks'] += 1
+    program.get_sheet_data = counted_get_sheet_data
+
+    program.threadRunning = True
+    program.thread = threading.Thread(target=program.export_thread, daemon=True, name="LegacyExportThread")
+    program.thread.start()
+    return program
+
+
+def watch_output(csv_path, server, stop_event, latencies):
+    """Polls the output CSV and records how long each mutation took to reach it."""
+    seen = set()
+    last_signature = None
+    while not stop_event.is_set():
+        try:
+            st = os.stat(csv_path)
+            signature = (st.st_mtime_ns, st.st_size)
+            if signature != last_signature:
+                last_signature = signature
+                with open(csv_path, encoding='utf-8') as f:
+                    text = f.read()
+                now = time.monotonic()
+                for match in MARKER_RE.finditer(text):
+                    seq = int(match.group(1))
+                    mutated_at = server.spreadsheet.mutation_times.get(seq)
+                    if seq not in seen and mutated_at is not None:
+                        seen.add(seq)
+                        latencies.append(now - mutated_at)
+        except (OSError, UnicodeDecodeError):
+            pass # Not written yet, or caught mid-write
+        time.sleep(CSV_POLL_SECONDS)
+
+
+def sample_resources(stop_event, samples):
+    while True:
+        samples.append((threading.active_count(), rss_bytes()))
+        if stop_event.wait(SAMPLE_SECONDS):
+            break
+
+
+def run(args):
+    if args.recorded:
+        with open(args.recorded, encoding='utf-8') as f:
+            values = json.load(f).get('values', [])
+    else:
+        values = payloads.synthetic_values(args.cells)
+    server = MockSheetsServer({TAB: values}, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              row_latency_ms=args.row_latency_ms,
+                              rate_429=args.rate_429, rate_5xx=args.rate_5xx,
+                              quota_per_minute=args.quota_per_minute, mutate_every=args.mutate_every).start()
+    keys = [f"mock-key-{i + 1:04d}" for i in range(args.keys)]
+    out_dir = args.out_dir or tempfile.mkdtemp(prefix='sheets_load_')
+    csv_base = os.path.join(out_dir, f"output_{args.target}")
+    csv_path = csv_base + ".csv"
+
+    counters = collections.Counter()
+    latencies = []
+    samples = []
+    stop_event = threading.Event()
+    helpers = [
+        threading.Thread(target=watch_output, args=(csv_path, server, stop_event, latencies), daemon=True, name="OutputWatcher"),
+        threading.Thread(target=sample_resources, args=(stop_event, samples), daemon=True, name="ResourceSampler"),
+    ]
+    for thread in helpers:
+        thread.start()
+
+    duration = args.minutes * 60.0
+    start = time.monotonic()
+    quiet = open(os.devnull, 'w') if not args.verbose else None
+    with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+        if args.target == 'sheets_tool':
+            engine, receiver = start_sheets_tool_engine(server, keys, args.interval, args.transpose, csv_base,
+                                                        args.stream, args.chunk_rows, args.push_interval)
+            stop_event.wait(duration)
+            engine.stop()
+            if receiver:
+                receiver.stop()
+            stop_event.set()
+            engine.join(timeout=THREAD_TIMEOUT_SECONDS + args.interval)
+            engine_counters(engine, counters)
+        else:
+            program = start_legacy_program(args.target, server, keys, args.interval, csv_base, counters)
+            stop_event.wait(duration)
+            program.threadRunning = False
+            stop_event.set()
+            program.thread.join(timeout=THREAD_TIMEOUT_SECONDS + args.interval)
+    elapsed = time.monotonic() - start
+    if quiet:
+        quiet.close()
+    for thread in helpers:
+        thread.join(timeout=1.0)
+    server.stop()
+
+    return {
+        'target': args.target,
+        'seconds': elapsed,
+        'interval': args.interval,
+        'ticks': counters['ticks'],
+        'tick_rate': counters['ticks'] / elapsed if elapsed else 0.0,
+        'writes': counters['writes'],
+        'timeouts': counters['timeouts'],
+        'fetch_errors': counters['fetch_errors'],
+        'mutations': server.spreadsheet.mutation_seq,
+        'latencies_ms': sorted(l * 1000 for l in latencies),
+        'keys': {key: dict(stats) for key, stats in sorted(server.key_stats.items())},
+        'threads': [s[0] for s in samples],
+        'rss': [s[1] for s in samples if s[1] is not None],
+        'output': csv_path,
+    }
+
+
+def print_report(report):
+    print(f"Target: {report['target']}  ran {report['seconds']:.1f}s at interval {report['interval']}s")
+    target_rate = 1.0 / report['interval'] if report['interval'] > 0 else float('inf')
+    print(f"Ticks: {report['ticks']} ({report['tick_rate']:.2f}/s, target {target_rate:.2f}/s)"
+          + (f"  writes: {report['writes']}  timeouts: {report['timeouts']}  fetch errors: {report['fetch_errors']}"
+             if report['target'] == 'sheets_tool' else ""))
+    latencies = report['latencies_ms']
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"Change-to-disk latency: {len(latencies)} of {report['mutations']} mutations reached disk; "
+              f"p50 {statistics.median(latencies):.0f} ms, p95 {p95:.0f} ms, max {latencies[-1]:.0f} ms")
+    else:
+        print(f"Change-to-disk latency: none of {report['mutations']} mutations reached disk")
+    print("Quota spent per key:")
+    for key, stats in report['keys'].items():
+        errors = ", ".join(f"{count}x {status}" for status, count in sorted(stats.items()) if status not in ('requests', 'ok'))
+        print(f"  ...{key[-4:]}: {stats.get('requests', 0)} requests, {stats.get('ok', 0)} ok" + (f", {errors}" if errors else ""))
+    threads = report['threads']
+    if threads:
+        print(f"Threads: start {threads[0]}, end {threads[-1]}, max {max(threads)}")
+    rss = report['rss']
+    if rss:
+        print(f"RSS: start {rss[0] / 2**20:.1f} MiB, end {rss[-1] / 2**20:.1f} MiB "
+              f"({(rss[-1] - rss[0]) / 2**20:+.1f} MiB), max {max(rss) / 2**20:.1f} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a polling loop against the mock Sheets API and report load figures.")
+    parser.add_argument('--target', choices=('sheets_tool', 'program', 'five_key'), default='sheets_tool')
+    parser.add_argument('--minutes', type=float, default=1.0)
+    parser.add_argument('--interval', type=float, default=1.0, help="Loop interval in seconds")
+    parser.add_argument('--keys', type=int, default=1, help="Number of API keys to rotate through (1-5)")
+    parser.add_argument('--transpose', action='store_true', help="Transpose before writing (sheets_tool target)")
+    parser.add_argument('--stream', action='store_true', help="Parse responses as they stream in (sheets_tool target, stream_values)")
+    parser.add_argument('--chunk-rows', type=int, default=0, help="Fetch in parallel row bands of this size (sheets_tool target, chunk_rows)")
+    parser.add_argument('--push-interval', type=float, default=0.0,
+                        help="Announce mutations to a webhook and poll only this often (sheets_tool target)")
+    parser.add_argument('--recorded', help="Serve the 'values' of this recorded JSON response")
+    parser.add_argument('--cells', type=int, default=2000, help="Size of the synthetic sheet in cells")
+    parser.add_argument('--latency-ms', type=float, default=100.0)
+    parser.add_argument('--jitter-ms', type=float, default=30.0)
+    parser.add_argument('--row-latency-ms', type=float, default=0.0, help="Extra mock latency per 1000 rows returned")
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-5xx', type=float, default=0.0)
+    parser.add_argument('--quota-per-minute', type=int, default=60, help="Per-key quota (Google's default is 60 reads/min)")
+    parser.add_argument('--mutate-every', type=float, default=3.0)
+    parser.add_argument('--out-dir', help="Directory for the output CSV (default: a temporary directory)")
+    parser.add_argument('--json', dest='json_path', help="Also write the report to this JSON file")
+    parser.add_argument('--verbose', action='store_true', help="Let the legacy scripts print their log lines")
+    args = parser.parse_args(argv)
+    args.keys = max(1, min(5, args.keys))
+
+    report = run(args)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,398 @@
+"""
+Local stand-in for the Google Sheets v4 values API.
+
+Serves GET /v4/spreadsheets/<id>/values/<range>, /v4/spreadsheets/<id>/values:batchGet
+and the sheet properties of /v4/spreadsheets/<id> for one spreadsheet held in memory, with optional latency, 429s, 5xx errors,
+a per-key quota and a background thread that keeps mutating the data. With a
+notify URL it also plays the part of an Apps Script edit trigger, POSTing to
+the tool's webhook (sheets_core.webhook) after every mutation.
+
+Point the tools at it with a base-URL override:
+    SHEETS_TOOL_3.0.py        [Settings] sheets_api_base_url = http://127.0.0.1:8765/
+    program.py / Sheets_Program_5_key.py   [MAIN] api_base_url = http://127.0.0.1:8765
+
+Run standalone:
+    python benchmarks/mock_sheets_server.py --port 8765 --tab Scoreboard --cells 2000 \
+        --latency-ms 120 --rate-429 0.02 --rate-5xx 0.01 --mutate-every 2
+"""
+
+import argparse
+import collections
+import http.server
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from benchmarks import payloads # noqa: E402
+
+DEFAULT_SPREADSHEET_ID = 'mock-spreadsheet'
+DEFAULT_TAB = 'Sheet1'
+GRID_ROWS = 1000 # Minimum reported grid size, like a new Google Sheet
+GRID_COLUMNS = 26
+MARKER_ROW, MARKER_COLUMN = 1, 1 # Cell B2 carries 'mut-<seq>' after every mutation
+MARKER_PREFIX = 'mut-'
+
+_CELL_RE = re.compile(r'^([A-Za-z]*)(\d*)$')
+
+
+def column_index(letters):
+    """'A' -> 0, 'Z' -> 25, 'AA' -> 26."""
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + (ord(ch) - ord('A') + 1)
+    return index - 1
+
+
+def column_letters(index):
+    """0 -> 'A', 26 -> 'AA'."""
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+
+def parse_a1(range_name):
+    """
+    Parses an A1 range such as "'Tab'!A2:C10", "Tab!A:C", "Tab!3:7" or "'Tab'".
+
+    Returns:
+        tuple: (title, first_row, first_col, last_row, last_col), 0-based and inclusive,
+               with None for open-ended bounds.
+
+    Raises:
+        ValueError: If the cell part cannot be parsed.
+    """
+    title, cells = range_name, ''
+    if '!' in range_name:
+        title, cells = range_name.rsplit('!', 1)
+    if len(title) >= 2 and title[0] == "'" and title[-1] == "'":
+        title = title[1:-1].replace("''", "'")
+    if not cells:
+        return title, 0, 0, None, None
+
+    bounds = []
+    for part in cells.split(':', 1):
+        match = _CELL_RE.match(part)
+        if not match or not part:
+            raise ValueError(f"Unable to parse range: {range_name}")
+        letters, digits = match.groups()
+        bounds.append((int(digits) - 1 if digits else None, column_index(letters) if letters else None))
+    if len(bounds) == 1: # Single cell
+        bounds.append(bounds[0])
+    (r0, c0), (r1, c1) = bounds
+    return title, r0 or 0, c0 or 0, r1, c1
+
+
+class MockSpreadsheet:
+    """One in-memory spreadsheet: tab title -> values, plus a log of mutation times."""
+
+    def __init__(self, tabs, seed=0):
+        self.tabs = {title: [list(row) for row in values] for title, values in tabs.items()}
+        self.lock = threading.Lock()
+        self.mutation_seq = 0
+        self.mutation_times = {} # seq -> time.monotonic() when it became visible
+        self._random = random.Random(seed)
+        self.sheet_ids = {title: index * 1000003 for index, title in enumerate(self.tabs)} # First tab is 0, like Google
+
+    def grid_size(self, title):
+        """(rows, columns) of the tab's grid: at least GRID_ROWS x GRID_COLUMNS, grown to fit the data."""
+        values = self.tabs[title]
+        return max(GRID_ROWS, len(values)), max([GRID_COLUMNS] + [len(row) for row in values])
+
+    def metadata(self):
+        """The 'sheets' list of a spreadsheets.get response (properties only)."""
+        with self.lock:
+            sheets = []
+            for index, title in enumerate(self.tabs):
+                rows, columns = self.grid_size(title)
+                sheets.append({'properties': {'sheetId': self.sheet_ids[title], 'title': title, 'index': index,
+                                              'sheetType': 'GRID',
+                                              'gridProperties': {'rowCount': rows, 'columnCount': columns}}})
+            return sheets
+
+    def read(self, range_name):
+        """Returns (resolved A1 range, values) for range_name, trimmed like the real API."""
+        title, r0, c0, r1, c1 = parse_a1(range_name)
+        with self.lock:
+            if title not in self.tabs:
+                raise KeyError(title)
+            grid_rows, grid_columns = self.grid_size(title)
+            rows = self.tabs[title][r0:None if r1 is None else r1 + 1]
+            values = []
+            for row in rows:
+                cells = list(row[c0:None if c1 is None else c1 + 1])
+                while cells and cells[-1] == '':
+                    cells.pop() # The API omits trailing empty cells
+                values.append(cells)
+        while values and not values[-1]:
+            values.pop() # ...and trailing empty rows
+        last_row = grid_rows - 1 if r1 is None else r1
+        last_col = grid_columns - 1 if c1 is None else c1
+        a1 = f"{column_letters(c0)}{r0 + 1}:{column_letters(last_col)}{last_row + 1}"
+        quoted = title.replace("'", "''")
+        return f"'{quoted}'!{a1}", values
+
+    def rename(self, old_title, new_title):
+        """Renames a tab; its sheet ID stays the same, as in Google Sheets."""
+        with self.lock:
+            self.tabs = {new_title if title == old_title else title: values for title, values in self.tabs.items()}
+            self.sheet_ids[new_title] = self.sheet_ids.pop(old_title)
+
+    def mutate(self, title=None):
+        """Writes a new marker into B2 of the tab (first tab by default) and changes one random cell."""
+        with self.lock:
+            title = title or next(iter(self.tabs))
+            values = self.tabs[title]
+            while len(values) <= MARKER_ROW:
+                values.append([])
+            for row in values:
+                while len(row) <= MARKER_COLUMN:
+                    row.append('')
+            self.mutation_seq += 1
+            values[MARKER_ROW][MARKER_COLUMN] = f"{MARKER_PREFIX}{self.mutation_seq}"
+            if len(values) > 2:
+                row = values[self._random.randrange(2, len(values))]
+                if len(row) > 1:
+                    row[self._random.randrange(1, len(row))] = str(self._random.randint(0, 999))
+            self.mutation_times[self.mutation_seq] = time.monotonic()
+            return self.mutation_seq
+
+
+class _SheetsRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # Keep-alive, like the real endpoint
+
+    def do_GET(self):
+        server = self.server.mock
+        parsed = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(parsed.query)
+        api_key = (query.get('key') or [''])[0]
+        server.wait_latency()
+
+        status, body = server.check_errors(api_key)
+        if status is None:
+            status, body = server.route(urllib.parse.unquote(parsed.path), query)
+            server.wait_row_latency(body)
+        server.count(api_key, status)
+        self._send_json(status, body)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.mock.verbose:
+            sys.stderr.write("[MockSheets] " + (format % args) + "\n")
+
+
+def api_error(code, status, message):
+    return code, {'error': {'code': code, 'message': message, 'status': status}}
+
+
+class MockSheetsServer:
+    """
+    Threaded HTTP server around a MockSpreadsheet with fault injection.
+
+    Args:
+        tabs (dict): tab title -> values list.
+        latency_ms / jitter_ms: Added to every response (uniform jitter of +/- jitter_ms).
+        row_latency_ms: Added per 1000 rows returned, as the real API takes longer for larger ranges.
+        rate_429 / rate_5xx: Probability of answering with a random 429 / 500-or-503.
+        quota_per_minute: Per-key request limit in any 60 s window (0 = unlimited); excess gets 429.
+        mutate_every: Seconds between automatic mutations (0 = never).
+        notify_url: POSTed to after every automatic mutation, like an edit trigger calling a webhook.
+    """
+
+    def __init__(self, tabs, spreadsheet_id=DEFAULT_SPREADSHEET_ID, host='127.0.0.1', port=0,
+                 latency_ms=0.0, jitter_ms=0.0, row_latency_ms=0.0, rate_429=0.0, rate_5xx=0.0, quota_per_minute=0,
+                 mutate_every=0.0, notify_url='', seed=0, verbose=False):
+        self.spreadsheet = MockSpreadsheet(tabs, seed)
+        self.spreadsheet_id = spreadsheet_id
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.row_latency_ms = row_latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.quota_per_minute = quota_per_minute
+        self.mutate_every = mutate_every
+        self.notify_url = notify_url
+        self.notify_errors = 0
+        self.verbose = verbose
+        self._random = random.Random(seed + 1)
+        self._stats_lock = threading.Lock()
+        self._recent = collections.defaultdict(collections.deque) # key -> request times (quota window)
+        self.key_stats = collections.defaultdict(collections.Counter) # key -> {'requests', 'ok', '429', ...}
+        self._httpd = None
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    def start(self):
+        self._httpd = http.server.ThreadingHTTPServer((self.host, self.port), _SheetsRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self.port = self._httpd.server_address[1]
+        self._stop_event.clear()
+        self._threads = [threading.Thread(target=self._httpd.serve_forever, daemon=True, name="MockSheetsServer")]
+        if self.mutate_every > 0:
+            self._threads.append(threading.Thread(target=self._mutate_loop, daemon=True, name="MockSheetsMutator"))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def _mutate_loop(self):
+        while not self._stop_event.wait(self.mutate_every):
+            self.spreadsheet.mutate()
+            if self.notify_url:
+                self.send_notification()
+
+    def send_notification(self):
+        """POSTs an edit notification to notify_url; failures are counted, not raised."""
+        request = urllib.request.Request(self.notify_url, data=b'{}', method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=2.0) as response:
+                response.read()
+        except OSError as e:
+            self.notify_errors += 1
+            if self.verbose:
+                sys.stderr.write(f"[MockSheets] Edit notification to {self.notify_url} failed: {e}\n")
+
+    # --- Request handling helpers (called from handler threads) ---
+    def wait_latency(self):
+        if self.latency_ms or self.jitter_ms:
+            delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(0.0, delay) / 1000.0)
+
+    def wait_row_latency(self, body):
+        if self.row_latency_ms and isinstance(body.get('values'), list):
+            time.sleep(len(body['values']) / 1000.0 * self.row_latency_ms / 1000.0)
+
+    def check_errors(self, api_key):
+        """Returns (status, body) for an injected or quota error, or (None, None)."""
+        if not api_key:
+            return api_error(403, 'PERMISSION_DENIED', "The request is missing a valid API key.")
+        if self.quota_per_minute:
+            now = time.monotonic()
+            with self._stats_lock:
+                recent = self._recent[api_key]
+                while recent and now - recent[0] > 60.0:
+                    recent.popleft()
+                if len(recent) >= self.quota_per_minute:
+                    return api_error(429, 'RESOURCE_EXHAUSTED', "Quota exceeded for quota metric 'Read requests' "
+                                     "and limit 'Read requests per minute per user'.")
+                recent.append(now)
+        roll = self._random.random()
+        if roll < self.rate_429:
+            return api_error(429, 'RESOURCE_EXHAUSTED', "Quota exceeded (injected).")
+        if roll < self.rate_429 + self.rate_5xx:
+            if self._random.random() < 0.5:
+                return api_error(500, 'INTERNAL', "Internal error encountered (injected).")
+            return api_error(503, 'UNAVAILABLE', "The service is currently unavailable (injected).")
+        return None, None
+
+    def route(self, path, query):
+        prefix = f"/v4/spreadsheets/{self.spreadsheet_id}"
+        if path == prefix: # spreadsheets.get; the fields mask is not applied, the response is a superset
+            return 200, {'spreadsheetId': self.spreadsheet_id, 'sheets': self.spreadsheet.metadata()}
+        if not path.startswith(prefix + '/values'):
+            return api_error(404, 'NOT_FOUND', "Requested entity was not found.")
+        rest = path[len(prefix) + len('/values'):]
+        try:
+            if rest == ':batchGet':
+                value_ranges = []
+                for range_name in query.get('ranges', []):
+                    resolved, values = self.spreadsheet.read(range_name)
+                    value_ranges.append(self._value_range(resolved, values))
+                return 200, {'spreadsheetId': self.spreadsheet_id, 'valueRanges': value_ranges}
+            if rest.startswith('/'):
+                resolved, values = self.spreadsheet.read(rest[1:])
+                return 200, self._value_range(resolved, values)
+        except (KeyError, ValueError) as e:
+            return api_error(400, 'INVALID_ARGUMENT', f"Unable to parse range: {e}")
+        return api_error(404, 'NOT_FOUND', "Requested entity was not found.")
+
+    @staticmethod
+    def _value_range(resolved, values):
+        body = {'range': resolved, 'majorDimension': 'ROWS'}
+        if values:
+            body['values'] = values # The API leaves 'values' out entirely for empty ranges
+        return body
+
+    def count(self, api_key, status):
+        with self._stats_lock:
+            stats = self.key_stats[api_key or '(none)']
+            stats['requests'] += 1
+            stats['ok' if status == 200 else str(status)] += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local mock of the Google Sheets values API.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--spreadsheet-id', default=DEFAULT_SPREADSHEET_ID)
+    parser.add_argument('--tab', default=DEFAULT_TAB, help="Worksheet name to serve")
+    parser.add_argument('--recorded', help="Serve the 'values' of this recorded JSON response instead of synthetic data")
+    parser.add_argument('--cells', type=int, default=2000, help="Size of the synthetic sheet in cells")
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--row-latency-ms', type=float, default=0.0, help="Extra latency per 1000 rows returned")
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-5xx', type=float, default=0.0)
+    parser.add_argument('--quota-per-minute', type=int, default=0, help="Per-key requests per minute (0 = unlimited)")
+    parser.add_argument('--mutate-every', type=float, default=0.0, help="Seconds between data mutations (0 = never)")
+    parser.add_argument('--notify-url', default='', help="POST here after every mutation, e.g. http://127.0.0.1:8766/notify")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args(argv)
+
+    if args.recorded:
+        with open(args.recorded, encoding='utf-8') as f:
+            values = json.load(f).get('values', [])
+    else:
+        values = payloads.synthetic_values(args.cells)
+    server = MockSheetsServer({args.tab: values}, spreadsheet_id=args.spreadsheet_id, port=args.port,
+                              latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              row_latency_ms=args.row_latency_ms, rate_429=args.rate_429,
+                              rate_5xx=args.rate_5xx, quota_per_minute=args.quota_per_minute,
+                              mutate_every=args.mutate_every, notify_url=args.notify_url, verbose=args.verbose).start()
+    print(f"Mock Sheets API at {server.base_url} (spreadsheet '{args.spreadsheet_id}', tab '{args.tab}'). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        for key, stats in sorted(server.key_stats.items()):
+            print(f"  key ...{key[-4:]}: {dict(stats)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Multicast loopback check: publishes changing tables with sheets_core.multicast on 127.0.0.1
+and checks that a MulticastReceiver on the same PC rebuilds every one of them.
+
+Each table changes --changes cells of a --rows x --columns sheet. With --drop, that share
+of the datagrams is thrown away before sending, to show the receiver skipping to the next
+keyframe. Reports the publish-to-receive latency, the datagrams and tables per table sent,
+how many tables the receiver missed, and whether its CSV ends up equal to the last table.
+
+    python benchmarks/multicast_loopback.py --tables 200 --rows 500 --columns 12
+    python benchmarks/multicast_loopback.py --drop 0.05 --keyframe-seconds 0.5
+"""
+
+import argparse
+import logging
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from sheets_core.multicast import MulticastPublisher, MulticastReceiver # noqa: E402
+from sheets_core.snapshot import build_snapshot, write_snapshot_csv # noqa: E402
+
+LOOPBACK = '127.0.0.1'
+CATCH_UP_KEYFRAMES = 5 # Repeated keyframes to wait for after the last table, for a receiver that lost datagrams
+
+
+class _DroppingSocket:
+    """Wraps the publisher's socket and loses a share of the datagrams it sends."""
+
+    def __init__(self, sock, drop, rng):
+        self.sock = sock
+        self.drop = drop
+        self.rng = rng
+        self.sent = 0
+        self.dropped = 0
+
+    def sendto(self, data, address):
+        if self.rng.random() < self.drop:
+            self.dropped += 1
+            return len(data)
+        self.sent += 1
+        return self.sock.sendto(data, address)
+
+    def close(self):
+        self.sock.close()
+
+
+def free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind((LOOPBACK, 0))
+        return sock.getsockname()[1]
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    port = args.port or free_udp_port()
+    workdir = tempfile.mkdtemp(prefix='multicast_loopback_')
+    csv_path = os.path.join(workdir, 'received.csv')
+    published = {} # Table number (in its first cell) -> time.monotonic() of publish()
+    latencies = []
+    state = {'snapshot': None}
+
+    def on_table(values, version):
+        number = int(values[1][0][1:])
+        if number in published:
+            latencies.append(time.monotonic() - published[number])
+        state['last'] = number
+        state['snapshot'] = build_snapshot(values, state['snapshot'])
+        write_snapshot_csv(state['snapshot'], csv_path)
+
+    receiver = MulticastReceiver(args.group, port, LOOPBACK, on_table)
+    receiver.start()
+    publisher = MulticastPublisher(args.group, port, interface=LOOPBACK, keyframe_seconds=args.keyframe_seconds)
+    publisher.sock = _DroppingSocket(publisher.sock, args.drop, rng)
+
+    table = [[f"Col{column}" for column in range(args.columns)]]
+    table += [[f"r{row}c{column}" for column in range(args.columns)] for row in range(args.rows)]
+    snapshot = None
+    for number in range(1, args.tables + 1):
+        table = [list(row) for row in table]
+        for _ in range(args.changes):
+            table[rng.randrange(1, args.rows + 1)][rng.randrange(1, args.columns)] = f"t{number}"
+        table[1][0] = f"t{number}"
+        snapshot = build_snapshot(table, snapshot)
+        published[number] = time.monotonic()
+        publisher.publish(snapshot)
+        time.sleep(args.interval)
+    deadline = time.monotonic() + CATCH_UP_KEYFRAMES * args.keyframe_seconds
+    while state.get('last') != args.tables and time.monotonic() < deadline:
+        time.sleep(0.01)
+    publisher.close()
+    receiver.close()
+
+    expected_path = os.path.join(workdir, 'expected.csv')
+    write_snapshot_csv(snapshot, expected_path)
+    with open(expected_path, 'rb') as f:
+        expected = f.read()
+    with open(csv_path, 'rb') if os.path.exists(csv_path) else open(os.devnull, 'rb') as f:
+        matches = f.read() == expected
+    return {'tables': args.tables, 'received': receiver.tables, 'latencies': latencies, 'matches': matches,
+            'datagrams': publisher.sock.sent, 'dropped': publisher.sock.dropped, 'lost': receiver.lost_datagrams,
+            'missed': receiver.missed_versions}
+
+
+def print_report(report):
+    print(f"Sent {report['tables']} tables in {report['datagrams'] + report['dropped']} datagrams "
+          f"({(report['datagrams'] + report['dropped']) / report['tables']:.1f} per table, {report['dropped']} dropped on purpose)")
+    print(f"Receiver: {report['received']} tables rebuilt, {report['missed']} deltas skipped until a keyframe, "
+          f"{report['lost']} datagrams detected lost by sequence number")
+    latencies = sorted(report['latencies'])
+    if latencies:
+        print(f"Publish-to-receive latency: p50 {statistics.median(latencies) * 1000:.2f} ms, "
+              f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    print("Received CSV equals the last table: " + ("yes" if report['matches'] else "NO"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--group', default='239.255.42.99')
+    parser.add_argument('--port', type=int, default=0, help="UDP port (default: a free one)")
+    parser.add_argument('--tables', type=int, default=100)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--changes', type=int, default=3, help="Cells changed per table")
+    parser.add_argument('--interval', type=float, default=0.01, help="Seconds between tables")
+    parser.add_argument('--keyframe-seconds', type=float, default=1.0)
+    parser.add_argument('--drop', type=float, default=0.0, help="Share of datagrams to lose, 0-1")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(threadName)s %(levelname)s %(message)s')
+    report = run(args)
+    print_report(report)
+    return 0 if report['matches'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
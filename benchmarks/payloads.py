@@ -0,0 +1,79 @@
+"""
+Sheets API 'values' payloads for the benchmarks: recorded responses and synthetic sheets.
+
+Recorded payloads are full values().get JSON responses saved in benchmarks/recorded/
+(for example with: curl "https://sheets.googleapis.com/v4/spreadsheets/<id>/values/<tab>?key=<key>").
+"""
+
+import glob
+import json
+import os
+import random
+
+RECORDED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recorded')
+
+# Values repeat a lot on real show sheets (team names, labels, small scores)
+WORDS = ['Savage', 'Pete', 'Jim', 'gamer12', 'QDH', 'Casters', 'Round', 'Map', 'Final', 'TBD']
+UNICODE_WORDS = ['Zoë', 'Ørjan', 'Łukasz', 'Ñandú', '東京', 'Москва', 'Ωmega', '🔥Hype', 'Café', 'naïve']
+
+SYNTHETIC_SIZES = (10, 1_000, 10_000, 100_000) # Approximate total cells
+SYNTHETIC_COLUMNS = 20
+
+
+def load_recorded():
+    """
+    Loads every recorded response in benchmarks/recorded/.
+
+    Returns:
+        dict: case name ('recorded_<file stem>') -> values list
+    """
+    cases = {}
+    for path in sorted(glob.glob(os.path.join(RECORDED_DIR, '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            response = json.load(f)
+        name = os.path.splitext(os.path.basename(path))[0]
+        cases[f"recorded_{name}"] = response.get('values', [])
+    return cases
+
+
+def synthetic_values(cells, columns=SYNTHETIC_COLUMNS, ragged=False, unicode=False, seed=0):
+    """
+    Builds a values list of roughly `cells` cells: one header row plus data rows.
+
+    Ragged rows vary between 1 and columns + 3 cells, like the API output for
+    sheets with trailing blanks or stray cells past the header. Every row keeps
+    at least one cell because the legacy scripts key rows by their first cell.
+    """
+    rnd = random.Random(seed)
+    words = UNICODE_WORDS if unicode else WORDS
+    columns = max(1, min(columns, cells))
+    header = [f"Col {i + 1}" for i in range(columns)]
+    values = [header]
+    num_rows = max(0, cells // columns - 1)
+    for r in range(num_rows):
+        width = rnd.randint(1, columns + 3) if ragged else columns
+        row = [f"Row {r + 1}"]
+        for _ in range(width - 1):
+            if rnd.random() < 0.5:
+                row.append(rnd.choice(words))
+            else:
+                row.append(str(rnd.randint(0, 100)))
+        values.append(row)
+    return values
+
+
+def all_cases(sizes=SYNTHETIC_SIZES):
+    """
+    Returns every benchmark case.
+
+    Returns:
+        dict: case name -> values list, recorded payloads first.
+    """
+    cases = load_recorded()
+    cases['empty'] = []
+    cases['header_only'] = [[f"Col {i + 1}" for i in range(SYNTHETIC_COLUMNS)]]
+    for size in sizes:
+        cases[f"rect_{size}"] = synthetic_values(size)
+        cases[f"ragged_{size}"] = synthetic_values(size, ragged=True, seed=size)
+        cases[f"unicode_{size}"] = synthetic_values(size, unicode=True, seed=size + 1)
+    return cases
@@ -0,0 +1,157 @@
+"""
+Replay benchmark: runs a recording through SheetsEngine's full loop and reports the throughput.
+
+The recording (see sheets_core.recording) is either one made during a show with
+record_file, or a synthetic one: a table of --rows x --columns cells in which
+--changes cells change per frame, with a vMixCommand column whose cue ID moves
+on every --cue-every frames (the header in the first row after the sheet's
+header row, like a show sheet's vMix column). Synthetic cues call a stub vMix HTTP server on
+127.0.0.1, so the vMix stages (CSV read and API call) are measured too.
+
+With --speed 0 (the default) every frame goes through the snapshot, change
+check, CSV write and vMix stages as fast as the loop runs them; any other speed
+replays on the recording's own clock, as a rehearsal would.
+
+    python benchmarks/replay_bench.py --frames 2000 --rows 200 --columns 12
+    python benchmarks/replay_bench.py --recording show.rec --vmix-header vMixCommand
+    python benchmarks/replay_bench.py --keep synthetic.rec   # also keep the synthetic recording
+"""
+
+import argparse
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from sheets_core.engine import SheetsEngine # noqa: E402
+from sheets_core.metrics import ALL_KEYS_LABEL # noqa: E402
+from sheets_core.recording import SnapshotRecorder # noqa: E402
+from sheets_core.run_config import RunConfig # noqa: E402
+from sheets_core.snapshot import build_snapshot # noqa: E402
+
+VMIX_HEADER = 'vMixCommand'
+REPORT_STAGES = ('tick', 'fetch', 'snapshot', 'diff', 'csv_write', 'vmix_csv_read', 'vmix_api')
+FINISH_TIMEOUT_SECONDS = 600
+
+
+class _VmixStubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'<vmix><version>bench</version></vmix>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_vmix_stub():
+    """Starts a stub vMix API on a free port; returns (server, its /api/ URL)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _VmixStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="VmixStub").start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/"
+
+
+def write_synthetic_recording(path, frames, rows, columns, changes, cue_every, vmix_url, seed=0):
+    """Records frames synthetic tables to path, each with changes cells changed from the one before."""
+    rng = random.Random(seed)
+    header = [f"Col{index}" for index in range(columns)]
+    names = [VMIX_HEADER] + [f"Name{index}" for index in range(1, columns)] # The output CSV's first row
+    table = [header, names] + [[f"r{row}c{column}" for column in range(columns)] for row in range(rows)]
+    recorder = SnapshotRecorder(path)
+    snapshot = None
+    for frame in range(frames):
+        table = [list(row) for row in table]
+        for _ in range(changes):
+            row, column = rng.randrange(2, rows + 2), rng.randrange(1, columns)
+            table[row][column] = f"{rng.choice(('Savage', 'Pete', 'QDH', 'Final'))}{frame}"
+        table[2][0] = f"{frame // cue_every},{vmix_url}?Function=Cut&Input={frame // cue_every}"
+        snapshot = build_snapshot(table, snapshot)
+        recorder.record(snapshot)
+    recorder.close()
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='replay_bench_')
+    vmix_server = None
+    try:
+        recording = args.recording
+        vmix_header = args.vmix_header or ''
+        if not recording:
+            vmix_server, vmix_url = start_vmix_stub()
+            recording = args.keep or os.path.join(workdir, 'synthetic.rec')
+            write_synthetic_recording(recording, args.frames, args.rows, args.columns, args.changes, args.cue_every, vmix_url)
+            vmix_header = vmix_header or VMIX_HEADER
+        engine = SheetsEngine()
+        engine.tick_summary = True
+        engine.start(RunConfig(spreadsheet_id='replay', worksheet_name='replay', api_keys=('replay',),
+                               loop_interval=args.interval, csv_filename=os.path.join(workdir, 'replay'),
+                               transpose=args.transpose, play_sound=False, sound_file='', sound_volume=0,
+                               vmix_api_enabled=bool(vmix_header), vmix_api_header=vmix_header,
+                               replay_file=recording, replay_speed=args.speed))
+        started = time.monotonic()
+        replay = engine.source
+        if replay is None:
+            engine.stop()
+            raise SystemExit(f"Could not replay '{recording}'.")
+        deadline = started + FINISH_TIMEOUT_SECONDS
+        while not replay.finished and time.monotonic() < deadline:
+            time.sleep(0.01)
+        while engine.busy_since is not None and time.monotonic() < deadline: # The last frame's iteration is under way
+            time.sleep(0.001)
+        elapsed = time.monotonic() - started
+        engine.stop()
+        engine.join(5)
+        engine.close()
+        return {'frames': len(replay.recording), 'bytes': os.path.getsize(recording), 'seconds': elapsed,
+                'metrics': {row['stage']: row for row in engine.stage_metrics.snapshot() if row['api_key'] == ALL_KEYS_LABEL}}
+    finally:
+        if vmix_server is not None:
+            vmix_server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(report):
+    print(f"Recording: {report['frames']} frames ({report['bytes'] / 1024:.1f} KiB)")
+    print(f"Replayed them in {report['seconds']:.2f}s ({report['frames'] / report['seconds']:.1f} frames/s)")
+    print(f"{'stage':<15}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for stage in REPORT_STAGES:
+        row = report['metrics'].get(stage)
+        if row:
+            print(f"{stage:<15}{row['count']:>8}{row['quantiles'][0.5] * 1000:>10.3f}"
+                  f"{row['quantiles'][0.95] * 1000:>10.3f}{row['max'] * 1000:>10.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--recording', help="Replay this recording instead of a synthetic one")
+    parser.add_argument('--keep', help="Write the synthetic recording to this path and keep it")
+    parser.add_argument('--frames', type=int, default=1000)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--changes', type=int, default=3, help="Cells changed per synthetic frame")
+    parser.add_argument('--cue-every', type=int, default=10, help="Frames between synthetic vMix cues")
+    parser.add_argument('--vmix-header', help=f"vMix command header to trigger on (synthetic: {VMIX_HEADER})")
+    parser.add_argument('--speed', type=float, default=0.0, help="Replay clock rate; 0 = as fast as possible")
+    parser.add_argument('--interval', type=float, default=1.0, help="Loop interval when --speed is not 0")
+    parser.add_argument('--transpose', action='store_true')
+    parser.add_argument('--verbose', action='store_true', help="Show the engine's log")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(threadName)s %(levelname)s %(message)s')
+    print_report(run(args))
+
+
+if __name__ == '__main__':
+    main()
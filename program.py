@@ -1,10 +1,12 @@
+import collections
 import threading
 import time
 import tkinter as tk
 from tkinter import messagebox
 import configparser
-import pandas as pd
 import requests
+from sheets_core.exporter import LegacyExporter
+from sheets_core.http_fetch import PooledValuesFetcher, SHEETS_API_BASE_URL
 
 
 # Libraries used:
@@ -12,6 +14,16 @@ import requests
 # pandas: pip install pandas
 # tkinter: pip install tkinter
 
+# Google Sheets API root is SHEETS_API_BASE_URL; override with api_base_url in config.ini
+# (e.g. benchmarks/mock_sheets_server.py)
+# Log the per-API-key request counters every this many ticks
+KEY_STATS_LOG_EVERY = 60
+# Log view: lines kept (override with log_lines in config.ini), redraw interval, and messages that are
+# counted on one line instead of being repeated
+LOG_CAPACITY = 500
+LOG_REFRESH_MS = 250
+COALESCED_LOG_PREFIXES = ("Successfully wrote", "No change")
+
 class SheetsExtractProgram:
 
     # this dunder always starts as soon as the class is called/instantiated
@@ -23,6 +35,10 @@ class SheetsExtractProgram:
         self.api_key = ""
         self.seconds = 1
         self.filename = ""
+        self.api_base_url = SHEETS_API_BASE_URL
+        self.log_pending = collections.deque()  # messages from any thread, moved to the view by flush_log
+        self.log_lines = collections.deque(maxlen=LOG_CAPACITY)  # [message, count, last time] ring buffer
+        self.log_view_filters = None  # log_filters() the log view was last drawn with
         self.threadRunning = False
         self.errorMessage = None
         self.thread = None
@@ -54,6 +70,17 @@ class SheetsExtractProgram:
 
             with open(self.config_file, 'w') as configfile:
                 self.config.write(configfile)
+        # optional, not written to config.ini unless added by hand
+        self.api_base_url = self.config.get('MAIN', 'api_base_url', fallback=SHEETS_API_BASE_URL).rstrip('/')
+        # one pooled keep-alive session for every request; request_timeout / tick_deadline are optional too
+        self.fetcher = PooledValuesFetcher.from_config(self.config, 'MAIN', self.api_base_url)
+        self.exporter = LegacyExporter(self.fetcher) # Skips the rewrite when the sheet has not changed
+        self.fetch_count = 0
+        try:
+            self.log_lines = collections.deque(maxlen=max(1, int(self.config.get('MAIN', 'log_lines',
+                                                                                  fallback=LOG_CAPACITY))))
+        except ValueError:
+            pass  # keep the default capacity
 
         # Create the GUI with the text boxes, buttons and status box
         self.window = tk.Tk()
@@ -109,30 +136,33 @@ class SheetsExtractProgram:
         self.startStop_btn.grid(row=5, columnspan=2, pady=5)
         self.save_button.grid(row=6, columnspan=2, pady=5)
         self.status_box.grid(row=7, columnspan=2, pady=5)
+        # Create the optional log filters: a text filter and an errors-only switch
+        self.log_filter_frame = tk.Frame(self.window)
+        self.log_filter_frame.grid(row=8, column=0, sticky="w")
+        self.log_filter_label = tk.Label(self.log_filter_frame, text="Log filter:", font=("Arial", 12))
+        self.log_filter_label.grid(row=0, column=0)
+        self.log_filter_entry = tk.Entry(self.log_filter_frame, width=20, font=("Arial", 12))
+        self.log_filter_entry.grid(row=0, column=1)
+        self.log_filter_entry.bind("<KeyRelease>", self.render_log)
+        self.log_errors_only = tk.BooleanVar(value=False)
+        self.log_errors_only_check = tk.Checkbutton(self.log_filter_frame, text="Errors only", font=("Arial", 12),
+                                                    variable=self.log_errors_only, command=self.render_log)
+        self.log_errors_only_check.grid(row=0, column=2)
         # Create a text widget to display the log # Added to embed the log into the GUI
         self.log_text = tk.Text(self.window, height=15, font=("Arial", 12))
-        self.log_text.grid(row=8, columnspan=1, pady=5)  # Changed the height to fill the space
+        self.log_text.grid(row=9, columnspan=1, pady=5)  # Changed the height to fill the space
 
         self.startStop_btn.config(command=self.start_loop)
 
         # Bind the save button to the save settings function
         self.save_button.config(command=self.save_settings)
 
-        try:
-            # Print the initial message to the console
-            print("Program started")
-            # Append the initial message to the text widget
-            self.log_text.insert(tk.END, "Program started\n")
-            self.log_text.see(tk.END)
-        except Exception as e:
-            # Print and append any error in opening or writing to the log file
-            print(f"Error opening or writing to log file: {e}")
-            self.log_text.insert(tk.END, f"Error opening or writing to log file: {e}\n")
-            self.log_text.see(tk.END)
+        self.log("Program started")
         self.update_status()
         # starts tk window loop program
         self.window.protocol("WM_DELETE_WINDOW", self.on_close)
         self.main_loop()
+        self.flush_log()
         self.window.mainloop()
 
     def main_loop(self):
@@ -143,19 +173,71 @@ class SheetsExtractProgram:
         self.threadRunning = False
         self.window.after(1000, self.window.destroy)
 
-    # Define a function to write and print a log message and append it to the text widget
-    # Modified to embed the log into the GUI
+    # Define a function to print a log message and queue it for the log view
+    # Safe to call from the export thread: only flush_log, on the Tk thread, touches the text widget
     def log(self, message):
-        try:
-            print(message)
-            self.log_text.insert(tk.END, message + "\n")
-            self.log_text.see(tk.END)
-        except Exception as e:
-            # Print and append any error in opening or writing to the log file
-            print(f"Error opening or writing to log file: {e}")
-            self.log_text.insert(tk.END, f"Error opening or writing to log file: {e}\n")
+        print(message)
+        self.log_pending.append(message)
+
+    # Define a function to move queued log messages into the ring buffer and the log view
+    # A message repeating the previous "Successfully wrote" line bumps its counter instead of adding a line
+    # Only the new or changed lines are touched in the text widget, so a flush costs the same however full the log is
+    def flush_log(self):
+        self.window.after(LOG_REFRESH_MS, self.flush_log)
+        if not self.log_pending:
+            return
+        now = time.strftime("%H:%M:%S")
+        filters = self.log_filters()
+        redraw = filters != self.log_view_filters  # a filter changed without a key press (e.g. pasted text)
+        while self.log_pending:
+            message = self.log_pending.popleft()
+            last = self.log_lines[-1] if self.log_lines else None
+            if last and last[0] == message and message.startswith(COALESCED_LOG_PREFIXES):
+                last[1] += 1
+                last[2] = now
+                if not redraw and self.log_line_matches(message, filters):  # it is the last line of the view: redraw just that line
+                    self.log_text.delete("end-2l", "end-1l")
+                    self.log_text.insert(tk.END, self.format_log_line(last) + "\n")
+                continue
+            if (not redraw and len(self.log_lines) == self.log_lines.maxlen
+                    and self.log_line_matches(self.log_lines[0][0], filters)):
+                self.log_text.delete("1.0", "2.0")  # the oldest line drops out of the ring buffer
+            self.log_lines.append([message, 1, now])
+            if not redraw and self.log_line_matches(message, filters):
+                self.log_text.insert(tk.END, self.format_log_line(self.log_lines[-1]) + "\n")
+        if redraw:
+            self.render_log()
+        else:
             self.log_text.see(tk.END)
 
+    # Define a function to read the log view's filters: (lower-case text filter, errors only)
+    def log_filters(self):
+        return self.log_filter_entry.get().strip().lower(), self.log_errors_only.get()
+
+    # Define a function to check whether a message passes the log view's filters
+    @staticmethod
+    def log_line_matches(message, filters):
+        text_filter, errors_only = filters
+        if errors_only and "error" not in message.lower():
+            return False
+        return not text_filter or text_filter in message.lower()
+
+    # Define a function to format a ring buffer entry as one line of the log view
+    @staticmethod
+    def format_log_line(line):
+        message, count, last_time = line
+        message = message.replace("\n", " ")
+        return f"{message} (x{count}, last at {last_time})" if count > 1 else message
+
+    # Define a function to redraw the whole log view from the ring buffer when the filters change
+    def render_log(self, *args):
+        filters = self.log_view_filters = self.log_filters()
+        shown = [self.format_log_line(line) for line in self.log_lines if self.log_line_matches(line[0], filters)]
+        self.log_text.delete("1.0", tk.END)
+        if shown:
+            self.log_text.insert(tk.END, "\n".join(shown) + "\n")
+        self.log_text.see(tk.END)
+
     # Define a function to update the status box based on the data fields
     def update_status(self):
         print("updating values")
@@ -187,29 +269,28 @@ class SheetsExtractProgram:
         with open(self.config_file, 'w') as configfile:
             self.config.write(configfile)
 
-    # Define a function to get the sheet data and transpose it using the pandas library
+    # Define a function to get the sheet data and write it transposed (see sheets_core.pipeline.legacy_rows)
     def get_sheet_data(self):
 
+        self.fetch_count += 1
+        if self.fetch_count % KEY_STATS_LOG_EVERY == 0:
+            self.log(f"API key stats: {self.fetcher.stats_summary()}")
         try:
-            response = requests.get(
-                f"https://sheets.googleapis.com/v4/spreadsheets/{self.spreadsheet_id}/values/{self.worksheet}"
-                f"?key={self.api_key}")
-            response.raise_for_status()
-            data = response.json()
-            rows = data["values"]
-            rows.pop(0)
-            tmp = {k[0]: k[1:] for k in rows}
-            tmp = pd.DataFrame.from_dict(tmp, orient='index')
-            tmp = tmp.transpose()
-            tmp.to_csv(self.filename + ".csv", index=False,
-                       encoding="utf-8")  # Changed to use the filename variable as the output file name
+            written, _ = self.exporter.export(self.spreadsheet_id, self.worksheet, [self.api_key],
+                                              self.filename + ".csv")  # Changed to use the filename variable as the output file name
             self.error_message = ""
             # Log the success message
-            self.log(
-                f"Successfully wrote to {self.filename}.csv")  # Changed to show the filename in the log message
+            if written:
+                self.log(
+                    f"Successfully wrote to {self.filename}.csv")  # Changed to show the filename in the log message
+            else:
+                self.log(f"No change, kept {self.filename}.csv")
         except requests.exceptions.HTTPError as e:
             # Log the HTTP error message
             self.log(f"HTTP Error: {e}")
+        except requests.exceptions.Timeout as e:
+            # Log the timeout; the next tick tries again instead of hanging the export thread
+            self.log(f"Timeout Error: {e}")
         except PermissionError as e:
             # Log and show the permission error message
             self.error_message = "CANNOT WRITE TO DISK, FILE IN USE"
@@ -0,0 +1,5 @@
+"""Shared, GUI-free building blocks for the Sheets-Tool front ends."""
+
+from .metrics import StageMetrics, MetricsServer, MetricsCsvDumper, key_label
+
+__all__ = ['StageMetrics', 'MetricsServer', 'MetricsCsvDumper', 'key_label']
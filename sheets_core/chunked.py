@@ -0,0 +1,108 @@
+"""
+Chunked fetching of very large worksheets.
+
+ChunkedValuesFetcher splits a tab into row bands ('Tab'!1:5000, 'Tab'!5001:10000,
+...) using the row count from SheetMetadataCache, fetches the bands in parallel
+with a different API key each and joins them back in order. The result is the
+same values list one request for the whole tab returns: a band that comes back
+short (the API drops trailing empty rows) is padded with empty rows, and empty
+rows at the end of the tab are dropped. A band that fails is fetched again on
+its own, starting with the next key; the bands that arrived are kept.
+
+Bands cover whole rows, so columns added since the metadata was fetched are
+still read. Rows added past the cached grid size are not; when the last band
+reaches the end of the grid the metadata is refetched on the next call.
+"""
+
+import concurrent.futures
+import logging
+
+import requests
+
+from .http_fetch import DEFAULT_POOL_SIZE, is_failover_error
+from .sheet_metadata import quote_sheet_title
+
+logger = logging.getLogger(__name__)
+
+BAND_RETRIES = 1 # Extra attempts for a failed band within one fetch
+
+
+def row_bands(row_count, chunk_rows):
+    """Returns [(first_row, last_row), ...], 1-based and inclusive, covering row_count rows."""
+    return [(first, min(first + chunk_rows - 1, row_count)) for first in range(1, max(row_count, 1) + 1, chunk_rows)]
+
+
+class ChunkedValuesFetcher:
+    """Fetches a worksheet as parallel row bands spread across API keys."""
+
+    def __init__(self, fetcher, metadata, max_parallel=DEFAULT_POOL_SIZE):
+        """
+        Args:
+            fetcher (PooledValuesFetcher): Fetches each band; its pool should allow max_parallel connections.
+            metadata (SheetMetadataCache): Supplies the tab's row count.
+            max_parallel (int): Most bands in flight at once.
+        """
+        self.fetcher = fetcher
+        self.metadata = metadata
+        self.max_parallel = max_parallel
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="BandFetch")
+
+    def fetch(self, spreadsheet_id, worksheet, api_keys, chunk_rows):
+        """
+        Fetches the worksheet's values, in bands of chunk_rows rows when it is larger than that.
+
+        Band i starts with api_keys[i % len(api_keys)]; at most max_parallel bands are in flight.
+
+        Returns:
+            tuple: (values list, api_key that fetched the first band)
+
+        Raises:
+            KeyError: If the spreadsheet has no such worksheet.
+            requests.exceptions.RequestException: If a band still fails after BAND_RETRIES.
+        """
+        properties = self.metadata.sheet(spreadsheet_id, worksheet, api_keys)
+        row_count = properties.get('gridProperties', {}).get('rowCount', 0)
+        quoted = quote_sheet_title(properties['title']) # The current title, should the tab have been renamed
+        bands = row_bands(row_count, chunk_rows)
+        if len(bands) <= 1:
+            data, api_key = self.fetcher.fetch(spreadsheet_id, quoted, api_keys, key_index=0)
+            return data.get('values', []), api_key
+
+        ranges = [f"{quoted}!{first}:{last}" for first, last in bands]
+        results = [None] * len(bands)
+        pending = list(range(len(bands)))
+        for attempt in range(BAND_RETRIES + 1):
+            futures = {index: self.executor.submit(self.fetcher.fetch, spreadsheet_id, ranges[index], api_keys,
+                                                   key_index=(index + attempt) % len(api_keys))
+                       for index in pending}
+            failed = {}
+            for index, future in futures.items():
+                try:
+                    results[index] = future.result()
+                except requests.exceptions.RequestException as e:
+                    if not is_failover_error(e):
+                        raise
+                    failed[index] = e
+            if not failed:
+                break
+            pending = sorted(failed)
+            if attempt < BAND_RETRIES:
+                logger.warning("Refetching %s of %s row bands of '%s' that failed: %s",
+                               len(pending), len(bands), worksheet, ", ".join(ranges[index] for index in pending))
+        else:
+            raise failed[pending[0]]
+
+        values = []
+        for (first, last), (data, _) in zip(bands, results):
+            band_values = data.get('values', [])
+            values.extend(band_values)
+            values.extend([] for _ in range(last - first + 1 - len(band_values)))
+        last_band_values = results[-1][0].get('values', [])
+        if len(last_band_values) == bands[-1][1] - bands[-1][0] + 1:
+            self.metadata.invalidate() # Data reaches the last grid row: the tab may have grown
+        while values and not values[-1]:
+            values.pop()
+        return values, results[0][1]
+
+    def close(self):
+        self.executor.shutdown(wait=False)
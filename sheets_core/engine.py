@@ -0,0 +1,1058 @@
+"""
+The polling engine behind SHEETS_TOOL_3.0.py, free of Tk.
+
+SheetsEngine runs fetch -> snapshot + change check -> CSV write -> vMix
+command on its own "MainLoopThread", one iteration per loop_interval. The front
+end passes a RunConfig to start() and gets everything it displays through
+callbacks. The callbacks run on engine threads, so a GUI has to hand them over
+to its own thread (SHEETS_TOOL_3.0.py posts them to a UiUpdateChannel). With no
+callbacks the engine runs headless, as in the benchmarks.
+
+With a StateStore the engine records what it wrote, the last vMix command ID
+and the key health, and a later start() of the same run resumes from there
+(see sheets_core.state).
+
+notify_change() (called by sheets_core.webhook.WebhookReceiver) ends the
+current sleep early: once notifications stop arriving for push_debounce
+seconds the next iteration starts at once, and the regular interval can then
+be a slow safety net (RunConfig.push_interval).
+
+reconfigure() switches a running loop to a new RunConfig between two
+iterations. Only RunConfig.LIVE_FIELDS are taken over; the snapshot, the
+written digest, the vMix ID tracker, the metadata cache and the HTTP
+connections all stay, and a new output path or transpose setting just writes
+the current data out once more.
+
+Every write of the local CSV is also handed to an OutputFanout, which copies
+it to RunConfig.output_copies (network shares, other disks) in the background,
+and, with RunConfig.shared_memory_name set, to a SharedSnapshotPublisher for
+programs on the same PC (see sheets_core.shared_snapshot). With
+RunConfig.multicast_group set, a MulticastPublisher also sends it to other
+machines on the LAN (see sheets_core.multicast).
+
+With RunConfig.record_file set, each of those tables is also appended to a
+recording (see sheets_core.recording).
+
+With RunConfig.settle_seconds set, a changed table is written only once it has
+stayed the same for that long, so the partial values of an edit in progress
+never reach the CSV, the sound or vMix (see sheets_core.settle).
+
+With RunConfig.source_file or replay_file set, the loop takes its tables from a
+TableSource (a local file, or a recording) instead of the Sheets API, and the
+source's change notifications wake it like notify_change() does (see
+sheets_core.sources).
+"""
+
+import logging
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import requests
+
+from .chunked import ChunkedValuesFetcher
+from .fanout import OutputFanout, same_path
+from .http_fetch import DEFAULT_POOL_SIZE, PooledValuesFetcher, SHEETS_API_BASE_URL
+from .metrics import StageMetrics
+from .multicast import MulticastPublisher
+from .pipeline import SHAPE_EMPTY, SHAPE_HEADER_ONLY, SHAPE_ROWS, read_output_csv, find_header_column, values_digest
+from .profiling import LoopProfiler
+from .run_config import OUTPUT_FIELDS, merge_live_changes
+from .projection import PROJECTION_FIELDS, ColumnProjection
+from .recording import ReplaySource, SnapshotRecorder
+from .settle import EditSettler, changed_columns
+from .sources import LocalFileSource
+from .shared_snapshot import SharedSnapshotPublisher
+from .sheet_metadata import SheetMetadataCache, bounded_range, quote_sheet_title
+from .snapshot import SnapshotBuilder, build_snapshot, output_column, write_snapshot_csv
+from .streaming import iter_values_rows
+from .state import file_signature, run_identity
+
+logger = logging.getLogger(__name__)
+
+THREAD_TIMEOUT_SECONDS = 5.0 # Max time for API call thread
+API_CENSOR_STARS = '*' * 20 # Use 20 stars for censoring
+LOG_COLOR_RED = '\033[91m'
+LOG_COLOR_ORANGE = '\033[38;5;208m'
+LOG_COLOR_GREEN = '\033[92m'
+LOG_COLOR_RESET = '\033[0m'
+KEY_STATE_SAVE_EVERY = 30 # Ticks between saves of the key rotation/health state
+PUSH_MAX_DEBOUNCE_FACTOR = 4 # A stream of notifications delays the fetch by at most this many debounce periods
+FORCED_WRITE_AFTER_START = "First iteration after start."
+FORCED_WRITE_AFTER_RECONFIGURE = "Output settings changed."
+
+
+def censor_api_key(api_key):
+    """Censors all but the last 4 characters of an API key with many stars."""
+    if isinstance(api_key, str) and len(api_key) > 4:
+        return f"{API_CENSOR_STARS}{api_key[-4:]}"
+    elif isinstance(api_key, str) and len(api_key) > 0:
+         return API_CENSOR_STARS # Censor short keys completely
+    return "EMPTY"
+
+
+def execute_vmix_api(api_url):
+    """
+    Executes a vMix Web API call. Runs Synchronously.
+
+    Args:
+        api_url (str): The full URL for the vMix API call.
+
+    Returns:
+        tuple: (status_code, response_text)
+               status_code is the HTTP status code (e.g., 200, 500) or None on connection errors.
+               response_text is the content returned by vMix or an error message.
+    """
+    if not api_url or not isinstance(api_url, str) or not api_url.startswith(('http://', 'https://')):
+        logger.error("[vMix API] Invalid vMix API URL provided: %s", api_url)
+        return None, "Invalid API URL format"
+
+    logger.info("[vMix API] Executing: %s", api_url)
+    try:
+        with urllib.request.urlopen(api_url, timeout=5) as response: # 5 second timeout
+            status_code = response.getcode()
+            response_text = response.read().decode('utf-8', errors='ignore') # Read response body
+            logger.info("[vMix API] Response status: %s", status_code)
+            if response_text:
+                if status_code != 200 or len(response_text) < 200: # Avoid logging huge success responses
+                    logger.info("[vMix API] Response content:\n---\n%s\n---", response_text)
+                else:
+                     logger.info("[vMix API] Response content received (likely XML, length > 200).")
+            return status_code, response_text
+    except urllib.error.HTTPError as e:
+        logger.error("[vMix API] HTTP Error: %s %s", e.code, e.reason)
+        error_body = ""
+        try: # Try to read error body if available
+            error_body = e.read().decode('utf-8', errors='ignore')
+            logger.error("[vMix API] Error response body:\n---\n%s\n---", error_body)
+        except Exception: pass
+        response_text = f"HTTP Error {e.code} {e.reason}" + (f"\n{error_body}" if error_body else "")
+        return e.code, response_text
+    except urllib.error.URLError as e:
+        logger.error("[vMix API] URL Error (e.g., connection refused, DNS): %s", e.reason)
+        return None, f"URL Error: {e.reason}"
+    except TimeoutError:
+        logger.error("[vMix API] Request timed out.")
+        return None, "Request Timed Out"
+    except Exception as e:
+        logger.error("[vMix API] Unexpected error during vMix API call: %s", e, exc_info=True)
+        return None, f"Request Failed: {e}"
+
+
+def _ignore(*args):
+    pass
+
+
+class SheetsEngine:
+    """Runs the polling loop for one RunConfig at a time; start()/stop() may be called repeatedly."""
+
+    def __init__(self, stage_metrics=None, profiler=None, fetcher=None, on_status=None, on_error=None,
+                 on_clear_error=None, on_vmix_status=None, on_sound=None, on_stopped=None, state_store=None):
+        """
+        Args:
+            stage_metrics (StageMetrics): Receives per-stage timings (a private one if omitted).
+            profiler (LoopProfiler): On-demand profiler hooked into every iteration.
+            fetcher (PooledValuesFetcher): Shared pooled HTTP fetcher (one is created if omitted).
+            on_status (callable): on_status(text, color) when the loop's status changes.
+            on_error (callable): on_error(text) to show an error message.
+            on_clear_error (callable): on_clear_error() to clear it.
+            on_vmix_status (callable): on_vmix_status(status_code, message) after a vMix command.
+            on_sound (callable): on_sound(sound_file, volume_percent) on a data change with sound enabled.
+            on_stopped (callable): on_stopped() once the loop thread has exited.
+            state_store (StateStore): Optional warm-start state file; None always starts cold.
+        """
+        self.stage_metrics = stage_metrics if stage_metrics is not None else StageMetrics()
+        self.profiler = profiler if profiler is not None else LoopProfiler()
+        self.fetcher = fetcher if fetcher is not None else PooledValuesFetcher(
+            request_timeout=THREAD_TIMEOUT_SECONDS, tick_deadline=THREAD_TIMEOUT_SECONDS,
+            pool_size=2 * DEFAULT_POOL_SIZE) # Row bands plus a late worker from the previous tick
+        self.metadata = SheetMetadataCache(self.fetcher)
+        self.chunked_fetcher = ChunkedValuesFetcher(self.fetcher, self.metadata)
+        self.output_copies = OutputFanout(self.stage_metrics)
+        self.shared_snapshot = None # SharedSnapshotPublisher while shared_memory_name is set
+        self.multicast = None # MulticastPublisher while multicast_group is set
+        self.recorder = None # SnapshotRecorder of the run's record_file, if any
+        self.source = None # TableSource of the run's source_file or replay_file, fetched from instead of the API
+        self.source_error = None # Why the run's source could not be opened; reported by every fetch
+        self.projection = None # ColumnProjection of the run's columns setting, if any
+        self.projection_metadata_time = None # metadata.fetched_at when the projection's header names were resolved
+        self.projection_vmix_checked = None # (vmix_api_header, transpose) last checked against the projected data
+        self.on_status = on_status or _ignore
+        self.on_error = on_error or _ignore
+        self.on_clear_error = on_clear_error or _ignore
+        self.on_vmix_status = on_vmix_status or _ignore
+        self.on_sound = on_sound or _ignore
+        self.on_stopped = on_stopped or _ignore
+        self.state_store = state_store
+        self.tick_summary = False # Log one INFO summary per iteration instead of each step
+        self.run_cfg = None
+        self.status = None # (text, color) last status reported through on_status
+        self.is_running = False
+        self.stop_event = threading.Event()
+        self.result_queue = queue.Queue()
+        self.loop_thread = None
+        self.worker_thread = None
+        self.current_active_worker_instance_id = None # Track the unique ID string of the intended active worker
+        self.current_api_key_index = 0
+        self.last_snapshot = None # Snapshot of the previously written data, for comparison and string reuse
+        self.last_written_digest = None # values_digest of the payload last_snapshot was built from
+        self.last_written_shape = None
+        self.settle = EditSettler() # Holds a change back until it stops changing (RunConfig.settle_seconds)
+        self.force_write_on_next_pull = False # Flag to force writing CSV on the first pull after starting
+        self.force_write_reason = FORCED_WRITE_AFTER_START # Why force_write_on_next_pull was set
+        self.last_vmix_api_id = None # Stores the ID of the last executed vMix command
+        self.skip_next_vmix_execution_on_change = False # Flag to skip the *first* vMix execution after start
+        self.busy_since = None # time.monotonic() the current iteration started; None while sleeping or stopped
+        self.wake_event = threading.Event() # Set by notify_change (and stop) to end the loop's sleep early
+        self.first_notify_time = None # time.monotonic() of the first notification not yet acted on
+        self.last_notify_time = None
+        self._notify_lock = threading.Lock()
+
+    def start(self, run_cfg, initial_status=("RUNNING", "red")):
+        """Starts the loop thread for run_cfg. The first pull is always written; the first vMix change is not executed."""
+        self.run_cfg = run_cfg
+        self.fetcher.base_url = (run_cfg.sheets_api_base_url or SHEETS_API_BASE_URL).rstrip('/')
+        self.metadata.refresh_seconds = run_cfg.metadata_refresh_seconds
+        self.metadata.invalidate()
+        self._configure_output_copies(run_cfg)
+        self._configure_shared_snapshot(run_cfg)
+        self._configure_multicast(run_cfg)
+        self._open_recording(run_cfg)
+        self._open_source(run_cfg)
+        self.projection = ColumnProjection(run_cfg.columns) if run_cfg.columns else None
+        self.projection_vmix_checked = None
+        self.status = initial_status
+        self.is_running = True
+        self.stop_event.clear() # Clear the stop signal for the new run
+        with self._notify_lock:
+            self.wake_event.clear()
+            self.first_notify_time = None
+        self.last_snapshot = None
+        self.last_written_digest = None
+        self.last_written_shape = None
+        self.settle.clear()
+        if not self._resume_from_state(run_cfg):
+            self.force_write_on_next_pull = True # Set flag for initial write
+            self.force_write_reason = FORCED_WRITE_AFTER_START
+            self.skip_next_vmix_execution_on_change = True
+            # Reset last vMix ID on start to ensure the first read value is treated as 'new'
+            # but execution will be skipped by the flag above.
+            self.last_vmix_api_id = None
+            logger.info("Flags set to force write and skip first vMix execution on change after start. vMix API ID tracker reset.")
+        self.loop_thread = threading.Thread(target=self.run_loop, daemon=True, name="MainLoopThread")
+        self.loop_thread.start()
+
+    def stop(self):
+        """Signals the loop (and its sleep) to stop; returns without waiting."""
+        self.is_running = False
+        self.skip_next_vmix_execution_on_change = False
+        self.stop_event.set() # Signal the loop and any waiting threads to stop
+        self.wake_event.set()
+
+    def join(self, timeout=None):
+        if self.loop_thread and self.loop_thread.is_alive():
+            self.loop_thread.join(timeout)
+
+    def close(self):
+        """Releases what outlives a run (output copy writers, shared memory segment, multicast socket); call after stop() on exit."""
+        self.output_copies.close()
+        publisher, self.shared_snapshot = self.shared_snapshot, None
+        if publisher is not None:
+            publisher.close()
+        multicast, self.multicast = self.multicast, None
+        if multicast is not None:
+            multicast.close()
+        self._close_recording()
+        self._close_source()
+
+    def reconfigure(self, run_cfg):
+        """
+        Applies the live fields of run_cfg to the running loop from its next iteration on (thread-safe).
+
+        Returns:
+            list: Names of the changed fields that were not applied because they need a restart.
+        """
+        if self.run_cfg is None:
+            return []
+        applied, live, restart = merge_live_changes(self.run_cfg, run_cfg)
+        if live:
+            if any(name in live for name in OUTPUT_FIELDS):
+                self.force_write_reason = FORCED_WRITE_AFTER_RECONFIGURE
+                self.force_write_on_next_pull = True
+            self.metadata.refresh_seconds = applied.metadata_refresh_seconds
+            self._configure_output_copies(applied)
+            self._configure_shared_snapshot(applied)
+            self._configure_multicast(applied)
+            self.run_cfg = applied
+            logger.info("Applied new settings to the running loop: %s", ", ".join(live))
+            with self._notify_lock:
+                self.wake_event.set() # Start the next iteration now rather than after the old interval
+        if restart:
+            logger.warning("Changed settings that only apply after Stop/Start: %s", ", ".join(restart))
+        return restart
+
+    def _configure_output_copies(self, run_cfg):
+        copies = [path for path in run_cfg.output_copies if not same_path(path, run_cfg.csv_path)]
+        if len(copies) < len(run_cfg.output_copies):
+            logger.warning("An output copy path is the output file '%s' itself; skipping it.", run_cfg.csv_path)
+        self.output_copies.configure(copies, run_cfg.output_copy_timeout)
+
+    def _configure_shared_snapshot(self, run_cfg):
+        publisher = self.shared_snapshot
+        if publisher is not None and (publisher.name, publisher.size_mb) == (run_cfg.shared_memory_name, run_cfg.shared_memory_mb):
+            return
+        if publisher is not None:
+            publisher.close()
+            self.shared_snapshot = None
+        if run_cfg.shared_memory_name:
+            try:
+                self.shared_snapshot = SharedSnapshotPublisher(run_cfg.shared_memory_name, run_cfg.shared_memory_mb)
+            except (OSError, ValueError) as e:
+                logger.error("[Shared Memory] Could not create segment '%s': %s", run_cfg.shared_memory_name, e)
+
+    def _open_recording(self, run_cfg):
+        self._close_recording()
+        if run_cfg.record_file:
+            try:
+                self.recorder = SnapshotRecorder(run_cfg.record_file)
+            except (OSError, ValueError) as e:
+                logger.error("[Recording] Could not open '%s': %s", run_cfg.record_file, e)
+                self.on_error(f"Recording Error: {e}")
+
+    def _close_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    def _open_source(self, run_cfg):
+        """Opens the run's replay_file or source_file, if any. One that cannot be opened fails every fetch (no silent fallback to the sheet)."""
+        self._close_source()
+        self.source_error = None
+        if run_cfg.replay_file and run_cfg.source_file:
+            logger.warning("Both replay_file and source_file are set; replaying '%s'.", run_cfg.replay_file)
+        try:
+            if run_cfg.replay_file:
+                self.source = ReplaySource(run_cfg.replay_file, run_cfg.replay_speed, run_cfg.replay_start_seconds)
+            elif run_cfg.source_file:
+                self.source = LocalFileSource(run_cfg.source_file, run_cfg.worksheet_name)
+        except (OSError, ValueError) as e:
+            self.source_error = f"Could not open '{run_cfg.replay_file or run_cfg.source_file}': {e}"
+            logger.error("[Source] %s", self.source_error)
+            return
+        if self.source is not None:
+            logger.info("[Source] Taking the data from %s instead of the Sheets API.", self.source.description)
+            self.source.watch(self.notify_change)
+
+    def _close_source(self):
+        source, self.source = self.source, None
+        if source is not None:
+            source.close()
+
+    def _configure_multicast(self, run_cfg):
+        publisher = self.multicast
+        settings = (run_cfg.multicast_group, run_cfg.multicast_port, run_cfg.multicast_ttl, run_cfg.multicast_interface,
+                    run_cfg.multicast_keyframe_seconds)
+        if publisher is not None and (publisher.group, publisher.port, publisher.ttl, publisher.interface,
+                                      publisher.keyframe_seconds) == settings:
+            return
+        if publisher is not None:
+            publisher.close()
+            self.multicast = None
+        if run_cfg.multicast_group:
+            try:
+                self.multicast = MulticastPublisher(*settings, stage_metrics=self.stage_metrics)
+            except OSError as e:
+                logger.error("[Multicast] Could not send to %s:%s: %s", run_cfg.multicast_group, run_cfg.multicast_port, e)
+
+    def _publish_copies(self, snapshot, transpose, changed=True):
+        """
+        Hands a written (or kept) snapshot to the output copies, the shared memory segment, multicast and the recording.
+
+        A kept snapshot (changed False) goes to the recording only while it has no frames yet, so a
+        warm start does not record a frame without a change. Multicast skips it on its own when it
+        already sent the same table.
+        """
+        self.output_copies.publish(snapshot, transpose) # Background copies; never waits
+        publisher = self.shared_snapshot
+        if publisher is not None:
+            with self.stage_metrics.time_stage('shared_memory'):
+                publisher.publish(snapshot)
+        if self.multicast is not None:
+            self.multicast.publish(snapshot) # Encoded and sent on the publisher's thread
+        if self.recorder is not None and (changed or self.recorder.frames == 0):
+            self.recorder.record(snapshot) # Encoded and written on the recorder's thread
+
+    def _resume_from_state(self, run_cfg):
+        """
+        Restores key health and, if the saved state belongs to this run and the output file is
+        unchanged since it was written, the written digest and vMix ID tracker.
+
+        Returns:
+            bool: True for a warm start (no forced write, no skipped vMix change).
+        """
+        if self.state_store is None:
+            return False
+        state = self.state_store.load()
+        if isinstance(state.get('key_stats'), dict):
+            self.fetcher.restore_key_stats(state['key_stats'])
+        if isinstance(state.get('api_key_index'), int):
+            self.current_api_key_index = state['api_key_index'] % max(1, len(run_cfg.api_keys))
+
+        identity = run_identity(run_cfg)
+        signature = file_signature(run_cfg.csv_path)
+        if (state.get('run') != identity or not state.get('written_digest')
+                or signature is None or state.get('output_signature') != signature):
+            # Different run or output changed behind our back: start cold and forget the old trackers
+            self.state_store.update(run=identity, written_digest=None, written_shape=None, output_signature=None,
+                                    vmix_api_id=None, vmix_api_header=None)
+            return False
+
+        self.last_written_digest = state['written_digest']
+        self.last_written_shape = state.get('written_shape')
+        self.force_write_on_next_pull = False
+        if state.get('vmix_api_id') is not None and state.get('vmix_api_header') == run_cfg.vmix_api_header:
+            self.last_vmix_api_id = state['vmix_api_id']
+            self.skip_next_vmix_execution_on_change = False
+        else: # No known cue for this header: keep the cold-start rule of skipping the first change
+            self.last_vmix_api_id = None
+            self.skip_next_vmix_execution_on_change = True
+        logger.info("Warm start from '%s': last write of '%s' still on disk, last vMix API ID '%s'.",
+                    self.state_store.path, run_cfg.csv_path, self.last_vmix_api_id)
+        return True
+
+    def _save_written_state(self, csv_filename):
+        if self.state_store is not None:
+            self.state_store.update(run=run_identity(self.run_cfg), written_digest=self.last_written_digest,
+                                    written_shape=self.last_written_shape, output_signature=file_signature(csv_filename))
+
+    def _save_vmix_state(self, header_name):
+        if self.state_store is not None:
+            self.state_store.update(vmix_api_id=self.last_vmix_api_id, vmix_api_header=header_name)
+
+    def _save_key_state(self):
+        if self.state_store is not None:
+            self.state_store.update(api_key_index=self.current_api_key_index, key_stats=self.fetcher.export_key_stats())
+
+    def notify_change(self):
+        """Reports that the sheet changed (thread-safe): the loop fetches as soon as notifications settle."""
+        with self._notify_lock:
+            now = time.monotonic()
+            if self.first_notify_time is None:
+                self.first_notify_time = now
+            self.last_notify_time = now
+            self.wake_event.set()
+
+    def _sleep(self, seconds):
+        """
+        Sleeps up to seconds, or until change notifications have settled for push_debounce seconds.
+
+        Returns:
+            bool: True if stop was requested.
+        """
+        if not self.wake_event.wait(seconds):
+            return False
+        if self.stop_event.is_set():
+            return True
+        with self._notify_lock:
+            if self.first_notify_time is None: # Woken by reconfigure, not by a notification
+                self.wake_event.clear()
+                return False
+        debounce = self.run_cfg.push_debounce
+        while True:
+            with self._notify_lock:
+                now = time.monotonic()
+                first = self.first_notify_time if self.first_notify_time is not None else now
+                last = self.last_notify_time if self.last_notify_time is not None else now
+                wait = min(last + debounce, first + PUSH_MAX_DEBOUNCE_FACTOR * debounce) - now
+                if wait <= 0:
+                    self.wake_event.clear()
+                    self.first_notify_time = None
+                    break
+            if self.stop_event.wait(wait):
+                return True
+        self.stage_metrics.observe('push_wake', now - first)
+        logger.log(logging.DEBUG if self.tick_summary else logging.INFO,
+                   "Change notification received; fetching now (%.0f ms after the first one).", (now - first) * 1000)
+        return False
+
+    def busy_seconds(self):
+        """How long the current iteration has been running (0 while the loop sleeps), for hang detection."""
+        busy_since = self.busy_since
+        return time.monotonic() - busy_since if busy_since is not None else 0.0
+
+    def _set_status(self, text, color):
+        """Reports a status change; repeats of the current status are dropped."""
+        if self.status == (text, color): return
+        self.status = (text, color)
+        self.on_status(text, color)
+
+    def fetch_data_worker(self, api_key, spreadsheet_id, worksheet_name, worker_instance_id):
+        """Fetches data from Google Sheets (or the RunConfig's API base URL) using a specific API key. Runs in a thread."""
+        tick_level = logging.DEBUG if self.tick_summary else logging.INFO
+        logger.log(tick_level, "%s: Attempting to fetch data using API Key: %s", worker_instance_id, censor_api_key(api_key))
+        fetch_start_time = time.monotonic()
+        try:
+            try:
+                payload = self.fetch_payload(api_key, spreadsheet_id, worksheet_name)
+            except requests.exceptions.HTTPError as err:
+                if err.response is None or err.response.status_code != 400:
+                    raise
+                # A renamed tab or a shrunk grid makes the cached range invalid: refresh the metadata and retry once
+                logger.warning("%s: Range rejected (%s); refreshing sheet metadata and retrying.", worker_instance_id, err)
+                self.metadata.invalidate()
+                payload = self.fetch_payload(api_key, spreadsheet_id, worksheet_name)
+            self.stage_metrics.observe('fetch', time.monotonic() - fetch_start_time, api_key)
+
+            if worker_instance_id == self.current_active_worker_instance_id:
+                self.result_queue.put({**payload, 'api_key': api_key, 'worksheet': worksheet_name, 'success': True, 'worker_id': worker_instance_id})
+                logger.log(tick_level, "%s: Successfully fetched data using API key %s and queueing result.", worker_instance_id, censor_api_key(api_key))
+            else:
+                logger.warning("%s: Data fetched, but the globally active worker is now '%s'. Discarding result.", worker_instance_id, self.current_active_worker_instance_id)
+
+        except requests.exceptions.HTTPError as err:
+            self.stage_metrics.observe('fetch_failed', time.monotonic() - fetch_start_time, api_key)
+            logger.error("%s: Google API HTTP Error for key %s: %s %s - %s", worker_instance_id, censor_api_key(api_key), err.response.status_code, err.response.reason, err.response.text)
+            if worker_instance_id == self.current_active_worker_instance_id:
+                self.result_queue.put({'error': err, 'api_key': api_key, 'success': False, 'worker_id': worker_instance_id})
+            else:
+                 logger.warning("%s: HTTP Error occurred, but the globally active worker is now '%s'. Discarding error.", worker_instance_id, self.current_active_worker_instance_id)
+
+        except Exception as e:
+            self.stage_metrics.observe('fetch_failed', time.monotonic() - fetch_start_time, api_key)
+            logger.error("%s: Unexpected error fetching data with key %s: %s", worker_instance_id, censor_api_key(api_key), e, exc_info=True)
+            if worker_instance_id == self.current_active_worker_instance_id:
+                 self.result_queue.put({'error': e, 'api_key': api_key, 'success': False, 'worker_id': worker_instance_id})
+            else:
+                logger.warning("%s: Exception occurred, but the globally active worker is now '%s'. Discarding error.", worker_instance_id, self.current_active_worker_instance_id)
+
+
+    def keys_from(self, api_key):
+        """The run's API keys in rotation order, starting with api_key."""
+        api_keys = list(self.run_cfg.api_keys)
+        first = api_keys.index(api_key) if api_key in api_keys else 0
+        return api_keys[first:] + api_keys[:first]
+
+    def _check_projected_vmix_header(self, snapshot, run_cfg):
+        """Warns once when the columns setting leaves out the column in which the vMix thread looks for vmix_api_header."""
+        checked = (run_cfg.vmix_api_header, run_cfg.transpose)
+        if self.projection is None or not run_cfg.vmix_api_enabled or self.projection_vmix_checked == checked:
+            return
+        self.projection_vmix_checked = checked
+        if output_column(snapshot, run_cfg.vmix_api_header, run_cfg.transpose) is None:
+            logger.warning("vMix API header '%s' is not in the first row of the fetched columns; add its column to the "
+                           "columns setting or vMix commands will not be found.", run_cfg.vmix_api_header)
+
+    def worksheet_properties(self, spreadsheet_id, worksheet_name, api_key):
+        """The tab's cached sheet properties (following renames), or None if the metadata is unavailable."""
+        try:
+            return self.metadata.sheet(spreadsheet_id, worksheet_name, self.keys_from(api_key))
+        except KeyError:
+            logger.warning("Worksheet '%s' not found in the spreadsheet metadata; requesting it by name.", worksheet_name)
+        except requests.exceptions.RequestException as e:
+            logger.warning("Could not fetch spreadsheet metadata (%s); requesting the worksheet by name.", e)
+        return None
+
+    def fetch_projected(self, api_key, spreadsheet_id, worksheet_name):
+        """Fetches only the columns of the columns setting with one batchGet request; returns the projected values."""
+        projection = self.projection
+        properties = self.worksheet_properties(spreadsheet_id, worksheet_name, api_key)
+        title = properties['title'] if properties else worksheet_name
+        row_count = properties.get('gridProperties', {}).get('rowCount') if properties else None
+        for attempt in range(2):
+            # Header names are (re)resolved at the start, after a metadata refresh and when the header row moved
+            if projection.needs_header or attempt or (projection.headers and self.projection_metadata_time != self.metadata.fetched_at):
+                header_json, _ = self.fetcher.fetch(spreadsheet_id, f"{quote_sheet_title(title)}!1:1", [api_key])
+                projection.resolve((header_json.get('values') or [[]])[0])
+                self.projection_metadata_time = self.metadata.fetched_at
+            elif projection.columns is None:
+                projection.resolve()
+            if not projection.columns:
+                raise ValueError(f"None of the columns {', '.join(projection.entries)} were found in '{title}'.")
+            response_json, _ = self.fetcher.fetch_ranges(spreadsheet_id, projection.ranges(title, row_count), [api_key],
+                                                        fields=PROJECTION_FIELDS)
+            values = projection.project(response_json.get('valueRanges', []))
+            if projection.header_matches(values):
+                break
+            logger.warning("The header row of '%s' changed; resolving the columns setting again.", title)
+        return values
+
+    def fetch_payload(self, api_key, spreadsheet_id, worksheet_name):
+        """Fetches one tick's data: {'data': values}, or {'snapshot': Snapshot, 'digest': str} with stream_values."""
+        source = self.source
+        if source is not None:
+            return {'data': source.fetch()}
+        if self.source_error:
+            raise ValueError(self.source_error)
+        if self.projection is not None:
+            return {'data': self.fetch_projected(api_key, spreadsheet_id, worksheet_name)}
+        if self.run_cfg.chunk_rows > 0:
+            # Bands go out in parallel, the first with this tick's key and the others with the keys after it
+            values, _ = self.chunked_fetcher.fetch(spreadsheet_id, worksheet_name, self.keys_from(api_key),
+                                                   self.run_cfg.chunk_rows)
+            return {'data': values}
+
+        properties = self.worksheet_properties(spreadsheet_id, worksheet_name, api_key)
+        range_name = bounded_range(properties) if properties else quote_sheet_title(worksheet_name)
+        if self.run_cfg.stream_values:
+            # Rows go straight into a snapshot as they arrive; the body and values list are never held whole
+            previous = self.last_snapshot
+            (snapshot, digest), _ = self.fetcher.fetch(spreadsheet_id, range_name, [api_key],
+                                                       parse=lambda chunks: self.build_streamed_snapshot(chunks, previous))
+            return {'snapshot': snapshot, 'digest': digest}
+
+        response_json, _ = self.fetcher.fetch(spreadsheet_id, range_name, [api_key])
+        return {'data': response_json.get('values', [])}
+
+    @staticmethod
+    def build_streamed_snapshot(chunks, previous):
+        """Parses a streamed values response into (Snapshot, digest) row by row."""
+        builder = SnapshotBuilder(previous)
+        for row in iter_values_rows(chunks):
+            builder.add_row(row)
+        return builder.finish()
+
+
+    def get_next_api_key(self, api_keys):
+        """Cycles through the API keys of the current run."""
+        if not api_keys:
+            logger.error("No valid API keys provided.")
+            return None
+        key_to_use = api_keys[self.current_api_key_index % len(api_keys)]
+        self.current_api_key_index = (self.current_api_key_index + 1) % len(api_keys)
+        return key_to_use
+
+
+    def process_vmix_api_call(self, csv_filename, header_name):
+        """
+        Reads the specified CSV file, checks for the vMix command based on the
+        header name in the first row, compares the API ID from the second row,
+        and executes the API call if needed. Designed to run in a separate thread.
+        Skips execution but updates ID on the first change detected after start.
+        """
+        logger.info("[vMix Thread] Processing CSV '%s' for header '%s'.", csv_filename, header_name)
+
+        # --- Validate Inputs ---
+        if not header_name or not isinstance(header_name, str):
+            logger.error("[vMix Thread] Invalid vMix header name provided: '%s'. Aborting.", header_name)
+            self.on_vmix_status(None, "Invalid Header Name")
+            return
+        if not csv_filename or not isinstance(csv_filename, str):
+            logger.error("[vMix Thread] Invalid CSV filename provided: '%s'. Aborting.", csv_filename)
+            self.on_vmix_status(None, "Invalid CSV Filename")
+            return
+
+        # --- Read CSV File ---
+        try:
+            # Read without header, treat all as strings initially to preserve IDs
+            with self.stage_metrics.time_stage('vmix_csv_read'):
+                df_from_csv = read_output_csv(csv_filename)
+
+            if df_from_csv.empty:
+                logger.warning("[vMix Thread] CSV file '%s' is empty. Cannot process.", csv_filename)
+                return
+
+            if df_from_csv.shape[0] < 2:
+                 logger.warning("[vMix Thread] CSV file '%s' has less than 2 rows. Cannot find header and value.", csv_filename)
+                 self.on_vmix_status(None, "CSV too short (<2 rows)")
+                 return
+
+            # --- Find Header Column and Get Value ---
+            # Find the first column index where the value in the first row matches the header_name
+            target_col_index = find_header_column(df_from_csv.iloc[0], header_name)
+
+            if target_col_index == -1:
+                logger.warning("[vMix Thread] Header '%s' not found in the first row of '%s'.", header_name, csv_filename)
+                self.on_vmix_status(None, f"Header '{header_name}' not found")
+                return
+
+            # Get the value from the second row (index 1) at the found column index
+            cell_value = df_from_csv.iloc[1, target_col_index]
+            found_location = f"row 2, column {target_col_index+1} (header '{header_name}' found in row 1)"
+            logger.debug("[vMix Thread] Found value '%s' at %s", cell_value, found_location)
+
+            # --- Process Value ---
+            if cell_value and isinstance(cell_value, str) and cell_value.strip():
+                if ',' in cell_value:
+                    # Split on every comma and trim whitespace from each part
+                    parts = [p.strip() for p in cell_value.split(',')]
+                    current_api_id = parts[0]
+                    commands = parts[1:]
+
+                    # Validate API ID and ensure at least one command is provided
+                    if not current_api_id:
+                        logger.warning("[vMix Thread] Extracted API ID is empty from cell value '%s'. Skipping.", cell_value, extra={'color': LOG_COLOR_RED})
+                        return
+                    if len(commands) == 0:
+                        logger.warning("[vMix Thread] No API command provided after the ID. Skipping.", extra={'color': LOG_COLOR_RED})
+                        self.on_vmix_status(None, "No API command provided")
+                        return
+                    if len(commands) > 10:
+                        logger.warning("[vMix Thread] More than 10 API commands provided. Only executing the first 10.", extra={'color': LOG_COLOR_RED})
+                        commands = commands[:10]
+
+                    # --- Compare ID and Execute ---
+                    if current_api_id != self.last_vmix_api_id:
+                        execute_api = True
+
+                        # --- Skip execution on the first change after start ---
+                        if self.skip_next_vmix_execution_on_change:
+                            logger.info("[vMix Thread] First change detected after start (ID: '%s'). Skipping execution, but updating ID tracker.", current_api_id)
+                            execute_api = False
+                            self.skip_next_vmix_execution_on_change = False  # Consume the flag
+                        logger.info("[vMix Thread] Updating last known vMix API ID from '%s' to '%s'.", self.last_vmix_api_id, current_api_id)
+                        self.last_vmix_api_id = current_api_id
+                        self._save_vmix_state(header_name) # Before executing: a restart never repeats this cue
+
+                        # Execute the API commands if allowed
+                        if execute_api:
+                            logger.info("[vMix Thread] New API ID detected and execution allowed. Executing commands for ID '%s'.", current_api_id, extra={'color': LOG_COLOR_ORANGE})
+                            responses = []
+                            last_status_code = None
+                            for cmd in commands:
+                                if cmd:  # Ensure command is not empty
+                                    with self.stage_metrics.time_stage('vmix_api'):
+                                        status_code, response_msg = execute_vmix_api(cmd)
+                                    responses.append(response_msg)
+                                    last_status_code = status_code  # Use the last status code (could be adjusted as needed)
+                            combined_response = "|".join(responses)
+                            self.on_vmix_status(last_status_code, combined_response)
+                    else:
+                        logger.info("[vMix Thread] API ID ('%s') hasn't changed since last known ID. Skipping.", current_api_id)
+                else:
+                    logger.warning("[vMix Thread] Value in cell ('%s') is not in the expected '<id>,<command>' format.", cell_value, extra={'color': LOG_COLOR_RED})
+                    self.on_vmix_status(None, "Invalid cell format")
+
+
+        except FileNotFoundError:
+            logger.error("[vMix Thread] CSV file not found: '%s'", csv_filename)
+            self.on_vmix_status(None, "CSV file not found")
+        except pd.errors.EmptyDataError:
+            logger.warning("[vMix Thread] CSV file '%s' is empty (Pandas EmptyDataError). Cannot process.", csv_filename)
+            self.on_vmix_status(None, "CSV is empty")
+        except PermissionError:
+             logger.error("[vMix Thread] Permission denied reading CSV file: '%s'", csv_filename)
+             self.on_vmix_status(None, "CSV permission denied")
+        except IndexError as e:
+             logger.error("[vMix Thread] IndexError accessing CSV data in '%s' (likely accessing row/col that doesn't exist): %s", csv_filename, e, exc_info=True)
+             self.on_vmix_status(None, "CSV data access error")
+        except Exception as e:
+             logger.error("[vMix Thread] Unexpected error processing CSV '%s' for vMix: %s", csv_filename, e, exc_info=True)
+             self.on_vmix_status(None, f"CSV Processing Error: {e}")
+
+
+    def run_loop(self):
+        """The main loop that triggers data fetching periodically. Reports to the front end only through callbacks."""
+        tick_count = 0
+        logger.info("Starting data fetch loop.")
+
+        while self.is_running:
+            loop_start_time = time.monotonic()
+            self.busy_since = loop_start_time
+            self.profiler.begin_tick() # No-op unless profiling was requested
+            tick_level = logging.DEBUG if self.tick_summary else logging.INFO
+            tick_outcome = "no result"
+            current_status_text = self.status[0] if self.status else ""
+            if current_status_text != "RUNNING" and "ERROR" not in current_status_text:
+                 self._set_status("RUNNING", "red")
+
+            # Get Parameters (reconfigure may have swapped run_cfg since the last iteration)
+            run_cfg = self.run_cfg
+            spreadsheet_id = run_cfg.spreadsheet_id
+            worksheet_name = run_cfg.worksheet_name
+            should_play_sound = run_cfg.play_sound
+            sound_file = run_cfg.sound_file
+            current_vmix_api_enabled = run_cfg.vmix_api_enabled
+            current_vmix_api_header = run_cfg.vmix_api_header # Crucial for the vMix thread
+            current_volume_percent = run_cfg.sound_volume
+            loop_interval = run_cfg.push_interval or run_cfg.loop_interval # Slow safety polling while pushes arrive
+            source = self.source
+            if source is not None and source.as_fast_as_possible and not source.finished:
+                loop_interval = 0.0 # Next table as soon as this one is through the pipeline
+
+            # --- Google API Fetch Start ---
+            uses_api = self.source is None and not self.source_error
+            with self.stage_metrics.time_stage('key_select'):
+                api_key = self.get_next_api_key(run_cfg.api_keys) if uses_api else None # A source needs no key
+            if uses_api and not api_key:
+                self._set_status("ERROR: No API Keys", "red")
+                time.sleep(1) # Prevent tight loop with no keys
+                continue
+
+            while not self.result_queue.empty():
+                try: old_result = self.result_queue.get_nowait()
+                except queue.Empty: break
+                logger.debug("Loop: Discarding stale result from queue: %s", old_result.get('worker_id', 'Unknown'))
+
+            worker_instance_id = f"Worker-{int(loop_start_time * 1000)}"
+            self.current_active_worker_instance_id = worker_instance_id # Mark this worker as the one we expect results from
+            logger.log(tick_level, "Loop: Intending to start %s (setting as active).", worker_instance_id)
+            self.worker_thread = threading.Thread(
+                target=self.profiler.wrap(self.fetch_data_worker),
+                args=(api_key, spreadsheet_id, worksheet_name, worker_instance_id),
+                daemon=True, name=worker_instance_id)
+            self.worker_thread.start()
+            logger.log(tick_level, "Loop: Thread for %s started with key %s.", worker_instance_id, censor_api_key(api_key))
+            # --- Google API Fetch End ---
+
+            # --- Wait for Result ---
+            result = None
+            wait_start_time = time.monotonic()
+            try:
+                logger.debug("Loop: Waiting for result from active worker '%s'...", self.current_active_worker_instance_id)
+                result = self.result_queue.get(timeout=THREAD_TIMEOUT_SECONDS)
+                if result and result.get('worker_id') != self.current_active_worker_instance_id:
+                   logger.warning("Loop: Received result from unexpected worker '%s', expected '%s'. Discarding.", result.get('worker_id'), self.current_active_worker_instance_id)
+                   result = None # Discard the stale result
+            except queue.Empty:
+                logger.warning("Loop: Timed out waiting for worker '%s' after %s seconds (using key %s).", self.current_active_worker_instance_id, THREAD_TIMEOUT_SECONDS, censor_api_key(api_key))
+                if self.current_active_worker_instance_id == worker_instance_id:
+                     self.current_active_worker_instance_id = None
+                     logger.info("Loop: Cleared active worker ID due to timeout for %s.", worker_instance_id)
+                self._set_status("ERROR: API Timeout", "red")
+                self.stage_metrics.observe('fetch_timeout', time.monotonic() - wait_start_time, api_key)
+                tick_outcome = "API timeout"
+            self.stage_metrics.observe('fetch_wait', time.monotonic() - wait_start_time, api_key)
+            # --- End Wait for Result ---
+
+            # --- Process Result ---
+            if result:
+                processed_worker_id = result.get('worker_id', 'Unknown')
+                logger.debug("Loop: Processing result received from %s", processed_worker_id)
+
+                if result.get('success'):
+                    data = result.get('data')
+                    streamed_snapshot = result.get('snapshot') # Set instead of data when stream_values is on
+                    used_api_key = result.get('api_key')
+                    fetched_worksheet = result.get('worksheet')
+                    current_data = None # Snapshot placeholder
+                    snapshot_start_time = time.monotonic()
+
+                    # --- Snapshot Creation/Padding Logic (see sheets_core.snapshot) ---
+                    if data and not isinstance(data, list): # Unexpected data format
+                         logger.error("Unexpected data format received: %s. Skipping processing.", type(data))
+                         self._set_status("ERROR: Bad Data Format", "red")
+                         self.on_error(f"Bad Data Format: {type(data)}")
+                         current_data = None # Indicate failure
+                    else:
+                        # An identical payload to the last written one reuses its snapshot
+                        if streamed_snapshot is not None:
+                            payload_digest = result.get('digest')
+                        else:
+                            payload_digest = values_digest(data) if data else None
+                        payload_unchanged_on_disk = payload_digest is not None and payload_digest == self.last_written_digest
+                        payload_unchanged = payload_unchanged_on_disk and self.last_snapshot is not None
+                        try:
+                            if payload_unchanged:
+                                current_data = self.last_snapshot
+                            elif payload_digest is not None and payload_digest == self.settle.pending_digest:
+                                current_data = self.settle.pending # Same as last tick while settling
+                            elif streamed_snapshot is not None:
+                                current_data = streamed_snapshot
+                            else:
+                                current_data = build_snapshot(data, self.last_snapshot)
+                                logger.debug("Snapshot built: %s rows x %s columns, %.1f KiB.", current_data.num_rows,
+                                             len(current_data.columns), current_data.memory_bytes() / 1024)
+                            data_shape = current_data.shape
+                        except Exception as snapshot_err:
+                            logger.error("Error building the data snapshot after padding/processing: %s", snapshot_err, exc_info=True)
+                            self._set_status("ERROR: Snapshot Creation", "red")
+                            self.on_error(f"Snapshot Error: {snapshot_err}")
+                            current_data = None # Indicate failure
+                            data_shape = None
+
+                        if data_shape == SHAPE_EMPTY:
+                            logger.warning("No data returned from %s using key %s.", fetched_worksheet, censor_api_key(used_api_key))
+                            if not self.status or self.status[0] != "RUNNING (No Data)":
+                                self._set_status("RUNNING (No Data)", "orange")
+                            tick_outcome = "no data"
+                        elif data_shape in (SHAPE_HEADER_ONLY, SHAPE_ROWS):
+                            if self.status and ("ERROR" in self.status[0] or self.status[1] == "orange"):
+                                self._set_status("RUNNING", "red")
+                            if data_shape == SHAPE_ROWS:
+                                self._check_projected_vmix_header(current_data, run_cfg)
+                    self.stage_metrics.observe('snapshot', time.monotonic() - snapshot_start_time)
+                    # --- End Snapshot Creation ---
+
+
+                    # --- Process Snapshot if successfully created/handled ---
+                    if current_data is not None: # Proceed only if snapshot creation didn't fail
+                        try:
+                            # --- Determine if data changed or needs forced write ---
+                            diff_start_time = time.monotonic()
+                            should_write = False
+                            settling = False # A change held back by the settle window
+                            change_reason = ""
+                            if self.force_write_on_next_pull:
+                                 should_write = True
+                                 change_reason = self.force_write_reason
+                                 logger.info("%s Forcing data write.", change_reason)
+                                 self.force_write_on_next_pull = False # Reset flag after use
+                                 if change_reason == FORCED_WRITE_AFTER_START:
+                                     logger.info("Resetting vMix API ID tracking on forced write.")
+                            elif self.last_snapshot is None and payload_unchanged_on_disk:
+                                logger.info("Warm start: data unchanged since the last run, keeping '%s'.", run_cfg.csv_path)
+                                self.last_snapshot = current_data
+                                self.last_written_shape = data_shape
+                                self._publish_copies(current_data, run_cfg.transpose, changed=False) # Copies may predate the last run
+                            elif self.last_snapshot is None:
+                                should_write = True
+                                change_reason = "Initial data load."
+                                logger.info("Initial data load.")
+                                logger.info("Resetting vMix API ID tracking on initial load.")
+                            elif payload_unchanged:
+                                pass # Same payload as the last write, no comparison needed
+                            elif current_data != self.last_snapshot:
+                                bypass = changed_columns(current_data, self.last_snapshot, run_cfg.settle_bypass_columns,
+                                                         run_cfg.transpose)
+                                settle_now = time.monotonic()
+                                if (run_cfg.settle_seconds <= 0 or bypass or
+                                        self.settle.offer(current_data, payload_digest, settle_now, run_cfg.settle_seconds)):
+                                    should_write = True
+                                    change_reason = "Data content changed."
+                                    logger.log(tick_level, "Data change detected compared to last pull.")
+                                    if bypass:
+                                        logger.log(tick_level, "Column(s) %s changed; writing without waiting for edits to settle.", ", ".join(bypass))
+                                    if self.settle.holding:
+                                        self.stage_metrics.observe('settle', settle_now - self.settle.first_change)
+                                        logger.log(tick_level, "Data settled after %.0f ms (%s intermediate versions dropped).",
+                                                   (settle_now - self.settle.first_change) * 1000, self.settle.superseded)
+                                else:
+                                    settling = True
+                                    logger.log(tick_level, "Data change detected; waiting %.2fs for it to settle.", run_cfg.settle_seconds)
+                            if not settling:
+                                self.settle.clear() # Written, forced, or edited back to what was written
+
+                            self.stage_metrics.observe('diff', time.monotonic() - diff_start_time)
+
+                            # --- Perform actions only if data changed/forced ---
+                            if should_write:
+                                 # Play sound only if change was due to content and enabled
+                                 if change_reason == "Data content changed." and should_play_sound:
+                                     logger.info("DATA UPDATE DETECTED - PLAYING SOUND")
+                                     self.on_sound(sound_file, current_volume_percent)
+
+                                 # --- CSV Write (transposed on the fly if enabled) and vMix API Trigger ---
+                                 csv_written_successfully = False # Flag for vMix logic
+                                 try:
+                                     # Unconditionally append '.csv' to the provided filename
+                                     csv_filename = run_cfg.csv_path
+                                     # --- Write to CSV ---
+                                     with self.stage_metrics.time_stage('csv_write'):
+                                         write_snapshot_csv(current_data, csv_filename, run_cfg.transpose)
+                                     csv_written_successfully = True
+
+                                     if change_reason == "Data content changed.": log_prefix = "DATA UPDATE DETECTED"
+                                     elif change_reason == FORCED_WRITE_AFTER_START: log_prefix = "FORCED WRITE (POST-START)"
+                                     elif change_reason == FORCED_WRITE_AFTER_RECONFIGURE: log_prefix = "FORCED WRITE (NEW OUTPUT SETTINGS)"
+                                     else: log_prefix = "INITIAL WRITE"
+                                     logger.log(tick_level, "%s - WRITING TO '%s' (Worker: %s)", log_prefix, csv_filename, processed_worker_id, extra={'color': LOG_COLOR_GREEN})
+                                     tick_outcome = f"{log_prefix} - wrote '{csv_filename}'"
+
+                                     self.on_clear_error()
+                                     if not self.status or self.status[0] != "RUNNING":
+                                         self._set_status("RUNNING", "red")
+
+                                     self.last_snapshot = current_data # Update last *original* data (never modified in place)
+                                     self.last_written_digest = payload_digest
+                                     self.last_written_shape = data_shape
+                                     self._save_written_state(csv_filename)
+                                     self._publish_copies(current_data, run_cfg.transpose)
+
+                                     # --- Trigger vMix API Call (if enabled and CSV written) ---
+                                     # Use the actual CSV filename now
+                                     if csv_written_successfully and current_vmix_api_enabled and current_vmix_api_header:
+                                         logger.log(tick_level, "[vMix Trigger] CSV written, vMix enabled. Starting vMix processing thread for header '%s' in file '%s'.", current_vmix_api_header, csv_filename)
+                                         vmix_thread = threading.Thread(
+                                             target=self.profiler.wrap(self.process_vmix_api_call),
+                                             args=(csv_filename, current_vmix_api_header), # Pass filename and header name
+                                             daemon=True,
+                                             name="vMixAPIThread"
+                                         )
+                                         vmix_thread.start()
+                                     elif csv_written_successfully and current_vmix_api_enabled and not current_vmix_api_header:
+                                          logger.warning("[vMix Trigger] vMix API Check: Enabled, but no vMix API header specified in the text field.")
+                                          self.on_vmix_status(None, "Header not specified")
+
+                                 except (IOError, PermissionError) as write_err:
+                                     logger.error("Cannot write to disk '%s': %s", csv_filename, write_err)
+                                     self.on_error(f"CANNOT WRITE TO DISK: {write_err}")
+                                     self._set_status("ERROR: File Write", "red")
+                                     csv_written_successfully = False # Ensure flag is false on error
+                                     tick_outcome = "file write failed"
+                                 except Exception as general_write_err:
+                                     logger.error("Unexpected error writing CSV '%s': %s", csv_filename, general_write_err, exc_info=True)
+                                     self.on_error(f"CSV WRITE FAILED: {general_write_err}")
+                                     self._set_status("ERROR: File Write", "red")
+                                     csv_written_successfully = False # Ensure flag is false on error
+                                     tick_outcome = "file write failed"
+                                 # --- End CSV Write and vMix API Trigger Section ---
+
+                            else: # Data has not changed (or the change is still settling)
+                                if settling:
+                                    tick_outcome = "change settling"
+                                else:
+                                    logger.log(tick_level, "No data change detected. Skipping write and vMix check.")
+                                    tick_outcome = "no change"
+                                self.on_clear_error()
+                                if not self.status or self.status[0] != "RUNNING":
+                                    self._set_status("RUNNING", "red")
+
+                        except Exception as process_err:
+                             logger.error("Unexpected error during data comparison or write preparation: %s", process_err, exc_info=True)
+                             self._set_status("ERROR: Processing Failed", "red")
+                             tick_outcome = "processing failed"
+                             self.on_error(f"Processing Error: {process_err}")
+                    # --- End Process DataFrame ---
+
+                else: # Fetch failed (result['success'] was False)
+                     error_info = result.get('error', 'Unknown fetch error')
+                     failed_api_key = result.get('api_key')
+                     logger.error("Data fetch failed using API key %s. Error: %s", censor_api_key(failed_api_key), error_info)
+                     self._set_status("ERROR: API Fetch", "red")
+                     tick_outcome = "API fetch failed"
+                     if isinstance(error_info, requests.exceptions.HTTPError) and error_info.response is not None:
+                         self.on_error(f"API Error: {error_info.response.status_code} {error_info.response.reason}")
+                     else:
+                         self.on_error(f"Fetch Error: {error_info}")
+            # --- End Process Result ---
+
+            # --- Calculate Sleep Time ---
+            loop_end_time = time.monotonic()
+            elapsed_time = loop_end_time - loop_start_time
+            if self.settle.holding: # Check again soon whether the change has settled
+                loop_interval = min(loop_interval, run_cfg.settle_poll_interval)
+            sleep_time = loop_interval - elapsed_time
+            self.stage_metrics.observe('tick', elapsed_time)
+            tick_count += 1
+            if tick_count % KEY_STATE_SAVE_EVERY == 0:
+                self._save_key_state()
+            if self.tick_summary:
+                snapshot_kib = self.last_snapshot.memory_bytes() / 1024 if self.last_snapshot is not None else 0.0
+                logger.info("Tick: %s in %.3fs (key %s, snapshot %.1f KiB)", tick_outcome, elapsed_time, censor_api_key(api_key), snapshot_kib)
+            self.profiler.end_tick()
+            self.busy_since = None
+            if self.is_running: # Check again in case stop was pressed during processing
+                if sleep_time > 0:
+                    interrupted = self._sleep(sleep_time)
+                    if interrupted:
+                        logger.info("Loop sleep interrupted by stop event.")
+                        break # Exit loop immediately
+                elif loop_interval > 0:
+                    logger.warning("Loop took %.2fs, which is longer than the interval of %.2fs.", elapsed_time, loop_interval)
+                    interrupted = self.stop_event.wait(0.01)
+                    if interrupted:
+                        logger.info("Loop yield interrupted by stop event.")
+                        break # Exit loop immediately
+            # --- End Sleep Time ---
+
+        # --- Loop cleanup ---
+        logger.info("Data fetch loop stopped.")
+        self.profiler.finish() # Write a partial profile if the loop stopped mid-session
+        self.current_active_worker_instance_id = None # Clear active worker ID
+        self._save_key_state()
+        self._close_recording() # Writes the frames still queued
+        self._close_source()
+        self.on_stopped()
@@ -0,0 +1,43 @@
+"""
+Fetch-and-write step of program.py and Sheets_Program_5_key.py.
+
+LegacyExporter fetches the worksheet through a PooledValuesFetcher, turns it
+into the legacy layout with legacy_rows and writes it atomically with
+write_legacy_csv. A payload identical to the one last written to the same,
+still existing file is not transformed or written again.
+"""
+
+import os
+
+from .pipeline import legacy_rows, values_digest, write_legacy_csv
+
+
+class LegacyExporter:
+    """One fetch -> transform -> CSV write per call, skipping unchanged payloads."""
+
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+        self.last_digest = None
+        self.last_path = None
+
+    def export(self, spreadsheet_id, worksheet, api_keys, csv_path, on_failover=None):
+        """
+        Fetches the worksheet and writes csv_path if the values changed since the last write.
+
+        Returns:
+            tuple: (True if the file was written, api_key that fetched the data)
+
+        Raises:
+            KeyError: If the response has no 'values' (an empty sheet), as before.
+            requests.exceptions.RequestException: From the fetcher.
+            OSError: If the file cannot be written.
+        """
+        data, api_key = self.fetcher.fetch(spreadsheet_id, worksheet, api_keys, on_failover=on_failover)
+        values = data["values"]
+        digest = values_digest(values)
+        if digest == self.last_digest and csv_path == self.last_path and os.path.exists(csv_path):
+            return False, api_key
+        write_legacy_csv(legacy_rows(values), csv_path)
+        self.last_digest = digest
+        self.last_path = csv_path
+        return True, api_key
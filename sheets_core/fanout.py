@@ -0,0 +1,144 @@
+"""
+Copies of the output CSV on other disks and network shares.
+
+OutputFanout writes every snapshot the engine writes locally to a list of
+further paths (for example \\\\vmix2\\graphics\\scores.csv) from a small pool of
+writer threads. publish() only hands the snapshot over, so a slow or locked
+share never holds up the local CSV, the vMix command or the next tick.
+
+Each destination has at most one write running and keeps only the newest
+snapshot waiting behind it: when changes arrive faster than a share can take
+them, the snapshots in between are skipped and the share goes straight to the
+latest one. A write that runs longer than the timeout is reported (a blocked
+file call cannot be interrupted, so its thread is left to finish or fail) and
+the destination catches up with the latest snapshot once it returns. Copies
+are written atomically like the local file.
+"""
+
+import logging
+import os
+import queue
+import re
+import threading
+import time
+
+from .metrics import StageMetrics
+from .snapshot import write_snapshot_csv
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COPY_TIMEOUT_SECONDS = 5.0
+DEFAULT_COPY_WRITERS = 4 # Most destinations written at the same time
+_PATH_SEPARATOR_RE = re.compile(r'[;\n]')
+
+
+def parse_output_copies(text):
+    """Splits the output_copies setting (paths separated by ';' or new lines) into a tuple of paths."""
+    return tuple(path.strip() for path in _PATH_SEPARATOR_RE.split(text) if path.strip())
+
+
+def same_path(first, second):
+    """True if two paths name the same file (compared after making them absolute)."""
+    return os.path.normcase(os.path.abspath(first)) == os.path.normcase(os.path.abspath(second))
+
+
+class _Sink:
+    """Write state of one destination path."""
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = None # (snapshot, transpose, time.monotonic() of publish) waiting to be written
+        self.busy_since = None # time.monotonic() the running write started; None while idle
+        self.reported_slow = False
+        self.failing = False
+        self.writes = 0
+        self.skipped = 0 # Snapshots replaced by a newer one before they were written
+
+
+class OutputFanout:
+    """Writes the latest snapshot to several extra paths in the background, one write in flight per path."""
+
+    def __init__(self, stage_metrics=None, max_writers=DEFAULT_COPY_WRITERS):
+        """
+        Args:
+            stage_metrics (StageMetrics): Receives 'output_copy' (publish to written), 'output_copy_failed'
+                and 'output_copy_timeout' observations (a private one if omitted).
+            max_writers (int): Size of the writer pool; a destination stuck in a write occupies one writer.
+                The writers are daemon threads, so a share that never answers cannot hold up exiting.
+        """
+        self.stage_metrics = stage_metrics if stage_metrics is not None else StageMetrics()
+        self.max_writers = max_writers
+        self.timeout = DEFAULT_COPY_TIMEOUT_SECONDS
+        self.sinks = {} # path -> _Sink
+        self._lock = threading.Lock()
+        self._jobs = queue.SimpleQueue() # Sinks with a snapshot to write; None stops a writer
+        self._writers = []
+
+    def configure(self, paths, timeout=DEFAULT_COPY_TIMEOUT_SECONDS):
+        """Sets the destination paths (kept state for paths listed before). Dropped paths finish their running write."""
+        with self._lock:
+            self.timeout = timeout
+            self.sinks = {path: self.sinks.get(path) or _Sink(path) for path in paths}
+            while len(self._writers) < min(len(self.sinks), self.max_writers):
+                writer = threading.Thread(target=self._writer, daemon=True, name=f"OutputCopy-{len(self._writers)}")
+                writer.start()
+                self._writers.append(writer)
+        if paths:
+            logger.info("[Output] Copying the output to %s.", ", ".join(f"'{path}'" for path in paths))
+
+    def publish(self, snapshot, transpose=False):
+        """Queues snapshot for every destination, replacing any snapshot still waiting there. Never blocks on I/O."""
+        now = time.monotonic()
+        with self._lock:
+            for sink in self.sinks.values():
+                if sink.pending is not None:
+                    sink.skipped += 1
+                sink.pending = (snapshot, transpose, now)
+                if sink.busy_since is None:
+                    sink.busy_since = now
+                    self._jobs.put(sink)
+                elif not sink.reported_slow and now - sink.busy_since > self.timeout:
+                    sink.reported_slow = True
+                    self.stage_metrics.observe('output_copy_timeout', now - sink.busy_since)
+                    logger.warning("[Output] Writing '%s' has taken %.1fs (timeout %.1fs); newer data will follow "
+                                   "once it responds.", sink.path, now - sink.busy_since, self.timeout)
+
+    def _writer(self):
+        while True:
+            sink = self._jobs.get()
+            if sink is None:
+                return
+            self._drain(sink)
+
+    def _drain(self, sink):
+        """Writes the sink's waiting snapshot until none is left (runs on a writer thread)."""
+        while True:
+            with self._lock:
+                item = sink.pending
+                sink.pending = None
+                if item is None or self.sinks.get(sink.path) is not sink:
+                    sink.busy_since = None
+                    return
+                sink.busy_since = time.monotonic()
+            snapshot, transpose, published = item
+            try:
+                write_snapshot_csv(snapshot, sink.path, transpose)
+            except Exception as e: # A broken share must not take the writer down
+                self.stage_metrics.observe('output_copy_failed', time.monotonic() - published)
+                if not sink.failing:
+                    logger.error("[Output] Could not write copy '%s': %s", sink.path, e)
+                sink.failing = True
+                continue
+            sink.writes += 1
+            self.stage_metrics.observe('output_copy', time.monotonic() - published)
+            if sink.failing or sink.reported_slow:
+                logger.info("[Output] '%s' is written again (%s snapshots skipped so far).", sink.path, sink.skipped)
+            sink.failing = sink.reported_slow = False
+
+    def close(self):
+        """Stops accepting snapshots and ends the writers; running writes are left to finish."""
+        with self._lock:
+            self.sinks = {}
+            writers, self._writers = self._writers, []
+        for _ in writers:
+            self._jobs.put(None)
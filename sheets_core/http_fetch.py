@@ -0,0 +1,207 @@
+"""
+Pooled values fetching over plain HTTP, used by every front end through SheetsEngine / LegacyExporter.
+
+PooledValuesFetcher keeps one keep-alive requests.Session with a small
+connection pool, so each tick reuses an open connection rather than opening a
+new TCP/TLS connection. A request that fails because of its key (timeout,
+connection error, 401/403/429 or 5xx) is retried on the next key in the same
+tick, as long as the tick deadline has not passed. Errors that would fail
+with any key (400/404 and the like) are raised at once.
+"""
+
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import key_label
+from .streaming import STREAM_CHUNK_BYTES
+
+SHEETS_API_BASE_URL = "https://sheets.googleapis.com"
+DEFAULT_REQUEST_TIMEOUT_SECONDS = 2.0 # Per-request connect/read timeout
+DEFAULT_TICK_DEADLINE_SECONDS = 6.0 # Give up on the remaining keys after this long in one tick
+DEFAULT_POOL_SIZE = 4
+FAILOVER_STATUS_CODES = frozenset({401, 403, 429, 500, 502, 503, 504})
+
+
+class KeyStats:
+    """Success/failure counts and latency of one API key."""
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_error = ""
+
+    def record(self, seconds, error=None):
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        if error is None:
+            self.successes += 1
+        else:
+            self.failures += 1
+            self.last_error = error
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, values):
+        stats = cls()
+        for name in vars(stats):
+            if name in values:
+                setattr(stats, name, values[name])
+        return stats
+
+    def summary(self):
+        requests_made = self.successes + self.failures
+        avg_ms = self.total_seconds / requests_made * 1000 if requests_made else 0.0
+        return f"{self.successes} ok / {self.failures} failed, avg {avg_ms:.0f} ms, max {self.max_seconds * 1000:.0f} ms"
+
+
+def is_failover_error(error):
+    """True if another API key might succeed where this request failed."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code in FAILOVER_STATUS_CODES
+    return False
+
+
+class PooledValuesFetcher:
+    """Fetches a worksheet's values JSON, rotating and failing over across API keys."""
+
+    def __init__(self, base_url=SHEETS_API_BASE_URL, request_timeout=DEFAULT_REQUEST_TIMEOUT_SECONDS,
+                 tick_deadline=DEFAULT_TICK_DEADLINE_SECONDS, pool_size=DEFAULT_POOL_SIZE):
+        self.base_url = base_url.rstrip('/')
+        self.request_timeout = request_timeout
+        self.tick_deadline = tick_deadline
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.next_key_index = 0
+        self.key_stats = {} # key label -> KeyStats
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, section, base_url=SHEETS_API_BASE_URL):
+        """Builds a fetcher using the optional request_timeout / tick_deadline (seconds) options of section."""
+        try:
+            request_timeout = config.getfloat(section, 'request_timeout', fallback=DEFAULT_REQUEST_TIMEOUT_SECONDS)
+            tick_deadline = config.getfloat(section, 'tick_deadline', fallback=DEFAULT_TICK_DEADLINE_SECONDS)
+        except ValueError:
+            request_timeout, tick_deadline = DEFAULT_REQUEST_TIMEOUT_SECONDS, DEFAULT_TICK_DEADLINE_SECONDS
+        return cls(base_url, request_timeout, tick_deadline)
+
+    def fetch(self, spreadsheet_id, worksheet, api_keys, on_failover=None, parse=None, key_index=None):
+        """
+        Fetches spreadsheets/<id>/values/<worksheet>, starting with the next key in rotation.
+
+        Args:
+            worksheet (str): A1 range: a quoted tab name or a bounded range within it.
+            api_keys (list): Non-empty API keys.
+            on_failover (callable): Optional on_failover(api_key, error) called before trying the next key.
+            parse (callable): Optional parse(chunks) reading the body as it streams in (see
+                              sheets_core.streaming); called afresh for every key tried.
+            key_index (int): Start with api_keys[key_index] instead of the next key in rotation.
+
+        Returns:
+            tuple: (parsed JSON dict or parse() result, api_key that succeeded)
+
+        Raises:
+            requests.exceptions.RequestException: The last error once no key is left or the deadline passed.
+        """
+        url = f"{self.base_url}/v4/spreadsheets/{spreadsheet_id}/values/{urllib.parse.quote(worksheet, safe='')}"
+        return self._get(url, {}, api_keys, on_failover, parse, key_index)
+
+    def fetch_ranges(self, spreadsheet_id, ranges, api_keys, fields=None, on_failover=None, key_index=None):
+        """
+        Fetches several A1 ranges in one spreadsheets/<id>/values:batchGet request, with the same key failover.
+
+        Returns:
+            tuple: (parsed JSON dict with 'valueRanges' in the order of ranges, api_key that succeeded)
+        """
+        url = f"{self.base_url}/v4/spreadsheets/{spreadsheet_id}/values:batchGet"
+        params = {'ranges': list(ranges)}
+        if fields:
+            params['fields'] = fields
+        return self._get(url, params, api_keys, on_failover, key_index=key_index)
+
+    def fetch_metadata(self, spreadsheet_id, api_keys, fields, on_failover=None):
+        """
+        Fetches spreadsheets/<id> (spreadsheets.get) limited to the fields mask, with the same key failover.
+
+        Returns:
+            tuple: (parsed JSON dict, api_key that succeeded)
+        """
+        url = f"{self.base_url}/v4/spreadsheets/{spreadsheet_id}"
+        return self._get(url, {'fields': fields}, api_keys, on_failover)
+
+    def _get(self, url, params, api_keys, on_failover=None, parse=None, key_index=None):
+        deadline = time.monotonic() + self.tick_deadline
+        if key_index is not None:
+            start_index = key_index
+        else:
+            with self._lock:
+                start_index = self.next_key_index
+        last_error = None
+        for attempt in range(len(api_keys)):
+            remaining = deadline - time.monotonic()
+            if attempt and remaining <= 0:
+                break
+            index = (start_index + attempt) % len(api_keys)
+            api_key = api_keys[index]
+            request_start = time.monotonic()
+            try:
+                response = self.session.get(url, params={**params, 'key': api_key}, stream=parse is not None,
+                                            timeout=min(self.request_timeout, max(remaining, 0.1)))
+                with response:
+                    if parse is not None and not response.ok:
+                        response.content # Read the error body now so it stays available after close
+                    response.raise_for_status()
+                    data = response.json() if parse is None else parse(response.iter_content(STREAM_CHUNK_BYTES))
+            except requests.exceptions.RequestException as e:
+                self._record(api_key, time.monotonic() - request_start, type(e).__name__)
+                last_error = e
+                if not is_failover_error(e):
+                    raise
+                if on_failover and attempt + 1 < len(api_keys):
+                    on_failover(api_key, e)
+                continue
+            self._record(api_key, time.monotonic() - request_start)
+            with self._lock:
+                self.next_key_index = index + 1 # Keep rotating from the key after the one that worked
+            return data, api_key
+        if key_index is None:
+            with self._lock:
+                self.next_key_index = start_index + 1
+        raise last_error
+
+    def _record(self, api_key, seconds, error=None):
+        with self._lock:
+            self.key_stats.setdefault(key_label(api_key), KeyStats()).record(seconds, error)
+
+    def stats_summary(self):
+        """One line with every key's counters, e.g. for a periodic log message."""
+        with self._lock:
+            parts = [f"{label}: {stats.summary()}" for label, stats in sorted(self.key_stats.items())]
+        return "; ".join(parts)
+
+    def export_key_stats(self):
+        """Returns the per-key counters as plain dicts keyed by key label (safe to save: no full keys)."""
+        with self._lock:
+            return {label: stats.as_dict() for label, stats in self.key_stats.items()}
+
+    def restore_key_stats(self, saved):
+        """Restores counters saved with export_key_stats, e.g. after a restart."""
+        with self._lock:
+            for label, values in saved.items():
+                if isinstance(values, dict):
+                    self.key_stats[label] = KeyStats.from_dict(values)
+
+    def close(self):
+        self.session.close()
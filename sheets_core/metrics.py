@@ -0,0 +1,212 @@
+"""
+Per-stage latency metrics for the polling loop.
+
+StageMetrics keeps a rolling window of monotonic timings for every stage of a
+loop iteration, both overall and per API key. The numbers can be served as
+Prometheus text by MetricsServer and appended to a CSV by MetricsCsvDumper.
+"""
+
+import collections
+import contextlib
+import csv
+import http.server
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SIZE = 1024 # Observations kept per (stage, key) window
+ALL_KEYS_LABEL = 'all'
+QUANTILES = (0.5, 0.95, 0.99)
+CSV_FIELDS = ['timestamp', 'stage', 'api_key', 'count', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+
+
+def key_label(api_key):
+    """Returns a metrics label for an API key that only reveals its last 4 characters."""
+    if not api_key:
+        return ALL_KEYS_LABEL
+    return f"...{api_key[-4:]}"
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+class StageMetrics:
+    """Thread-safe rolling latency windows keyed by (stage, api key label)."""
+
+    def __init__(self, window_size=DEFAULT_WINDOW_SIZE):
+        self.window_size = window_size
+        self._lock = threading.Lock()
+        self._windows = {} # (stage, label) -> deque of seconds
+        self._totals = {} # (stage, label) -> [count, sum_seconds] since start
+
+    def observe(self, stage, seconds, api_key=None):
+        """Records one timing for stage, under the 'all' label and, if given, the key's label."""
+        labels = (ALL_KEYS_LABEL,) if not api_key else (ALL_KEYS_LABEL, key_label(api_key))
+        with self._lock:
+            for label in labels:
+                series = (stage, label)
+                window = self._windows.get(series)
+                if window is None:
+                    window = self._windows[series] = collections.deque(maxlen=self.window_size)
+                    self._totals[series] = [0, 0.0]
+                window.append(seconds)
+                totals = self._totals[series]
+                totals[0] += 1
+                totals[1] += seconds
+
+    @contextlib.contextmanager
+    def time_stage(self, stage, api_key=None):
+        """Context manager that observes the monotonic duration of its block."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - start, api_key)
+
+    def reset(self):
+        """Drops all recorded timings."""
+        with self._lock:
+            self._windows.clear()
+            self._totals.clear()
+
+    def snapshot(self):
+        """
+        Summarises every series.
+
+        Returns:
+            list: One dict per (stage, api_key) with 'count', 'sum', 'max' and
+                  'quantiles' ({0.5: s, 0.95: s, 0.99: s}) in seconds.
+        """
+        with self._lock:
+            series = [(key, list(window), tuple(self._totals[key])) for key, window in self._windows.items()]
+        rows = []
+        for (stage, label), values, (count, total) in sorted(series):
+            if not values:
+                continue
+            values.sort()
+            rows.append({
+                'stage': stage,
+                'api_key': label,
+                'count': count,
+                'sum': total,
+                'max': values[-1],
+                'quantiles': {q: percentile(values, q) for q in QUANTILES},
+            })
+        return rows
+
+    def prometheus_text(self):
+        """Renders the snapshot in the Prometheus text exposition format (summary type)."""
+        lines = [
+            "# HELP sheets_tool_stage_seconds Duration of each polling loop stage over the rolling window.",
+            "# TYPE sheets_tool_stage_seconds summary",
+        ]
+        for row in self.snapshot():
+            labels = f'stage="{row["stage"]}",api_key="{row["api_key"]}"'
+            for q, value in row['quantiles'].items():
+                lines.append(f'sheets_tool_stage_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+            lines.append(f'sheets_tool_stage_seconds_sum{{{labels}}} {row["sum"]:.6f}')
+            lines.append(f'sheets_tool_stage_seconds_count{{{labels}}} {row["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_csv(self, csv_path):
+        """Appends the current snapshot to csv_path, writing a header row if the file is new."""
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+        with open(csv_path, 'a', newline='', encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file)
+            if write_header:
+                writer.writerow(CSV_FIELDS)
+            for row in self.snapshot():
+                q = row['quantiles']
+                writer.writerow([timestamp, row['stage'], row['api_key'], row['count'],
+                                 f"{q[0.5] * 1000:.2f}", f"{q[0.95] * 1000:.2f}",
+                                 f"{q[0.99] * 1000:.2f}", f"{row['max'] * 1000:.2f}"])
+
+
+class _MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serves GET /metrics from the StageMetrics attached to the server."""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404, "Only /metrics is available")
+            return
+        body = self.server.stage_metrics.prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("[Metrics] %s - " + format, self.address_string(), *args)
+
+
+class MetricsServer:
+    """Opt-in local HTTP endpoint exposing StageMetrics as Prometheus text on a daemon thread."""
+
+    def __init__(self, stage_metrics, port, host='127.0.0.1'):
+        self.stage_metrics = stage_metrics
+        self.host = host
+        self.port = port
+        self._httpd = None
+        self._thread = None
+
+    def start(self):
+        """Binds the port and starts serving. Raises OSError if the port is unavailable."""
+        self._httpd = http.server.ThreadingHTTPServer((self.host, self.port), _MetricsRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stage_metrics = self.stage_metrics
+        self.port = self._httpd.server_address[1] # Resolve port 0 to the bound port
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="MetricsServer")
+        self._thread.start()
+        logger.info("[Metrics] Serving Prometheus metrics on http://%s:%s/metrics", self.host, self.port)
+
+    def stop(self):
+        """Stops serving and releases the port."""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+            logger.info("[Metrics] Metrics endpoint stopped.")
+
+
+class MetricsCsvDumper:
+    """Appends a StageMetrics snapshot to a CSV file every interval_seconds on a daemon thread."""
+
+    def __init__(self, stage_metrics, csv_path, interval_seconds):
+        self.stage_metrics = stage_metrics
+        self.csv_path = csv_path
+        self.interval_seconds = interval_seconds
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="MetricsCsvDumper")
+        self._thread.start()
+        logger.info("[Metrics] Dumping stage metrics to '%s' every %ss", self.csv_path, self.interval_seconds)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            self.dump()
+
+    def dump(self):
+        try:
+            self.stage_metrics.write_csv(self.csv_path)
+        except OSError as e:
+            logger.error("[Metrics] Failed to write metrics CSV '%s': %s", self.csv_path, e)
+
+    def stop(self):
+        """Stops the dumper after writing one final snapshot."""
+        if self._thread:
+            self._stop_event.set()
+            self._thread.join(timeout=1.0)
+            self._thread = None
+            self.dump()
@@ -0,0 +1,313 @@
+"""
+The written tables as UDP multicast, for other machines on the LAN.
+
+With multicast_group set, the engine sends every table it writes to the CSV
+to that multicast group as well. Any number of machines can then run
+MulticastReceiver ("python -m sheets_core.multicast --csv scores.csv") to
+keep a local copy of the CSV, with one fetching instance and no extra
+requests or share access for them.
+
+Each table gets the next version number and goes out as a delta against the
+version before it (the rows that changed, as in sheets_core.recording), or
+as a keyframe holding the whole table. A keyframe is sent for the first
+table, whenever a delta would replace most rows, and at least every
+keyframe_seconds. The last table is repeated as a keyframe while nothing
+changes, so a receiver that joins late or missed a datagram is complete
+again within keyframe_seconds. A receiver applies a delta only on top of
+the version right before it; otherwise it waits for the next keyframe.
+
+Datagram layout (little-endian), at most MAX_DATAGRAM_BYTES:
+
+    offset  0  8s   magic b'STSMCAST'
+    offset  8  u32  stream: random per publisher, so receivers notice a restart
+    offset 12  u64  sequence number of the datagram within the stream
+    offset 20  u32  table version
+    offset 24  u8   kind: 0 = keyframe, 1 = delta
+    offset 25  u16  fragment index
+    offset 27  u16  fragment count
+    offset 29       fragment of the zlib-compressed UTF-8 JSON body
+
+The body is the one a recording frame holds: the 'values' list (header row
+first, not transposed) for a keyframe, {"n": rows, "rows": [[index, row], ...]}
+for a delta.
+"""
+
+import argparse
+import json
+import logging
+import queue
+import random
+import socket
+import struct
+import threading
+import time
+import zlib
+
+from .recording import KIND_DELTA, KIND_KEYFRAME, apply_delta, encode_delta, snapshot_values
+from .snapshot import build_snapshot, write_snapshot_csv
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MULTICAST_PORT = 5007
+DEFAULT_MULTICAST_TTL = 1 # Stay on the local network segment
+DEFAULT_KEYFRAME_SECONDS = 2.0
+MAGIC = b'STSMCAST'
+HEADER = struct.Struct('<8sIQIBHH')
+MAX_DATAGRAM_BYTES = 1400 # Below a typical Ethernet MTU, so datagrams are never fragmented by IP
+MAX_FRAGMENT_BYTES = MAX_DATAGRAM_BYTES - HEADER.size
+PARTIAL_TIMEOUT_SECONDS = 5.0 # A table whose fragments do not all arrive within this is dropped
+RECEIVE_WAKE_SECONDS = 0.5 # How often the receive thread checks whether it was closed
+
+
+def encode_body(body):
+    return zlib.compress(json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def fragment_datagrams(stream, sequence, version, kind, data):
+    """The datagrams carrying the encoded body data, numbered from sequence + 1 on."""
+    count = max(1, -(-len(data) // MAX_FRAGMENT_BYTES))
+    return [HEADER.pack(MAGIC, stream, sequence + 1 + index, version, kind, index, count)
+            + data[index * MAX_FRAGMENT_BYTES:(index + 1) * MAX_FRAGMENT_BYTES] for index in range(count)]
+
+
+class MulticastPublisher:
+    """Sends each published table to a multicast group from a background thread, as deltas plus periodic keyframes."""
+
+    def __init__(self, group, port=DEFAULT_MULTICAST_PORT, ttl=DEFAULT_MULTICAST_TTL, interface='',
+                 keyframe_seconds=DEFAULT_KEYFRAME_SECONDS, stage_metrics=None):
+        """
+        Args:
+            group (str): Multicast group address, e.g. 239.255.42.99.
+            port (int): UDP port the receivers listen on.
+            ttl (int): Router hops the datagrams may cross (1 = this network segment).
+            interface (str): IP address of the network interface to send from ('' = the system's default).
+            keyframe_seconds (float): Longest time between two keyframes, also while nothing changes.
+            stage_metrics (StageMetrics): Receives 'multicast' (publish to last datagram sent) observations.
+
+        Raises:
+            OSError: If the socket cannot be set up (for example an unknown interface address).
+        """
+        self.group = group
+        self.port = port
+        self.ttl = ttl
+        self.interface = interface
+        self.keyframe_seconds = keyframe_seconds
+        self.stage_metrics = stage_metrics
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        try:
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1) # Receivers on this PC too
+            if interface:
+                self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+        except OSError:
+            self.sock.close()
+            raise
+        self.stream = random.getrandbits(32)
+        self.sequence = 0
+        self.version = 0
+        self.values = None # Last table sent
+        self.last_keyframe = 0.0 # time.monotonic() of the last keyframe
+        self.send_failed = False
+        self._queue = queue.SimpleQueue() # (time.monotonic(), snapshot); None ends the sender
+        self._thread = threading.Thread(target=self._sender, daemon=True, name="MulticastPublisher")
+        self._thread.start()
+        logger.info("[Multicast] Sending tables to %s:%s (TTL %s%s).", group, port, ttl,
+                    f", interface {interface}" if interface else "")
+
+    def publish(self, snapshot):
+        """Queues snapshot to be sent. Never blocks on the network."""
+        self._queue.put((time.monotonic(), snapshot))
+
+    def _sender(self):
+        while True:
+            timeout = None
+            if self.values is not None:
+                timeout = max(0.0, self.last_keyframe + self.keyframe_seconds - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty: # Nothing changed for a while: repeat the table for late joiners
+                self._send(KIND_KEYFRAME, self.values)
+                continue
+            try:
+                while True: # Only the newest of several waiting tables is sent
+                    newer = self._queue.get_nowait()
+                    if newer is None:
+                        item = None
+                        break
+                    item = newer
+            except queue.Empty:
+                pass
+            if item is None:
+                return
+            published, snapshot = item
+            values = snapshot_values(snapshot)
+            if values == self.values:
+                continue
+            previous, self.values = self.values, values
+            self.version += 1
+            if previous is None or time.monotonic() - self.last_keyframe >= self.keyframe_seconds:
+                self._send(KIND_KEYFRAME, values)
+            else:
+                delta = encode_delta(previous, values)
+                if len(delta['rows']) * 2 > len(values):
+                    self._send(KIND_KEYFRAME, values)
+                else:
+                    self._send(KIND_DELTA, delta)
+            if self.stage_metrics is not None:
+                self.stage_metrics.observe('multicast', time.monotonic() - published)
+
+    def _send(self, kind, body):
+        data = encode_body(body)
+        if len(data) > 0xFFFF * MAX_FRAGMENT_BYTES:
+            logger.error("[Multicast] Table of %.1f MiB is too large to send; receivers keep the previous one.", len(data) / (1024 * 1024))
+            return
+        try:
+            for datagram in fragment_datagrams(self.stream, self.sequence, self.version, kind, data):
+                self.sequence += 1
+                self.sock.sendto(datagram, (self.group, self.port))
+        except OSError as e:
+            if not self.send_failed:
+                logger.error("[Multicast] Could not send to %s:%s: %s", self.group, self.port, e)
+            self.send_failed = True
+            return
+        if self.send_failed:
+            logger.info("[Multicast] Sending to %s:%s works again.", self.group, self.port)
+            self.send_failed = False
+        if kind == KIND_KEYFRAME:
+            self.last_keyframe = time.monotonic()
+
+    def close(self):
+        """Sends what is still queued and closes the socket."""
+        self._queue.put(None)
+        self._thread.join(RECEIVE_WAKE_SECONDS * 2)
+        self.sock.close()
+        logger.info("[Multicast] Stopped sending to %s:%s after %s tables.", self.group, self.port, self.version)
+
+
+class MulticastReceiver:
+    """Rebuilds the published table from a multicast group and hands each new version to on_table."""
+
+    def __init__(self, group, port=DEFAULT_MULTICAST_PORT, interface='', on_table=None):
+        """
+        Args:
+            group (str): Multicast group address the publisher sends to.
+            port (int): Its UDP port.
+            interface (str): IP address of the network interface to receive on ('' = the system's default).
+            on_table (callable): on_table(values, version) for every new table, on the receive thread.
+
+        Raises:
+            OSError: If the port cannot be bound or the group not joined.
+        """
+        self.group = group
+        self.port = port
+        self.on_table = on_table
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) # Several receivers on one PC
+            if hasattr(socket, 'SO_REUSEPORT'):
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self.sock.bind(('', port))
+            membership = struct.pack('4s4s', socket.inet_aton(group), socket.inet_aton(interface or '0.0.0.0'))
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        except OSError:
+            self.sock.close()
+            raise
+        self.sock.settimeout(RECEIVE_WAKE_SECONDS)
+        self.stream = None
+        self.version = None
+        self.values = None
+        self.last_sequence = None
+        self.partial = {} # (stream, version, kind) -> [fragments, time.monotonic() of the first]
+        self.tables = 0
+        self.lost_datagrams = 0
+        self.missed_versions = 0 # Deltas that could not be applied; the next keyframe catches up
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True, name="MulticastReceiver")
+        self._thread.start()
+
+    def run(self):
+        """Receives until close() is called."""
+        while not self._stop_event.is_set():
+            try:
+                datagram = self.sock.recv(MAX_DATAGRAM_BYTES)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self._stop_event.is_set():
+                    return
+                raise
+            self.handle(datagram)
+
+    def handle(self, datagram):
+        """Takes in one datagram; calls on_table when it completes a new table."""
+        if len(datagram) < HEADER.size:
+            return
+        magic, stream, sequence, version, kind, index, count = HEADER.unpack_from(datagram)
+        if magic != MAGIC or index >= count:
+            return
+        if stream != self.stream:
+            if self.stream is not None:
+                logger.info("[Multicast] The publisher restarted; waiting for its first keyframe.")
+            self.stream, self.version, self.values, self.last_sequence, self.partial = stream, None, None, None, {}
+        if self.last_sequence is not None and sequence > self.last_sequence + 1:
+            self.lost_datagrams += sequence - self.last_sequence - 1
+        if self.last_sequence is None or sequence > self.last_sequence:
+            self.last_sequence = sequence
+        if self.version is not None and version <= self.version:
+            return # A repeated keyframe of the table already held
+        key = (stream, version, kind)
+        now = time.monotonic()
+        fragments, _ = self.partial.setdefault(key, [{}, now])
+        fragments[index] = datagram[HEADER.size:]
+        if len(fragments) < count:
+            self.partial = {k: v for k, v in self.partial.items() if now - v[1] < PARTIAL_TIMEOUT_SECONDS}
+            return
+        del self.partial[key]
+        body = json.loads(zlib.decompress(b''.join(fragments[position] for position in range(count))))
+        if kind == KIND_DELTA:
+            if self.version is None or version != self.version + 1:
+                self.missed_versions += 1
+                return
+            body = apply_delta(self.values, body)
+        self.partial = {k: v for k, v in self.partial.items() if k[1] > version}
+        self.version, self.values = version, body
+        self.tables += 1
+        if self.on_table is not None:
+            self.on_table(body, version)
+
+    def close(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(RECEIVE_WAKE_SECONDS * 2)
+        self.sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Writes the tables a Sheets-Tool multicasts to a local CSV.")
+    parser.add_argument('--group', default='239.255.42.99', help="Multicast group (the tool's multicast_group)")
+    parser.add_argument('--port', type=int, default=DEFAULT_MULTICAST_PORT)
+    parser.add_argument('--interface', default='', help="IP address of the network interface to receive on")
+    parser.add_argument('--csv', required=True, help="Output CSV path")
+    parser.add_argument('--transpose', action='store_true')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    state = {'snapshot': None}
+
+    def write_table(values, version):
+        state['snapshot'] = build_snapshot(values, state['snapshot'])
+        write_snapshot_csv(state['snapshot'], args.csv, args.transpose)
+        logger.info("Version %s: wrote %s rows to '%s'.", version, state['snapshot'].num_rows, args.csv)
+
+    receiver = MulticastReceiver(args.group, args.port, args.interface, write_table)
+    logger.info("Listening on %s:%s.", args.group, args.port)
+    try:
+        receiver.run()
+    except KeyboardInterrupt:
+        receiver.close()
+
+
+if __name__ == '__main__':
+    main()
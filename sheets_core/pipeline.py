@@ -0,0 +1,184 @@
+"""
+GUI-free processing stages between a Sheets API 'values' payload and the output CSV.
+
+SheetsEngine runs these stages from run_loop and process_vmix_api_call;
+keeping them here lets the benchmarks drive exactly the same code without Tk.
+program.py and Sheets_Program_5_key.py use legacy_rows/write_legacy_csv, which
+produce their original CSV layout byte for byte without building a DataFrame.
+"""
+
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Shapes reported by build_dataframe
+SHAPE_EMPTY = 'empty' # No values at all
+SHAPE_NO_HEADER = 'no_header' # First row is empty, everything treated as data
+SHAPE_HEADER_ONLY = 'header_only' # Header row without data rows
+SHAPE_ROWS = 'rows' # Header plus padded/truncated data rows
+
+REPLACE_RETRIES = 3 # os.replace attempts while a reader (e.g. vMix on Windows) holds the target open
+REPLACE_RETRY_DELAY_SECONDS = 0.05
+
+
+def values_digest(values):
+    """Returns a short digest of a 'values' payload; equal payloads give equal digests."""
+    encoded = json.dumps(values, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def pad_rows(data_rows, num_columns):
+    """
+    Pads short rows with '' and truncates long rows so every row has num_columns cells.
+
+    Returns:
+        list: The rows, reusing the original list object for rows that already fit.
+    """
+    processed_data_rows = []
+    row_num = 1
+    for row in data_rows:
+        row_len = len(row)
+        if row_len == num_columns:
+            processed_data_rows.append(row)
+        elif row_len < num_columns:
+            padding = [''] * (num_columns - row_len)
+            processed_data_rows.append(row + padding)
+        else: # row_len > num_columns
+            logger.warning("Data row #%s found with %s items, header has %s. Truncating row.", row_num, row_len, num_columns)
+            processed_data_rows.append(row[:num_columns])
+        row_num += 1
+    return processed_data_rows
+
+
+def build_dataframe(values):
+    """
+    Builds the DataFrame run_loop compares and writes from a Sheets API 'values' list.
+
+    The first row is the header; data rows are padded or truncated to its width.
+
+    Args:
+        values (list): The 'values' list of a values().get response (may be empty).
+
+    Returns:
+        tuple: (DataFrame, shape) where shape is one of the SHAPE_* constants.
+
+    Raises:
+        TypeError: If values is not a list.
+    """
+    if not values:
+        return pd.DataFrame(), SHAPE_EMPTY
+    if not isinstance(values, list):
+        raise TypeError(f"Unexpected data format: {type(values)}")
+
+    header = values[0]
+    data_rows = values[1:]
+    if not header:
+        logger.warning("Sheet data received but has no header row. Treating all as data.")
+        return pd.DataFrame(data_rows), SHAPE_NO_HEADER
+    if not data_rows:
+        logger.warning("Sheet contains only a header row.")
+        return pd.DataFrame(columns=header), SHAPE_HEADER_ONLY
+
+    processed_data_rows = pad_rows(data_rows, len(header))
+    current_data = pd.DataFrame(processed_data_rows, columns=header)
+    logger.debug("DataFrame created successfully with shape %s", current_data.shape)
+    return current_data, SHAPE_ROWS
+
+
+def data_changed(current_data, last_data):
+    """Returns True if current_data differs from the previously written data (or there is none)."""
+    return last_data is None or not current_data.equals(last_data)
+
+
+def prepare_output(current_data, should_transpose):
+    """Returns the frame to write: transposed if requested and not empty."""
+    if should_transpose and not current_data.empty:
+        return current_data.T
+    return current_data
+
+
+def atomic_write(path, write_fn):
+    """
+    Writes path through a temporary file in the same directory, then renames it into place.
+
+    Readers see either the old or the new file, never a half-written one.
+
+    Args:
+        write_fn (callable): write_fn(f) writes the content to the open text file f.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'x', encoding='utf-8', newline='') as f:
+            write_fn(f)
+        for attempt in range(REPLACE_RETRIES):
+            try:
+                os.replace(tmp_path, path)
+                return
+            except PermissionError:
+                if attempt + 1 == REPLACE_RETRIES:
+                    raise
+                time.sleep(REPLACE_RETRY_DELAY_SECONDS)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_output_csv(df_to_write, csv_filename):
+    """Writes the output CSV without index or header row, as vMix expects."""
+    atomic_write(csv_filename, lambda f: df_to_write.to_csv(f, index=False, header=False))
+
+
+def legacy_rows(values):
+    """
+    Builds the rows program.py / Sheets_Program_5_key.py write: one output row per
+    sheet column, keyed by the first cell of each sheet row, without the header row.
+
+    Same result as their former pandas transform (dict of row[0] -> row[1:],
+    DataFrame.from_dict(orient='index').transpose()): a later duplicate key
+    replaces the earlier one's cells in the earlier one's place, and short
+    columns are padded with ''.
+
+    Raises:
+        IndexError: If values is empty or a data row is empty, as before.
+    """
+    if not values:
+        raise IndexError("pop from empty list")
+    columns = {}
+    for row in values[1:]:
+        columns[row[0]] = row[1:]
+    header = list(columns)
+    return [header] + [list(row) for row in itertools.zip_longest(*columns.values(), fillvalue='')]
+
+
+def write_legacy_csv(rows, csv_filename):
+    """Writes legacy_rows output with the same quoting and line endings pandas used."""
+    def write_rows(f):
+        csv.writer(f, lineterminator=os.linesep).writerows(rows)
+    atomic_write(csv_filename, write_rows)
+
+
+def read_output_csv(csv_filename):
+    """Reads an output CSV back as strings, exactly as the vMix thread does."""
+    return pd.read_csv(csv_filename, header=None, dtype=str, keep_default_na=False)
+
+
+def find_header_column(first_row, header_name):
+    """Returns the index of the first cell in first_row matching header_name (stripped), or -1."""
+    wanted = header_name.strip()
+    for idx, value in enumerate(first_row):
+        # Case-sensitive match after stripping whitespace
+        if isinstance(value, str) and value.strip() == wanted:
+            return idx
+    return -1
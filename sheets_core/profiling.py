@@ -0,0 +1,174 @@
+"""
+On-demand profiling of the polling loop.
+
+LoopProfiler stays idle until request() arms it, then profiles the next N loop
+iterations with cProfile: the loop thread between begin_tick() and end_tick(),
+plus every worker/vMix thread started through wrap() while the session runs.
+The merged statistics are written to a timestamped .prof file (readable with
+pstats or snakeviz) and a plain-text summary. With trace_memory=True a
+tracemalloc snapshot is taken at both ends and the top allocation growth is
+written alongside.
+
+When no session is active begin_tick()/end_tick() only test a flag and wrap()
+returns the target unchanged, so the hooks cost nothing in normal runs.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = 'profiles'
+DEFAULT_PROFILE_ITERATIONS = 10
+REPORT_LINES = 40 # Functions listed in the text summary
+MEMORY_REPORT_LINES = 30 # Allocation sites listed in the memory report
+TRACEMALLOC_FRAMES = 10
+
+
+class _ProfileSession:
+    """One armed profiling run: the loop profile, thread profiles and optional memory baseline."""
+
+    def __init__(self, iterations, trace_memory):
+        self.iterations = iterations
+        self.remaining = iterations
+        self.trace_memory = trace_memory
+        self.started_tracemalloc = False
+        self.memory_start = None
+        self.loop_profile = cProfile.Profile()
+        self.thread_profiles = [] # (thread name, Profile) from wrap()
+        self.started_at = time.time()
+        self.finished = False
+
+
+class LoopProfiler:
+    """Profiles the next N loop iterations on request; zero-cost while idle."""
+
+    def __init__(self, output_dir=DEFAULT_PROFILE_DIR):
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        self._pending = None # (iterations, trace_memory) waiting for the next begin_tick()
+        self._session = None
+        self.last_report_path = None
+
+    @property
+    def active(self):
+        return self._session is not None or self._pending is not None
+
+    def request(self, iterations=DEFAULT_PROFILE_ITERATIONS, trace_memory=False):
+        """Arms profiling for the next `iterations` loop iterations (safe to call from any thread)."""
+        iterations = max(1, int(iterations))
+        with self._lock:
+            if self._session is not None:
+                logger.warning("Profiling already running (%s iterations left). Request ignored.", self._session.remaining)
+                return False
+            self._pending = (iterations, trace_memory)
+        logger.info("Profiling armed for the next %s loop iterations%s.", iterations, " with memory snapshots" if trace_memory else "")
+        return True
+
+    def begin_tick(self):
+        """Called by the loop thread at the start of each iteration."""
+        if self._pending is None and self._session is None:
+            return
+        with self._lock:
+            if self._session is None and self._pending is not None:
+                iterations, trace_memory = self._pending
+                self._pending = None
+                self._session = self._start_session(iterations, trace_memory)
+            session = self._session
+        if session is not None:
+            session.loop_profile.enable()
+
+    def end_tick(self):
+        """Called by the loop thread at the end of each iteration (before sleeping)."""
+        session = self._session
+        if session is None:
+            return
+        session.loop_profile.disable()
+        session.remaining -= 1
+        if session.remaining <= 0:
+            self.finish()
+
+    def wrap(self, target):
+        """Returns target profiled in its own thread while a session runs, else target itself."""
+        session = self._session
+        if session is None:
+            return target
+
+        def profiled_target(*args, **kwargs):
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return target(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    if not session.finished: # Threads outliving the session are dropped
+                        session.thread_profiles.append((threading.current_thread().name, profile))
+        return profiled_target
+
+    def finish(self):
+        """Ends the running session early or on schedule and writes its reports. Call from the loop thread."""
+        with self._lock:
+            session = self._session
+            self._session = None
+            self._pending = None
+            if session is None:
+                return None
+            session.finished = True
+        session.loop_profile.disable()
+        try:
+            return self._write_reports(session)
+        except (OSError, ValueError) as e:
+            logger.error("Could not write profiling results to '%s': %s", self.output_dir, e)
+            return None
+        finally:
+            if session.started_tracemalloc:
+                tracemalloc.stop()
+
+    def _start_session(self, iterations, trace_memory):
+        session = _ProfileSession(iterations, trace_memory)
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                session.started_tracemalloc = True
+            session.memory_start = tracemalloc.take_snapshot()
+        logger.info("Profiling started for %s loop iterations.", iterations)
+        return session
+
+    def _write_reports(self, session):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(session.started_at))
+        base_path = os.path.join(self.output_dir, f"profile_{stamp}")
+        completed = session.iterations - max(0, session.remaining)
+
+        summary = io.StringIO()
+        stats = pstats.Stats(session.loop_profile, stream=summary)
+        for _, profile in session.thread_profiles:
+            stats.add(profile)
+        stats.dump_stats(base_path + '.prof')
+
+        thread_names = sorted({name for name, _ in session.thread_profiles})
+        summary.write(f"Loop iterations profiled: {completed} of {session.iterations}\n")
+        summary.write(f"Threads merged: loop thread + {len(session.thread_profiles)} ({', '.join(thread_names) or 'none'})\n\n")
+        stats.sort_stats('cumulative').print_stats(REPORT_LINES)
+        with open(base_path + '.txt', 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+
+        if session.memory_start is not None:
+            memory_end = tracemalloc.take_snapshot()
+            with open(base_path + '_memory.txt', 'w', encoding='utf-8') as f:
+                current, peak = tracemalloc.get_traced_memory()
+                f.write(f"Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n")
+                f.write(f"Top {MEMORY_REPORT_LINES} allocation sites by growth over the session:\n")
+                for stat in memory_end.compare_to(session.memory_start, 'lineno')[:MEMORY_REPORT_LINES]:
+                    f.write(f"{stat}\n")
+
+        self.last_report_path = base_path + '.txt'
+        logger.info("Profiling finished after %s iterations. Results written to '%s.prof' / '.txt'.", completed, base_path)
+        return base_path
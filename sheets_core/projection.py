@@ -0,0 +1,143 @@
+"""
+Column projection: fetch, diff and write only the columns the graphics use.
+
+The columns setting lists header names and A1 column ranges ("Team, Score,
+F:H"). ColumnProjection resolves the header names against the tab's header
+row, merges the selected columns into the fewest contiguous ranges and fetches
+them with one values:batchGet request, whose fields mask leaves out everything
+but the values. The result is reassembled into an ordinary values list holding
+only the selected columns, in the order they are listed, so the snapshot, diff,
+CSV and vMix stages work on it unchanged and an edit to any other column leaves
+the payload (and its digest) exactly as it was.
+
+Header names are resolved once and checked on every fetch against the header
+cells that come back; when a column was inserted or moved, the header row is
+read again and the fetch repeated.
+"""
+
+import logging
+import re
+
+from .sheet_metadata import column_letters, quote_sheet_title
+
+logger = logging.getLogger(__name__)
+
+PROJECTION_FIELDS = 'valueRanges/values'
+_COLUMN_RANGE_RE = re.compile(r'^([A-Za-z]{1,3}):([A-Za-z]{1,3})$')
+
+
+def column_index(letters):
+    """'A' -> 0, 'Z' -> 25, 'AA' -> 26."""
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + (ord(ch) - ord('A') + 1)
+    return index - 1
+
+
+def parse_columns_setting(text):
+    """Splits the comma-separated columns setting into a tuple of entries (empty = all columns)."""
+    return tuple(entry.strip() for entry in text.split(',') if entry.strip())
+
+
+def column_runs(indexes):
+    """Merges column indexes into sorted (first, last) runs of adjacent columns."""
+    runs = []
+    for index in sorted(set(indexes)):
+        if runs and index == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], index)
+        else:
+            runs.append((index, index))
+    return runs
+
+
+class ColumnProjection:
+    """Turns the columns setting into batchGet ranges and projects the response back into one values list."""
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries (tuple): Header names, or column ranges such as 'B:B' or 'F:H' (a colon marks a range).
+        """
+        self.entries = tuple(entries)
+        self.headers = [entry for entry in self.entries if not _COLUMN_RANGE_RE.match(entry)]
+        self.columns = None # Selected sheet column indexes in output order, once resolved
+        self.header_positions = {} # Resolved header name -> its position in the projected row
+
+    @property
+    def needs_header(self):
+        """True while header names still have to be resolved against the header row."""
+        return self.columns is None and bool(self.headers)
+
+    def resolve(self, header_row=()):
+        """
+        Maps the entries to sheet column indexes using header_row. Unknown header names are logged and skipped.
+
+        Returns:
+            list: The selected column indexes in output order (also kept in self.columns).
+        """
+        positions = {}
+        for index, name in enumerate(header_row):
+            positions.setdefault(name, index) # The first column with a repeated name wins
+        columns = []
+        for entry in self.entries:
+            match = _COLUMN_RANGE_RE.match(entry)
+            if match:
+                first, last = sorted((column_index(match.group(1)), column_index(match.group(2))))
+                selected = range(first, last + 1)
+            elif entry in positions:
+                selected = (positions[entry],)
+            else:
+                logger.warning("Column '%s' from the columns setting is not in the header row; skipping it.", entry)
+                selected = ()
+            columns.extend(index for index in selected if index not in columns)
+        self.columns = columns
+        self.header_positions = {entry: columns.index(positions[entry]) for entry in self.headers if entry in positions}
+        return columns
+
+    def ranges(self, title, row_count=None):
+        """A1 ranges covering the selected columns, bounded to row_count rows when it is known."""
+        quoted = quote_sheet_title(title)
+        ranges = []
+        for first, last in column_runs(self.columns):
+            if row_count:
+                ranges.append(f"{quoted}!{column_letters(first + 1)}1:{column_letters(last + 1)}{row_count}")
+            else:
+                ranges.append(f"{quoted}!{column_letters(first + 1)}:{column_letters(last + 1)}")
+        return ranges
+
+    def project(self, value_ranges):
+        """
+        Rebuilds one values list from the batchGet valueRanges returned for ranges().
+
+        Rows are trimmed of trailing empty cells and trailing empty rows are dropped, as a
+        values().get of just these columns would return them.
+        """
+        runs = column_runs(self.columns)
+        range_values = [value_range.get('values', []) for value_range in value_ranges]
+        offsets = {}
+        width = 0
+        for first, last in runs:
+            for index in range(first, last + 1):
+                offsets[index] = width + index - first
+            width += last - first + 1
+        order = [offsets[index] for index in self.columns]
+        num_rows = max((len(values) for values in range_values), default=0)
+        values = []
+        for row_index in range(num_rows):
+            joined = []
+            for (first, last), run_values in zip(runs, range_values):
+                cells = run_values[row_index] if row_index < len(run_values) else []
+                joined.extend(cells)
+                joined.extend([''] * (last - first + 1 - len(cells)))
+            row = [joined[offset] for offset in order]
+            while row and row[-1] == '':
+                row.pop()
+            values.append(row)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def header_matches(self, values):
+        """True if the projected header row still has every header name where it was resolved."""
+        header = values[0] if values else []
+        return all(position < len(header) and header[position] == name for name, position in self.header_positions.items())
@@ -0,0 +1,297 @@
+"""
+Recording the written tables to a file, and replaying them through the loop.
+
+With record_file set, the engine appends every table it writes to the CSV to
+a recording: a compact log of timestamped frames that rehearsals and
+post-show checks can replay. A background thread does the encoding and
+writing, so a recording never holds up the loop.
+
+Recording layout (little-endian):
+
+    offset 0  8s   magic b'STSREC01'
+    then per frame:
+              u8   kind: 0 = keyframe, 1 = delta
+              f64  time.time() the table was written
+              u32  length of the compressed body
+              ...  zlib-compressed UTF-8 JSON body
+
+A keyframe body is the whole table as a 'values' list (header row first, not
+transposed). A delta body is {"n": rows, "rows": [[index, row], ...]}: the
+table is the previous one cut or extended to n rows with the listed rows
+replaced. A keyframe is written as the first frame after opening, every
+KEYFRAME_EVERY frames, and whenever a delta would replace most rows.
+
+"<file>.idx" indexes the frames (offset, time, kind and length of each) so a
+replay can seek to a time without decoding what comes before the keyframe in
+front of it. The index is rebuilt from the log whenever it is missing or does
+not cover it; a frame cut short by a crash is dropped when the recorder
+opens the file again.
+
+ReplaySource reads a recording back frame by frame. SheetsEngine uses it as
+its table source (see sheets_core.sources) when RunConfig.replay_file is set,
+so the replayed tables go through the snapshot, change check, CSV write,
+copies and vMix stages exactly like fetched ones: in real time (or scaled by replay_speed),
+or, with replay_speed 0, one frame per iteration as fast as the loop runs.
+"""
+
+import bisect
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from .sources import TableSource
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'STSREC01'
+INDEX_MAGIC = b'STSIDX01'
+FRAME_FORMAT = '<BdI'
+FRAME_SIZE = struct.calcsize(FRAME_FORMAT)
+INDEX_FORMAT = '<QdBI' # Offset, time, kind, body length
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+KIND_KEYFRAME = 0
+KIND_DELTA = 1
+KEYFRAME_EVERY = 100 # Frames between keyframes (bounds the decoding a seek needs)
+COMPRESS_LEVEL = 6
+
+
+def snapshot_values(snapshot):
+    """The 'values' list of a Snapshot: the header row plus the (untransposed) data rows."""
+    return [list(snapshot.header)] + [list(row) for row in snapshot.rows()]
+
+
+def encode_delta(previous, values):
+    """The delta body that turns previous into values, as a dict."""
+    return {'n': len(values),
+            'rows': [[index, row] for index, row in enumerate(values) if index >= len(previous) or previous[index] != row]}
+
+
+def apply_delta(previous, delta):
+    """The values list encode_delta(previous, values) was made from. Unchanged rows are shared with previous."""
+    count = delta['n']
+    values = previous[:count] + [[]] * max(0, count - len(previous))
+    for index, row in delta['rows']:
+        values[index] = row
+    return values
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+def scan_frames(path):
+    """
+    Reads the frame headers of a recording.
+
+    Returns:
+        tuple: (list of (offset, time, kind, length) index entries, offset after the last complete frame).
+
+    Raises:
+        ValueError: If the file is not a recording.
+    """
+    entries = []
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' is not a Sheets-Tool recording.")
+        size = os.fstat(f.fileno()).st_size
+        offset = len(MAGIC)
+        while offset + FRAME_SIZE <= size:
+            f.seek(offset)
+            kind, timestamp, length = struct.unpack(FRAME_FORMAT, f.read(FRAME_SIZE))
+            if offset + FRAME_SIZE + length > size:
+                break # Cut short by a crash
+            entries.append((offset, timestamp, kind, length))
+            offset += FRAME_SIZE + length
+    return entries, offset
+
+
+def read_index(path):
+    """The index entries of a recording: from its .idx file if that covers the log, else by scanning the log."""
+    try:
+        with open(index_path(path), 'rb') as f:
+            data = f.read()
+        if data[:len(INDEX_MAGIC)] == INDEX_MAGIC:
+            entries = [struct.unpack_from(INDEX_FORMAT, data, start)
+                       for start in range(len(INDEX_MAGIC), len(data) - INDEX_SIZE + 1, INDEX_SIZE)]
+            end = entries[-1][0] + FRAME_SIZE + entries[-1][3] if entries else len(MAGIC)
+            if end == os.path.getsize(path):
+                return entries
+    except OSError:
+        pass
+    entries, _ = scan_frames(path)
+    return entries
+
+
+class SnapshotRecorder:
+    """Appends written snapshots to a recording from a background thread."""
+
+    def __init__(self, path):
+        """
+        Opens (or creates) the recording at path and its index for appending.
+
+        Raises:
+            OSError: If the files cannot be opened.
+            ValueError: If path exists but is not a recording.
+        """
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            entries, end = scan_frames(path)
+            if end < os.path.getsize(path):
+                logger.warning("[Recording] Dropping an incomplete frame at the end of '%s'.", path)
+                os.truncate(path, end)
+        else:
+            entries = []
+            with open(path, 'wb') as f:
+                f.write(MAGIC)
+        with open(index_path(path), 'wb') as f: # Rewritten so it always matches the log
+            f.write(INDEX_MAGIC + b''.join(struct.pack(INDEX_FORMAT, *entry) for entry in entries))
+        self.log_file = open(path, 'ab')
+        self.index_file = open(index_path(path), 'ab')
+        self.frames = len(entries)
+        self.previous = None # values of the last recorded frame; None writes a keyframe next
+        self.since_keyframe = 0
+        self.failed = False
+        self._queue = queue.SimpleQueue() # (time.time(), snapshot); None ends the writer
+        self._thread = threading.Thread(target=self._writer, daemon=True, name="Recorder")
+        self._thread.start()
+        logger.info("[Recording] Recording written tables to '%s' (%s frames so far).", path, self.frames)
+
+    def record(self, snapshot):
+        """Queues snapshot as the next frame, stamped with the current time. Never blocks on I/O."""
+        self._queue.put((time.time(), snapshot))
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self.failed:
+                continue
+            try:
+                self._write_frame(*item)
+            except (OSError, ValueError) as e:
+                logger.error("[Recording] Could not write to '%s': %s. Recording stopped.", self.path, e)
+                self.failed = True
+
+    def _write_frame(self, timestamp, snapshot):
+        values = snapshot_values(snapshot)
+        body = None
+        if self.previous is not None and self.since_keyframe < KEYFRAME_EVERY:
+            delta = encode_delta(self.previous, values)
+            if len(delta['rows']) * 2 <= len(values):
+                body, kind = delta, KIND_DELTA
+        if body is None:
+            body, kind = values, KIND_KEYFRAME
+        data = zlib.compress(json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), COMPRESS_LEVEL)
+        offset = self.log_file.tell()
+        self.log_file.write(struct.pack(FRAME_FORMAT, kind, timestamp, len(data)) + data)
+        self.log_file.flush()
+        self.index_file.write(struct.pack(INDEX_FORMAT, offset, timestamp, kind, len(data)))
+        self.index_file.flush()
+        self.previous = values
+        self.since_keyframe = 0 if kind == KIND_KEYFRAME else self.since_keyframe + 1
+        self.frames += 1
+
+    def close(self):
+        """Writes the frames still queued and closes the files."""
+        self._queue.put(None)
+        self._thread.join()
+        self.log_file.close()
+        self.index_file.close()
+        logger.info("[Recording] '%s' closed with %s frames.", self.path, self.frames)
+
+
+class SnapshotRecording:
+    """Random access to the frames of a recording."""
+
+    def __init__(self, path):
+        """
+        Raises:
+            OSError: If the recording cannot be read.
+            ValueError: If path is not a recording.
+        """
+        self.path = path
+        self.entries = read_index(path)
+        self.times = [entry[1] for entry in self.entries]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def index_at(self, timestamp):
+        """Index of the last frame written at or before timestamp (0 if timestamp is before the first)."""
+        return max(0, bisect.bisect_right(self.times, timestamp) - 1)
+
+    def frames(self, start=0):
+        """Yields (time, values) for every frame from index start on, decoding from the keyframe before it."""
+        first = start
+        while first > 0 and self.entries[first][2] != KIND_KEYFRAME:
+            first -= 1
+        values = []
+        with open(self.path, 'rb') as f:
+            for position in range(first, len(self.entries)):
+                offset, timestamp, kind, length = self.entries[position]
+                f.seek(offset + FRAME_SIZE)
+                body = json.loads(zlib.decompress(f.read(length)))
+                values = body if kind == KIND_KEYFRAME else apply_delta(values, body)
+                if position >= start:
+                    yield timestamp, values
+
+
+class ReplaySource(TableSource):
+    """Serves the frames of a recording as if they were being fetched, on a replay clock."""
+
+    def __init__(self, path, speed=1.0, start_seconds=0.0):
+        """
+        Args:
+            path (str): The recording.
+            speed (float): Replay clock rate (1 = real time, 2 = twice as fast); 0 serves the next frame
+                on every fetch(), as fast as the caller asks.
+            start_seconds (float): Offset into the recording to start from.
+
+        Raises:
+            OSError: If the recording cannot be read.
+            ValueError: If path is not a recording or has no frames.
+        """
+        self.recording = SnapshotRecording(path)
+        if not len(self.recording):
+            raise ValueError(f"Recording '{path}' has no frames.")
+        self.speed = speed
+        self.description = f"recording '{path}'"
+        self.start_time = self.recording.times[0] + start_seconds
+        self._frames = self.recording.frames(self.recording.index_at(self.start_time))
+        self.current = next(self._frames)
+        self.upcoming = next(self._frames, None)
+        self.served = 0 # Frames handed out by fetch()
+        self.clock_start = None # time.monotonic() of the first fetch(); the replay clock starts there
+        self.finished = False
+        logger.info("[Replay] Replaying %s frames of '%s' from %.1fs in, at %s.", len(self.recording), path, start_seconds,
+                    f"{speed:g}x speed" if speed > 0 else "full speed")
+
+    @property
+    def as_fast_as_possible(self):
+        return self.speed <= 0
+
+    def _advance(self):
+        self.current, self.upcoming = self.upcoming, next(self._frames, None)
+
+    def fetch(self):
+        """The table due on the replay clock (the next one with speed 0). After the last frame, keeps returning it."""
+        if self.clock_start is None:
+            self.clock_start = time.monotonic()
+        elif self.as_fast_as_possible and self.upcoming is not None:
+            self._advance()
+        if not self.as_fast_as_possible:
+            replay_time = self.start_time + (time.monotonic() - self.clock_start) * self.speed
+            while self.upcoming is not None and self.upcoming[0] <= replay_time:
+                self._advance()
+        self.served += 1
+        if self.upcoming is None and not self.finished:
+            self.finished = True
+            logger.info("[Replay] Reached the end of '%s' after %.1fs of recorded time.", self.recording.path,
+                        self.current[0] - self.recording.times[0])
+        return self.current[1]
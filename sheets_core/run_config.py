@@ -0,0 +1,91 @@
+"""
+Immutable settings for one run of the polling loop.
+
+The GUI builds a RunConfig from its inputs when Start is pressed and hands it to
+the loop thread, which then never reads Tk widgets. When config.ini changes
+during a run, the GUI builds a new one and the engine takes over the fields in
+LIVE_FIELDS at once (see merge_live_changes); the others wait for the next start.
+"""
+
+from dataclasses import dataclass, fields, replace
+
+from .fanout import DEFAULT_COPY_TIMEOUT_SECONDS
+from .multicast import DEFAULT_KEYFRAME_SECONDS, DEFAULT_MULTICAST_PORT, DEFAULT_MULTICAST_TTL
+from .settle import DEFAULT_SETTLE_POLL_SECONDS
+from .shared_snapshot import DEFAULT_SHARED_MEMORY_MB
+from .sheet_metadata import DEFAULT_METADATA_REFRESH_SECONDS
+
+DEFAULT_PUSH_DEBOUNCE_SECONDS = 0.3
+# Fields a running engine can switch to between two iterations without losing its caches or change tracking
+LIVE_FIELDS = frozenset({
+    'api_keys', 'loop_interval', 'csv_filename', 'transpose', 'play_sound', 'sound_file', 'sound_volume',
+    'vmix_api_enabled', 'vmix_api_header', 'stream_values', 'chunk_rows', 'metadata_refresh_seconds',
+    'push_interval', 'push_debounce', 'output_copies', 'output_copy_timeout', 'shared_memory_name', 'shared_memory_mb',
+    'settle_seconds', 'settle_poll_interval', 'settle_bypass_columns', 'multicast_group', 'multicast_port',
+    'multicast_ttl', 'multicast_interface', 'multicast_keyframe_seconds',
+})
+# Live fields after which the current data is written out again
+OUTPUT_FIELDS = ('csv_filename', 'transpose', 'output_copies', 'shared_memory_name', 'shared_memory_mb', 'multicast_group',
+                 'multicast_port', 'multicast_ttl', 'multicast_interface', 'multicast_keyframe_seconds')
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    spreadsheet_id: str
+    worksheet_name: str
+    api_keys: tuple # Non-empty keys, in rotation order
+    loop_interval: float # Seconds between iterations
+    csv_filename: str # Output path without the '.csv' suffix
+    transpose: bool
+    play_sound: bool
+    sound_file: str
+    sound_volume: int # 0-100
+    vmix_api_enabled: bool
+    vmix_api_header: str
+    sheets_api_base_url: str = '' # Empty = sheets.googleapis.com
+    stream_values: bool = False # Parse the response row by row into the snapshot (large tabs)
+    chunk_rows: int = 0 # Fetch tabs with more grid rows than this as parallel row bands (0 = one request)
+    metadata_refresh_seconds: float = DEFAULT_METADATA_REFRESH_SECONDS # Age of cached sheet IDs/titles/grid sizes
+    columns: tuple = () # Header names / column ranges to fetch and write (empty = all columns)
+    push_interval: float = 0.0 # Seconds between polls while a webhook receiver is running (0 = loop_interval)
+    push_debounce: float = DEFAULT_PUSH_DEBOUNCE_SECONDS # Quiet time after a change notification before fetching
+    output_copies: tuple = () # Further paths (e.g. network shares) written in the background with each change
+    output_copy_timeout: float = DEFAULT_COPY_TIMEOUT_SECONDS # A copy write running longer is reported as stuck
+    shared_memory_name: str = '' # Also publish each written table in this shared memory segment (empty = off)
+    shared_memory_mb: float = DEFAULT_SHARED_MEMORY_MB # Payload size of that segment
+    multicast_group: str = '' # Also send each written table to this UDP multicast group (empty = off)
+    multicast_port: int = DEFAULT_MULTICAST_PORT
+    multicast_ttl: int = DEFAULT_MULTICAST_TTL
+    multicast_interface: str = '' # IP address of the interface to send from (empty = system default)
+    multicast_keyframe_seconds: float = DEFAULT_KEYFRAME_SECONDS # Longest time between two full tables on the group
+    settle_seconds: float = 0.0 # Write a change only once it has stayed the same this long (0 = at once)
+    settle_poll_interval: float = DEFAULT_SETTLE_POLL_SECONDS # Seconds between polls while a change settles
+    settle_bypass_columns: tuple = () # Header names of columns whose changes are written without settling
+    record_file: str = '' # Append each written table to this recording (empty = off)
+    source_file: str = '' # Take the tables from this local .csv/.xlsx/.json file instead of the Sheets API (empty = off)
+    replay_file: str = '' # Take the tables from this recording instead of the Sheets API (empty = off)
+    replay_speed: float = 1.0 # Replay clock rate; 0 = one frame per iteration, as fast as possible
+    replay_start_seconds: float = 0.0 # Offset into the recording to start the replay from
+
+    @property
+    def csv_path(self):
+        return self.csv_filename + ".csv"
+
+
+def merge_live_changes(current, requested):
+    """
+    Applies the LIVE_FIELDS changes from requested to current.
+
+    Returns:
+        tuple: (RunConfig with only the live changes applied, changed live field names, changed field
+            names that need a restart). An empty api_keys is never applied; it counts as needing a restart.
+    """
+    live, restart = [], []
+    for field in fields(RunConfig):
+        if getattr(current, field.name) == getattr(requested, field.name):
+            continue
+        if field.name in LIVE_FIELDS and not (field.name == 'api_keys' and not requested.api_keys):
+            live.append(field.name)
+        else:
+            restart.append(field.name)
+    return replace(current, **{name: getattr(requested, name) for name in live}), live, restart
@@ -0,0 +1,78 @@
+"""
+Waiting for a burst of edits to settle before acting on it.
+
+While an operator types a name into a cell, successive polls can each fetch
+a different partial value, and every one of them would rewrite the CSV, play
+the sound and make the vMix thread read the file again. With a settle window
+(RunConfig.settle_seconds) the engine hands a changed table to EditSettler
+instead: the loop polls every settle_poll_interval seconds while a change is
+held, and the change is written only once the same table has been fetched
+for the whole window. Every version in between is dropped.
+
+Changes to the columns named in settle_bypass_columns are written at once,
+without waiting. A name matches a column by its header in the sheet's first
+row, or the way the vMix thread finds vmix_api_header: in the first row of
+the output CSV, which is the sheet's second row (the first data row) unless
+the output is transposed.
+"""
+
+import logging
+
+from .snapshot import output_column
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTLE_POLL_SECONDS = 0.25
+
+
+def header_column(snapshot, name):
+    """The cells of the column whose header (sheet row 1) is name, or None."""
+    return snapshot.columns[snapshot.header.index(name)] if name in snapshot.header else None
+
+
+def changed_columns(snapshot, previous, names, transpose=False):
+    """The names in names whose column (by header_column or output_column) differs between previous and snapshot."""
+    changed = []
+    for name in names:
+        for find in (header_column, lambda data, name: output_column(data, name, transpose)):
+            column = find(snapshot, name)
+            if column is not None and column != find(previous, name):
+                changed.append(name)
+                break
+    return changed
+
+
+class EditSettler:
+    """Holds back a changed table until it has stayed the same for the settle window."""
+
+    def __init__(self):
+        self.pending = None # Latest changed Snapshot not written yet
+        self.pending_digest = None # values_digest of the payload pending was built from
+        self.pending_since = None # time.monotonic() pending was first fetched
+        self.first_change = None # time.monotonic() the first of the held changes was fetched
+        self.superseded = 0 # Versions replaced by a newer one while held
+
+    @property
+    def holding(self):
+        return self.pending is not None
+
+    def offer(self, snapshot, digest, now, settle_seconds):
+        """
+        Holds snapshot, or tells whether it has been fetched unchanged for settle_seconds.
+
+        Returns:
+            bool: True if snapshot should be written now.
+        """
+        if self.pending is None or snapshot != self.pending:
+            if self.pending is None:
+                self.first_change = now
+            else:
+                self.superseded += 1
+            self.pending, self.pending_digest, self.pending_since = snapshot, digest, now
+            return False
+        return now - self.pending_since >= settle_seconds
+
+    def clear(self):
+        """Drops the held change (written, or edited back to what was written)."""
+        self.pending = self.pending_digest = self.pending_since = self.first_change = None
+        self.superseded = 0
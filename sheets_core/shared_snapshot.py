@@ -0,0 +1,213 @@
+"""
+The latest snapshot in shared memory, for other programs on the same PC.
+
+With shared_memory_name set, the engine publishes every table it writes to
+the CSV into a multiprocessing.shared_memory segment of that name as well. A
+renderer or overlay then picks up each change as soon as it is written. It
+does not have to poll the CSV's modification time or parse CSV text.
+
+Segment layout (little-endian):
+
+    offset  0  8s   magic b'STSNAP01'
+    offset  8  u64  sequence: odd while a write is in progress, +2 per published table
+    offset 16  u64  capacity: payload bytes available after the header
+    offset 24  u64  length of the current payload
+    offset 32  f64  time.time() the payload was published
+    offset 40  u64  state: 0 = live, 1 = closed by the publisher
+    offset 64       payload: UTF-8 JSON {"header": [...], "rows": [[...], ...]}
+
+The payload is the table as fetched: the header row plus the data rows, not
+transposed. The sequence number works as a seqlock. A reader takes the
+sequence, copies the payload, and takes the sequence again. It keeps the copy
+only if both values are equal and even, which means no write overlapped it.
+SharedSnapshotReader does this, and needs nothing beyond the standard library:
+
+    reader = SharedSnapshotReader('sheets_tool_snapshot')
+    sequence, table = reader.wait(0)
+    while True:
+        sequence, table = reader.wait(sequence) # Blocks until the next table is published
+
+"python -m sheets_core.shared_snapshot [name]" prints each table as it is
+published.
+"""
+
+import json
+import logging
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARED_MEMORY_NAME = 'sheets_tool_snapshot'
+DEFAULT_SHARED_MEMORY_MB = 8
+MAGIC = b'STSNAP01'
+HEADER_FORMAT = '<8sQQQdQ'
+HEADER_SIZE = 64
+STATE_LIVE = 0
+STATE_CLOSED = 1
+READ_RETRIES = 100 # Attempts to get a copy no write overlapped, before giving up for this call
+POLL_SECONDS = 0.005 # How often wait() checks the sequence number
+REATTACH_SECONDS = 1.0 # wait() reopens the segment by name after this long without news (publisher restarted)
+
+
+def encode_table(snapshot):
+    """The payload for a Snapshot: compact UTF-8 JSON of its header and (untransposed) rows."""
+    return json.dumps({'header': snapshot.header, 'rows': list(snapshot.rows())},
+                      ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class SharedSnapshotPublisher:
+    """Owns the shared memory segment and writes each new table into it under the seqlock."""
+
+    def __init__(self, name=DEFAULT_SHARED_MEMORY_NAME, size_mb=DEFAULT_SHARED_MEMORY_MB):
+        """
+        Creates (or takes over a stale) segment of size_mb MiB.
+
+        Raises:
+            OSError: If the segment cannot be created.
+        """
+        self.name = name
+        self.size_mb = size_mb
+        size = HEADER_SIZE + int(size_mb * 1024 * 1024)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError: # Left behind by a process that did not exit cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            if stale.size >= size:
+                self.shm = stale
+            else:
+                struct.pack_into('<Q', stale.buf, 40, STATE_CLOSED) # Readers still attached move to the new one
+                stale.close()
+                stale.unlink()
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.capacity = self.shm.size - HEADER_SIZE
+        self.sequence = 0
+        self.too_large_reported = False
+        struct.pack_into(HEADER_FORMAT, self.shm.buf, 0, MAGIC, self.sequence, self.capacity, 0, 0.0, STATE_LIVE)
+        logger.info("[Shared Memory] Publishing snapshots in segment '%s' (%.1f MiB).", name, self.capacity / (1024 * 1024))
+
+    def publish(self, snapshot):
+        """Writes snapshot into the segment. A table larger than the segment is skipped (and logged once)."""
+        payload = encode_table(snapshot)
+        if len(payload) > self.capacity:
+            if not self.too_large_reported:
+                logger.error("[Shared Memory] Table of %.1f MiB does not fit segment '%s' (%.1f MiB); raise "
+                             "shared_memory_mb. Readers keep the previous table.", len(payload) / (1024 * 1024),
+                             self.name, self.capacity / (1024 * 1024))
+                self.too_large_reported = True
+            return
+        buf = self.shm.buf
+        self.sequence += 1 # Odd: readers retry until the write is over
+        struct.pack_into('<Q', buf, 8, self.sequence)
+        buf[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+        struct.pack_into('<Qd', buf, 24, len(payload), time.time())
+        self.sequence += 1
+        struct.pack_into('<Q', buf, 8, self.sequence)
+
+    def close(self):
+        """Marks the segment closed for readers and removes it."""
+        struct.pack_into('<Q', self.shm.buf, 40, STATE_CLOSED)
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        logger.info("[Shared Memory] Segment '%s' closed after %s tables.", self.name, self.sequence // 2)
+
+
+class SharedSnapshotReader:
+    """Reads the latest table from a segment written by SharedSnapshotPublisher (standard library only)."""
+
+    def __init__(self, name=DEFAULT_SHARED_MEMORY_NAME):
+        self.name = name
+        self.shm = None
+
+    def _attach(self):
+        if self.shm is not None:
+            return True
+        try:
+            if sys.version_info >= (3, 13):
+                self.shm = shared_memory.SharedMemory(name=self.name, track=False)
+            else:
+                self.shm = shared_memory.SharedMemory(name=self.name)
+                if sys.platform != 'win32': # Otherwise this process would remove the segment when it exits
+                    from multiprocessing import resource_tracker
+                    resource_tracker.unregister(self.shm._name, 'shared_memory')
+        except FileNotFoundError:
+            return False
+        return True
+
+    def read(self):
+        """
+        Returns:
+            tuple: (sequence, table) with table = {'header': [...], 'rows': [[...]], 'published': time.time()},
+                or (0, None) while nothing is published yet or the segment does not exist.
+        """
+        if not self._attach():
+            return 0, None
+        buf = self.shm.buf
+        for _ in range(READ_RETRIES):
+            magic, sequence, _, length, published, state = struct.unpack_from(HEADER_FORMAT, buf, 0)
+            if magic == bytes(len(MAGIC)):
+                return 0, None # Segment created but not initialised yet
+            if magic != MAGIC:
+                raise ValueError(f"Shared memory segment '{self.name}' is not a Sheets-Tool snapshot.")
+            if state == STATE_CLOSED:
+                self.close() # The publisher went away; attach again to a new segment next time
+                return 0, None
+            if sequence == 0:
+                return 0, None
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            payload = bytes(buf[HEADER_SIZE:HEADER_SIZE + length])
+            if struct.unpack_from('<Q', buf, 8)[0] != sequence:
+                continue # A write started while copying
+            table = json.loads(payload)
+            table['published'] = published
+            return sequence, table
+        return 0, None
+
+    def wait(self, last_sequence, timeout=None):
+        """
+        Blocks until a table newer than last_sequence is published (or timeout seconds pass).
+
+        Returns:
+            tuple: (sequence, table) as read() does; (last_sequence, None) on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        reattach_at = time.monotonic() + REATTACH_SECONDS
+        while True:
+            if self._attach() and struct.unpack_from('<Q', self.shm.buf, 8)[0] != last_sequence:
+                sequence, table = self.read() # Only copy and parse the payload once the sequence moved
+                if table is not None and sequence != last_sequence:
+                    return sequence, table
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return last_sequence, None
+            if now >= reattach_at: # A publisher that crashed cannot mark its segment closed
+                self.close()
+                reattach_at = now + REATTACH_SECONDS
+            time.sleep(POLL_SECONDS)
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+
+if __name__ == '__main__':
+    reader = SharedSnapshotReader(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SHARED_MEMORY_NAME)
+    sequence = 0
+    try:
+        while True:
+            sequence, table = reader.wait(sequence)
+            delay_ms = (time.time() - table['published']) * 1000
+            print(f"#{sequence // 2}: {len(table['rows'])} rows, {len(table['header'])} columns "
+                  f"(read {delay_ms:.1f} ms after publishing)")
+            for row in table['rows'][:5]:
+                print("  ", row)
+    except KeyboardInterrupt:
+        reader.close()
@@ -0,0 +1,119 @@
+"""
+Cached spreadsheets.get metadata: the sheet ID, title and grid size of every worksheet.
+
+SheetMetadataCache fetches the properties of all sheets in one
+spreadsheets.get call (limited by a fields mask) and keeps them until
+refresh_seconds have passed or invalidate() is called, so it costs one request
+every few minutes rather than one per tick. It is used to:
+
+- request a range bounded to the grid's columns ('Tab'!A1:Z, see bounded_range)
+  instead of the bare tab name, so the API does not have to work out the data
+  region. The range is open at the bottom, so rows added since the metadata
+  was fetched are still included; columns added to the tab are picked up on
+  the next refresh (or when the API rejects the range);
+- plan the row bands of the chunked fetch mode;
+- follow a worksheet by its sheet ID, which never changes: once a title has
+  been resolved, a rename is picked up on the next refresh and the new title
+  is used from then on.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+METADATA_FIELDS = 'sheets.properties(sheetId,title,gridProperties(rowCount,columnCount))'
+DEFAULT_METADATA_REFRESH_SECONDS = 300.0
+
+
+def quote_sheet_title(title):
+    """The tab name as an A1 range prefix: 'Tab', with embedded quotes doubled."""
+    return "'" + title.replace("'", "''") + "'"
+
+
+def column_letters(count):
+    """A1 letters of the count-th column: 1 -> 'A', 26 -> 'Z', 27 -> 'AA'."""
+    letters = ''
+    while count > 0:
+        count, rem = divmod(count - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+
+def bounded_range(properties):
+    """The grid's columns of a sheet as an A1 range open at the bottom, e.g. 'Tab'!A1:Z."""
+    columns = properties.get('gridProperties', {}).get('columnCount', 0)
+    quoted = quote_sheet_title(properties['title'])
+    if columns < 1:
+        return quoted
+    return f"{quoted}!A1:{column_letters(columns)}"
+
+
+class SheetMetadataCache:
+    """Thread-safe cache of one spreadsheet's sheet properties, refreshed on a slow timer."""
+
+    def __init__(self, fetcher, refresh_seconds=DEFAULT_METADATA_REFRESH_SECONDS):
+        """
+        Args:
+            fetcher (PooledValuesFetcher): Used for the spreadsheets.get requests.
+            refresh_seconds (float): Age after which the next lookup fetches the metadata again.
+        """
+        self.fetcher = fetcher
+        self.refresh_seconds = refresh_seconds
+        self.spreadsheet_id = None
+        self.sheets = {} # title -> properties dict as returned by the API
+        self.sheets_by_id = {} # sheetId -> the same properties dicts
+        self.known_ids = {} # title asked for -> sheetId it resolved to, to follow renames
+        self.fetched_at = None # time.monotonic() of the last successful fetch
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Makes the next lookup fetch fresh metadata."""
+        with self._lock:
+            self.fetched_at = None
+
+    def sheet(self, spreadsheet_id, title, api_keys):
+        """
+        Returns the properties of the worksheet called title, fetching the metadata if it is stale.
+
+        A title that resolved to a sheet before keeps resolving to that sheet after it is renamed;
+        the returned properties carry the current title.
+
+        Raises:
+            KeyError: If the spreadsheet has no worksheet with that title (or that sheet ID).
+            requests.exceptions.RequestException: If the metadata request fails.
+        """
+        with self._lock:
+            if self.spreadsheet_id != spreadsheet_id:
+                self.known_ids = {}
+            stale = (self.spreadsheet_id != spreadsheet_id or self.fetched_at is None
+                     or time.monotonic() - self.fetched_at > self.refresh_seconds)
+            if stale:
+                self._refresh(spreadsheet_id, api_keys)
+            sheet_id = self.known_ids.get(title)
+            if sheet_id is not None and sheet_id in self.sheets_by_id:
+                properties = self.sheets_by_id[sheet_id]
+            else:
+                properties = self.sheets[title]
+                self.known_ids[title] = properties.get('sheetId')
+            return properties
+
+    def _refresh(self, spreadsheet_id, api_keys):
+        data, _ = self.fetcher.fetch_metadata(spreadsheet_id, api_keys, METADATA_FIELDS)
+        sheets = {}
+        for sheet in data.get('sheets', []):
+            properties = sheet.get('properties', {})
+            if 'title' in properties:
+                sheets[properties['title']] = properties
+        sheets_by_id = {p['sheetId']: p for p in sheets.values() if 'sheetId' in p}
+        for sheet_id in set(self.known_ids.values()):
+            old, new = self.sheets_by_id.get(sheet_id), sheets_by_id.get(sheet_id)
+            if old and new and old['title'] != new['title']:
+                logger.warning("Worksheet '%s' (sheet ID %s) is now called '%s'; following the rename.",
+                               old['title'], sheet_id, new['title'])
+        self.spreadsheet_id = spreadsheet_id
+        self.sheets = sheets
+        self.sheets_by_id = sheets_by_id
+        self.fetched_at = time.monotonic()
+        logger.debug("Fetched metadata of %s worksheets for spreadsheet %s.", len(sheets), spreadsheet_id)
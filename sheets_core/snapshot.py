@@ -0,0 +1,239 @@
+"""
+Compact column-wise snapshots of a worksheet, for change detection and CSV output.
+
+A Snapshot stores the padded table as one tuple per column instead of a pandas
+object DataFrame. build_snapshot reuses the previous snapshot wherever it can:
+a column equal to the previous one is kept as the previous tuple, and in
+changed columns every cell equal to the one at the same position last time
+keeps the previous string object. Repeated labels within the changed columns
+share one string object. Freshly parsed strings for unchanged cells are
+therefore dropped at once, and comparing two snapshots mostly compares
+tuples by identity.
+
+SnapshotBuilder does the same one row at a time, for rows streamed out of the
+HTTP response (see sheets_core.streaming), and digests them on the way.
+
+write_snapshot_csv writes the same bytes as build_dataframe + prepare_output +
+write_output_csv in sheets_core.pipeline.
+"""
+
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sys
+
+from .pipeline import SHAPE_EMPTY, SHAPE_NO_HEADER, SHAPE_HEADER_ONLY, SHAPE_ROWS, atomic_write, find_header_column, pad_rows
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+    """One fetched table: header tuple plus column tuples of equal length."""
+
+    __slots__ = ('header', 'columns', 'num_rows', 'shape', 'column_bytes')
+
+    def __init__(self, header, columns, num_rows, shape, column_bytes):
+        self.header = header
+        self.columns = columns
+        self.num_rows = num_rows
+        self.shape = shape
+        self.column_bytes = column_bytes # Approximate bytes held by each column tuple and its strings
+
+    def __eq__(self, other):
+        if not isinstance(other, Snapshot):
+            return NotImplemented
+        return (self.num_rows == other.num_rows and self.header == other.header
+                and self.columns == other.columns)
+
+    __hash__ = None
+
+    @property
+    def num_cells(self):
+        return self.num_rows * len(self.columns)
+
+    def memory_bytes(self):
+        """Approximate memory held by this snapshot (strings shared between columns count once per column)."""
+        header_bytes = sys.getsizeof(self.header) + sum(sys.getsizeof(name) for name in self.header)
+        return sys.getsizeof(self) + sys.getsizeof(self.columns) + header_bytes + sum(self.column_bytes)
+
+    def rows(self, transpose=False):
+        """Yields the output rows: table rows, or one row per column when transposed (and not empty)."""
+        if transpose and self.num_cells:
+            return iter(self.columns)
+        if not self.columns:
+            return itertools.repeat((), self.num_rows)
+        return zip(*self.columns)
+
+
+def _share_strings(column, old, pool):
+    """Returns column as a tuple whose cells reuse old's object at the same row, or pool's, when equal."""
+    if old is None:
+        return tuple(pool.setdefault(value, value) for value in column)
+    pairs = itertools.zip_longest(old[:len(column)], column) # Rows added since last time have no old cell
+    return tuple(pool.setdefault(value, old_value if old_value == value else value) for old_value, value in pairs)
+
+
+def _column_bytes(column):
+    unique = {id(value): value for value in column}
+    return sys.getsizeof(column) + sum(sys.getsizeof(value) for value in unique.values())
+
+
+def build_snapshot(values, previous=None):
+    """
+    Builds a Snapshot from a Sheets API 'values' list, sharing objects with previous.
+
+    Rows are padded/truncated to the header exactly as build_dataframe does; without a
+    header every row is data and short rows are padded with None.
+
+    Raises:
+        TypeError: If values is not a list.
+    """
+    if not values:
+        return Snapshot((), (), 0, SHAPE_EMPTY, [])
+    if not isinstance(values, list):
+        raise TypeError(f"Unexpected data format: {type(values)}")
+
+    header = values[0]
+    data_rows = values[1:]
+    if not header:
+        logger.warning("Sheet data received but has no header row. Treating all as data.")
+        shape = SHAPE_NO_HEADER
+        width = max((len(row) for row in data_rows), default=0)
+        rows = [row if len(row) == width else row + [None] * (width - len(row)) for row in data_rows]
+    elif not data_rows:
+        logger.warning("Sheet contains only a header row.")
+        shape = SHAPE_HEADER_ONLY
+        width = len(header)
+        rows = []
+    else:
+        shape = SHAPE_ROWS
+        width = len(header)
+        rows = pad_rows(data_rows, width)
+
+    header = tuple(header)
+    if previous is not None and previous.header == header:
+        header = previous.header
+    new_columns = list(zip(*rows)) if rows else [()] * width
+
+    previous_columns = previous.columns if previous is not None else ()
+    pool = {} # value -> shared string object, for the changed columns
+    columns = []
+    column_bytes = []
+    for index, column in enumerate(new_columns):
+        old = previous_columns[index] if index < len(previous_columns) else None
+        if old is not None and old == column:
+            columns.append(old)
+            column_bytes.append(previous.column_bytes[index])
+            continue
+        column = _share_strings(column, old, pool)
+        columns.append(column)
+        column_bytes.append(_column_bytes(column))
+    return Snapshot(header, tuple(columns), len(rows), shape, column_bytes)
+
+
+class SnapshotBuilder:
+    """
+    Builds the same Snapshot as build_snapshot(values, previous) from rows added one at a time.
+
+    Each cell goes straight into its column, reusing previous's string at the same position when
+    equal, so a fetched row is not kept once it has been added. finish() also returns the
+    values_digest of the rows, computed as they arrived.
+    """
+
+    def __init__(self, previous=None):
+        self.previous_columns = previous.columns if previous is not None else ()
+        self.previous = previous
+        self.header = None
+        self.columns = []
+        self.num_rows = 0
+        self.pool = {}
+        self.digest = hashlib.blake2b(digest_size=16)
+        self.digest.update(b'[')
+
+    def add_row(self, row):
+        if self.header is None:
+            self.digest.update(json.dumps(row, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+            self.header = tuple(row)
+            if self.header:
+                self.columns = [[] for _ in self.header]
+            return
+        self.digest.update(b',' + json.dumps(row, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+        row_index = self.num_rows
+        self.num_rows += 1
+        width = len(self.columns)
+        if self.header:
+            if len(row) > width:
+                logger.warning("Data row #%s found with %s items, header has %s. Truncating row.", self.num_rows, len(row), width)
+                row = row[:width]
+            fill = ''
+        else: # No header: the table is as wide as the longest row, shorter rows padded with None
+            while len(self.columns) < len(row):
+                self.columns.append([None] * row_index)
+            width = len(self.columns)
+            fill = None
+        pool = self.pool
+        previous_columns = self.previous_columns
+        for index in range(width):
+            value = row[index] if index < len(row) else fill
+            column = self.columns[index]
+            if index < len(previous_columns):
+                old_column = previous_columns[index]
+                if row_index < len(old_column) and old_column[row_index] == value:
+                    value = old_column[row_index]
+            column.append(pool.setdefault(value, value))
+
+    def finish(self):
+        """Returns (Snapshot, digest); the digest is None for an empty response, like the engine's values_digest use."""
+        if self.header is None:
+            return Snapshot((), (), 0, SHAPE_EMPTY, []), None
+        self.digest.update(b']')
+        if not self.header:
+            logger.warning("Sheet data received but has no header row. Treating all as data.")
+            shape = SHAPE_NO_HEADER
+        elif not self.num_rows:
+            logger.warning("Sheet contains only a header row.")
+            shape = SHAPE_HEADER_ONLY
+        else:
+            shape = SHAPE_ROWS
+        header = self.header
+        if self.previous is not None and self.previous.header == header:
+            header = self.previous.header
+        columns = []
+        column_bytes = []
+        for index, column in enumerate(self.columns):
+            column = tuple(column)
+            self.columns[index] = None # Free the list as soon as its tuple exists
+            old = self.previous_columns[index] if index < len(self.previous_columns) else None
+            if old is not None and old == column:
+                columns.append(old)
+                column_bytes.append(self.previous.column_bytes[index])
+            else:
+                columns.append(column)
+                column_bytes.append(_column_bytes(column))
+        return Snapshot(header, tuple(columns), self.num_rows, shape, column_bytes), self.digest.hexdigest()
+
+
+def output_column(snapshot, name, transpose=False):
+    """
+    The cells of the output CSV column whose first cell is name, or None.
+
+    This is how the vMix thread finds vmix_api_header: in the first row of the CSV, which is the
+    sheet's second row (the first data row), or its first column when transposed.
+    """
+    first_row = next(snapshot.rows(transpose), None)
+    index = find_header_column(first_row, name) if first_row is not None else -1
+    if index < 0:
+        return None
+    if transpose and snapshot.num_cells:
+        return tuple(column[index] for column in snapshot.columns)
+    return snapshot.columns[index]
+
+
+def write_snapshot_csv(snapshot, csv_filename, transpose=False):
+    """Writes the output CSV (no header row, optionally transposed) atomically, as vMix expects."""
+    def write_rows(f):
+        csv.writer(f, lineterminator=os.linesep).writerows(snapshot.rows(transpose))
+    atomic_write(csv_filename, write_rows)
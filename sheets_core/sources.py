@@ -0,0 +1,267 @@
+"""
+Tables from somewhere other than the Sheets API.
+
+A TableSource hands the engine a tick's table as a Sheets API 'values' list
+(header row first, every cell a string, trailing empty cells and rows left
+out). SheetsEngine.fetch_payload takes the table from the run's source instead
+of fetch_data_worker's API request whenever one is set, so the snapshot,
+change check, CSV write, copies and vMix stages stay the same. Sources:
+
+    LocalFileSource                  - RunConfig.source_file: a local .csv, .xlsx or .json file
+    sheets_core.recording.ReplaySource - RunConfig.replay_file: a recording of an earlier run
+
+A source can also announce changes: watch(on_change) makes it call on_change
+(SheetsEngine.notify_change) whenever its data may have changed, and the loop
+then fetches right away instead of waiting for the next interval.
+LocalFileSource watches its file's directory with inotify on Linux and checks
+the file's size and modification time every FILE_POLL_SECONDS elsewhere, so a
+saved file reaches the CSV within milliseconds without a fast loop interval.
+"""
+
+import abc
+import csv
+import ctypes
+import ctypes.util
+import datetime
+import importlib.util
+import json
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from .state import file_signature
+
+logger = logging.getLogger(__name__)
+
+FILE_POLL_SECONDS = 0.05 # Signature checks of a source file where inotify is not available
+READ_ATTEMPTS = 5 # Reads of a source file that fails to parse (often half-written) before giving up for this tick
+READ_RETRY_SECONDS = 0.02
+WATCH_WAKE_SECONDS = 0.5 # How often the inotify thread checks whether it was closed
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+INOTIFY_EVENT = struct.Struct('iIII') # wd, mask, cookie, name length (native byte order)
+
+
+class TableSource(abc.ABC):
+    """Where the engine takes each tick's table from in place of the Sheets API."""
+
+    description = 'source'
+    as_fast_as_possible = False # True: the loop starts the next iteration at once instead of after its interval
+    finished = False # True once a source with an end (a replay) has served its last table
+
+    @abc.abstractmethod
+    def fetch(self):
+        """
+        Returns:
+            list: The current table as a 'values' list.
+
+        Raises:
+            Exception: Anything the engine should report as a failed fetch.
+        """
+
+    def watch(self, on_change):
+        """Starts calling on_change() (from any thread) whenever the data may have changed. Optional."""
+
+    def close(self):
+        """Stops watching and releases the source."""
+
+
+def cell_text(value):
+    """A cell value as the Sheets API would format it by default."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat() if value.time() == datetime.time() else value.isoformat(sep=' ')
+    return str(value)
+
+
+def trim_values(rows):
+    """Converts rows of cell values to a 'values' list, without trailing empty cells and rows like the Sheets API."""
+    values = []
+    for row in rows:
+        cells = [cell_text(value) for value in row]
+        while cells and cells[-1] == '':
+            cells.pop()
+        values.append(cells)
+    while values and not values[-1]:
+        values.pop()
+    return values
+
+
+def read_csv_values(path, worksheet_name=''):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return trim_values(csv.reader(f))
+
+
+def read_json_values(path, worksheet_name=''):
+    """
+    Reads a JSON table: a Sheets API response ({"values": [...]}), a list of rows, a list of
+    objects (keys become the header row) or an object holding one of these per tab name.
+    """
+    with open(path, encoding='utf-8-sig') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        if 'values' in data:
+            data = data['values']
+        elif worksheet_name in data:
+            data = data[worksheet_name]
+            if isinstance(data, dict):
+                data = data.get('values', [])
+        else:
+            raise ValueError(f"'{path}' has neither 'values' nor a '{worksheet_name}' entry.")
+    if not isinstance(data, list):
+        raise ValueError(f"'{path}' does not hold a list of rows.")
+    if data and all(isinstance(item, dict) for item in data):
+        header = list(dict.fromkeys(key for item in data for key in item))
+        return trim_values([header] + [[item.get(key) for key in header] for item in data])
+    if not all(isinstance(row, list) for row in data):
+        raise ValueError(f"'{path}' mixes rows with other values.")
+    return trim_values(data)
+
+
+def read_xlsx_values(path, worksheet_name=''):
+    """Reads the worksheet_name tab of a workbook (the first tab if it has none of that name); formulas give their saved results."""
+    import openpyxl
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[worksheet_name] if worksheet_name in workbook.sheetnames else workbook.worksheets[0]
+        return trim_values(sheet.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+FILE_READERS = {'.csv': read_csv_values, '.json': read_json_values, '.xlsx': read_xlsx_values}
+
+
+class LocalFileSource(TableSource):
+    """A local CSV, XLSX or JSON file, read again whenever its size or modification time changes."""
+
+    def __init__(self, path, worksheet_name=''):
+        """
+        Args:
+            path (str): The file; it may appear only after the run started.
+            worksheet_name (str): Tab of a workbook, or entry of a JSON object, to read.
+
+        Raises:
+            ValueError: If the file type is not supported (or .xlsx without openpyxl installed).
+        """
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in FILE_READERS:
+            raise ValueError(f"Unsupported source file type '{extension}' (use .csv, .xlsx or .json).")
+        if extension == '.xlsx' and importlib.util.find_spec('openpyxl') is None:
+            raise ValueError("Reading .xlsx files needs openpyxl (pip install openpyxl).")
+        self.path = path
+        self.worksheet_name = worksheet_name
+        self.reader = FILE_READERS[extension]
+        self.description = f"file '{path}'"
+        self.signature = None # file_signature of the file self.values were read from
+        self.values = None
+        self._stop_event = threading.Event()
+        self._watch_thread = None
+
+    def fetch(self):
+        """The file's table; the previous one while the file is unchanged. A file that fails to parse is read again."""
+        last_error = None
+        for _ in range(READ_ATTEMPTS):
+            signature = file_signature(self.path)
+            if signature is None:
+                raise FileNotFoundError(f"Source file '{self.path}' not found.")
+            if signature == self.signature:
+                return self.values
+            try:
+                values = self.reader(self.path, self.worksheet_name)
+            except FileNotFoundError:
+                raise
+            except Exception as e: # Most often a file caught halfway through being written
+                last_error = e
+            else:
+                if file_signature(self.path) == signature: # Otherwise it was written to while being read
+                    self.signature, self.values = signature, values
+                    return values
+            time.sleep(READ_RETRY_SECONDS)
+        raise last_error or ValueError(f"Source file '{self.path}' kept changing while being read.")
+
+    def watch(self, on_change):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        self._stop_event.clear()
+        try:
+            fd = _inotify_open(directory)
+        except OSError as e:
+            logger.info("[Source] Checking '%s' for changes every %s ms (no inotify: %s).", self.path, int(FILE_POLL_SECONDS * 1000), e)
+            target = self._poll_file
+            args = (on_change,)
+        else:
+            logger.info("[Source] Watching '%s' for changes with inotify.", self.path)
+            target = self._watch_inotify
+            args = (fd, on_change)
+        self._watch_thread = threading.Thread(target=target, args=args, daemon=True, name="SourceWatch")
+        self._watch_thread.start()
+
+    def _watch_inotify(self, fd, on_change):
+        name = os.fsencode(os.path.basename(self.path))
+        try:
+            while not self._stop_event.is_set():
+                if not select.select([fd], [], [], WATCH_WAKE_SECONDS)[0]:
+                    continue
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                changed = lost = False
+                offset = 0
+                while offset + INOTIFY_EVENT.size <= len(data):
+                    _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                    event_name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b'\0')
+                    offset += INOTIFY_EVENT.size + length
+                    changed = changed or event_name == name or bool(mask & IN_Q_OVERFLOW)
+                    lost = lost or bool(mask & IN_IGNORED)
+                if changed:
+                    on_change()
+                if lost: # The directory itself went away
+                    logger.warning("[Source] Lost the inotify watch on '%s'; checking for changes by polling.", self.path)
+                    self._poll_file(on_change)
+                    return
+        finally:
+            os.close(fd)
+
+    def _poll_file(self, on_change):
+        last = file_signature(self.path)
+        while not self._stop_event.wait(FILE_POLL_SECONDS):
+            signature = file_signature(self.path)
+            if signature != last:
+                last = signature
+                on_change()
+
+    def close(self):
+        self._stop_event.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(WATCH_WAKE_SECONDS * 2)
+            self._watch_thread = None
+
+
+def _inotify_open(directory):
+    """An inotify descriptor watching directory for written, created and renamed-in files (Linux only)."""
+    if not sys.platform.startswith('linux'):
+        raise OSError("inotify is only available on Linux")
+    libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+    if libc.inotify_add_watch(fd, os.fsencode(directory), IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+        error = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(error, os.strerror(error), directory)
+    return fd
@@ -0,0 +1,86 @@
+"""
+Small JSON state file that lets SheetsEngine resume after a restart.
+
+The engine records what it last wrote (payload digest, table shape and the
+output file's size/mtime), the last vMix command ID it handled and the API
+key rotation/health counters. On the next start with the same spreadsheet,
+worksheet, output file, transpose and columns settings, and an output file that still
+matches, the engine picks up from there instead of forcing a rewrite and
+skipping the first vMix change. Every update rewrites the file atomically, so a
+crash leaves either the previous or the new state, never a torn one.
+"""
+
+import json
+import logging
+import os
+import threading
+
+from .pipeline import atomic_write
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = 'sheets_tool_state.json'
+STATE_VERSION = 1
+
+
+def run_identity(run_cfg):
+    """The RunConfig fields the saved output depends on; state from a different run is ignored."""
+    return {
+        'spreadsheet_id': run_cfg.spreadsheet_id,
+        'worksheet_name': run_cfg.worksheet_name,
+        'csv_path': os.path.abspath(run_cfg.csv_path),
+        'transpose': bool(run_cfg.transpose),
+        'columns': list(run_cfg.columns),
+    }
+
+
+def file_signature(path):
+    """Returns [size, mtime_ns] of path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class StateStore:
+    """Thread-safe load/update of the engine state file."""
+
+    def __init__(self, path=DEFAULT_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = None # Loaded lazily; {} when missing or unreadable
+
+    def load(self):
+        """Returns a copy of the saved state ({} if there is none or it cannot be read)."""
+        with self._lock:
+            if self._state is None:
+                self._state = self._read()
+            return dict(self._state)
+
+    def update(self, **fields):
+        """Merges fields into the state and rewrites the file. Errors are logged, not raised."""
+        with self._lock:
+            if self._state is None:
+                self._state = self._read()
+            self._state.update(fields)
+            self._state['version'] = STATE_VERSION
+            text = json.dumps(self._state, indent=1, sort_keys=True)
+            try:
+                atomic_write(self.path, lambda f: f.write(text))
+            except OSError as e:
+                logger.error("Could not save engine state to '%s': %s", self.path, e)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable engine state file '%s': %s", self.path, e)
+            return {}
+        if not isinstance(state, dict) or state.get('version') != STATE_VERSION:
+            logger.warning("Ignoring engine state file '%s' with an unknown format.", self.path)
+            return {}
+        return state
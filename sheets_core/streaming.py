@@ -0,0 +1,113 @@
+"""
+Incremental parsing of a Sheets API values response.
+
+iter_values_rows reads the response body chunk by chunk and yields the rows of
+its "values" array one at a time, so the whole body, the parsed dict and the
+values list never have to exist at once. Each row is decoded with the stdlib
+JSON scanner (JSONDecoder.raw_decode); only the object/array punctuation around
+the rows is handled here. Other top-level fields ("range", "majorDimension")
+are parsed and dropped.
+"""
+
+import codecs
+import json
+
+STREAM_CHUNK_BYTES = 64 * 1024
+_WHITESPACE = ' \t\n\r'
+
+
+class _JsonStream:
+    """A text buffer over an iterator of byte chunks, refilled on demand."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Appends the next chunk to the buffer. Returns False at the end of the body."""
+        if self.eof:
+            return False
+        if self.pos > STREAM_CHUNK_BYTES: # Drop what has been consumed so the buffer stays about one chunk long
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.buffer += self._decoder.decode(chunk)
+                return True
+        self.buffer += self._decoder.decode(b'', final=True)
+        self.eof = True
+        return True
+
+    def peek(self):
+        """Returns the next non-whitespace character without consuming it ('' at the end)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def take(self, allowed):
+        """Consumes the next non-whitespace character, which must be one of allowed."""
+        char = self.peek()
+        if not char or char not in allowed:
+            raise ValueError(f"Malformed values response: expected one of {allowed!r} at offset {self.pos}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decodes and consumes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                result, end = self._json.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill() and self.eof:
+                    raise
+                continue
+            # A number or literal that ends the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self.buffer[self.pos] not in '["{':
+                self._fill()
+                continue
+            self.pos = end
+            return result
+
+
+def iter_values_rows(chunks):
+    """
+    Yields each row of the "values" array in a values().get response body.
+
+    Args:
+        chunks (iterable): The body as byte chunks (e.g. response.iter_content()).
+
+    Raises:
+        ValueError: If the body is not a JSON object or a row is not a list.
+    """
+    stream = _JsonStream(chunks)
+    stream.take('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.value()
+        stream.take(':')
+        if key == 'values':
+            stream.take('[')
+            if stream.peek() == ']':
+                stream.take(']')
+            else:
+                while True:
+                    row = stream.value()
+                    if not isinstance(row, list):
+                        raise ValueError(f"Unexpected data format: row is {type(row)}")
+                    yield row
+                    if stream.take(',]') == ']':
+                        break
+        else:
+            stream.value()
+        if stream.take(',}') == '}':
+            return
@@ -0,0 +1,366 @@
+"""
+Runs the polling job in a child process under a supervising parent.
+
+In the GUI process the Tk event loop shares the GIL with the fetch loop, the
+snapshot/CSV work and the vMix threads, and a call that never returns can
+wedge the whole program. EngineSupervisor instead starts the SheetsEngine in
+a separate Python process ("python -m sheets_core.supervisor") and talks to it
+over the child's stdin/stdout pipes with pickled tuples:
+
+    parent -> child   ('start', run_cfg, options), ('reconfigure', run_cfg, options), ('notify',), ('stop',)
+    child -> parent   ('status', text, color), ('error', text), ('clear_error',),
+                      ('vmix', status_code, message), ('sound', file, volume),
+                      ('observe', stage, seconds, api_key), ('log', record_dict),
+                      ('heartbeat', busy_seconds)
+
+Callbacks, log records and stage timings from the child arrive in the parent
+exactly as a SheetsEngine in the same process would deliver them. A child
+that exits without being asked to, stops sending heartbeats or reports an
+iteration running longer than hang_seconds is killed and started again with
+the same RunConfig (after a growing back-off); with a state file the new
+child resumes without rewriting the CSV or repeating a vMix command.
+The options of 'start' and 'reconfigure' carry the parent's tick_summary and
+log level, so a config reload reaches the child like an in-process engine.
+
+EngineSupervisor has the start/stop/join/notify_change/reconfigure/status/tick_summary
+surface SHEETS_TOOL_3.0.py uses, so the GUI drives either one the same way.
+The on-demand loop profiler only covers an in-process engine.
+"""
+
+import logging
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+
+from .engine import THREAD_TIMEOUT_SECONDS, SheetsEngine
+from .metrics import StageMetrics
+from .run_config import merge_live_changes
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 1.0 # How often the child reports that it is alive
+MONITOR_SECONDS = 0.5 # How often the parent checks the child
+DEFAULT_HANG_SECONDS = 30.0 # Silence, or one iteration running, longer than this counts as hung
+RESTART_BACKOFF_SECONDS = (1.0, 2.0, 5.0, 10.0, 30.0) # Delay before the 1st, 2nd, ... restart in a row
+STABLE_RUN_SECONDS = 60.0 # A child that ran this long resets the back-off
+PACKAGE_PARENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _ignore(*args):
+    pass
+
+
+class _Channel:
+    """Pickles messages onto a binary stream; safe to use from several threads."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        with self._lock:
+            pickle.dump(message, self.stream, protocol=pickle.HIGHEST_PROTOCOL)
+            self.stream.flush()
+
+
+# --- Child side ---
+class _PipeLogHandler(logging.Handler):
+    """Sends every log record of the child to the parent, which logs it through its own handlers."""
+
+    def __init__(self, channel):
+        super().__init__()
+        self.channel = channel
+
+    def emit(self, record):
+        try:
+            data = {'name': record.name, 'levelno': record.levelno, 'levelname': record.levelname,
+                    'msg': record.getMessage(), 'args': None, 'created': record.created, 'msecs': record.msecs,
+                    'threadName': f"{record.threadName}@job", 'exc_text': None}
+            if record.exc_info:
+                data['exc_text'] = logging.Formatter().formatException(record.exc_info)
+            if getattr(record, 'color', None):
+                data['color'] = record.color
+            self.channel.send(('log', data))
+        except (OSError, ValueError):
+            pass # Parent gone; nothing left to report to
+        except Exception:
+            self.handleError(record)
+
+
+class _PipeStageMetrics(StageMetrics):
+    """Forwards every observation to the parent's StageMetrics."""
+
+    def __init__(self, channel):
+        super().__init__()
+        self.channel = channel
+
+    def observe(self, stage, seconds, api_key=None):
+        try:
+            self.channel.send(('observe', stage, seconds, api_key))
+        except (OSError, ValueError):
+            pass
+
+
+def child_main():
+    """Entry point of the child process: runs one SheetsEngine until told to stop or the parent goes away."""
+    commands = sys.stdin.buffer
+    channel = _Channel(sys.stdout.buffer)
+    sys.stdout = sys.stderr # A stray print must not corrupt the message stream
+
+    root_logger = logging.getLogger()
+    root_logger.handlers[:] = [_PipeLogHandler(channel)]
+    try:
+        _, run_cfg, options = pickle.load(commands)
+    except (EOFError, pickle.UnpicklingError, ValueError):
+        return 2
+    root_logger.setLevel(options.get('log_level', logging.INFO))
+
+    def send(*message):
+        try:
+            channel.send(message)
+        except (OSError, ValueError):
+            pass
+
+    state_store = None
+    if options.get('state_file'):
+        from .state import StateStore
+        state_store = StateStore(options['state_file'])
+    engine = SheetsEngine(stage_metrics=_PipeStageMetrics(channel),
+                          on_status=lambda text, color: send('status', text, color),
+                          on_error=lambda text: send('error', text),
+                          on_clear_error=lambda: send('clear_error'),
+                          on_vmix_status=lambda status_code, message="": send('vmix', status_code, message),
+                          on_sound=lambda sound_file, volume: send('sound', sound_file, volume),
+                          state_store=state_store)
+
+    def apply_options(options):
+        """Applies the parent's tick_summary and log level (sent with 'start' and every 'reconfigure')."""
+        root_logger.setLevel(options.get('log_level', logging.INFO))
+        engine.tick_summary = options.get('tick_summary', False)
+
+    apply_options(options)
+    engine.start(run_cfg, options.get('initial_status', ("RUNNING", "red")))
+
+    def read_commands():
+        while True:
+            try:
+                command = pickle.load(commands)
+            except (EOFError, OSError, pickle.UnpicklingError, ValueError):
+                command = ('stop',) # The parent closed the pipe or died
+            if command[0] == 'notify':
+                engine.notify_change()
+            elif command[0] == 'reconfigure':
+                apply_options(command[2])
+                engine.reconfigure(command[1])
+            elif command[0] == 'stop':
+                engine.stop()
+                return
+    threading.Thread(target=read_commands, daemon=True, name="SupervisorCommands").start()
+
+    while engine.loop_thread.is_alive():
+        send('heartbeat', engine.busy_seconds())
+        engine.loop_thread.join(HEARTBEAT_SECONDS)
+    engine.close()
+    return 0
+
+
+# --- Parent side ---
+class EngineSupervisor:
+    """Runs a SheetsEngine in a child process, restarting the child when it crashes or hangs."""
+
+    def __init__(self, stage_metrics=None, on_status=None, on_error=None, on_clear_error=None, on_vmix_status=None,
+                 on_sound=None, on_stopped=None, state_file='', hang_seconds=DEFAULT_HANG_SECONDS):
+        """
+        Args:
+            stage_metrics (StageMetrics): Receives the child's stage timings (a private one if omitted).
+            on_status, on_error, on_clear_error, on_vmix_status, on_sound, on_stopped: As for SheetsEngine;
+                called on the supervisor's threads.
+            state_file (str): Engine state file for the child (empty = always start cold).
+            hang_seconds (float): Child silence, or one loop iteration, longer than this restarts the child.
+        """
+        self.stage_metrics = stage_metrics if stage_metrics is not None else StageMetrics()
+        self.on_status = on_status or _ignore
+        self.on_error = on_error or _ignore
+        self.on_clear_error = on_clear_error or _ignore
+        self.on_vmix_status = on_vmix_status or _ignore
+        self.on_sound = on_sound or _ignore
+        self.on_stopped = on_stopped or _ignore
+        self.state_file = state_file
+        self.hang_seconds = hang_seconds
+        self.tick_summary = False
+        self.run_cfg = None
+        self.status = None
+        self.is_running = False
+        self.restarts = 0 # Child restarts during this run
+        self.process = None
+        self.channel = None
+        self.last_message_time = 0.0
+        self.last_busy_seconds = 0.0
+        self.stop_event = threading.Event()
+        self.monitor_thread = None
+
+    def start(self, run_cfg, initial_status=("RUNNING", "red")):
+        """Starts a child running run_cfg and the thread that watches it."""
+        self.run_cfg = run_cfg
+        self.status = initial_status
+        self.is_running = True
+        self.restarts = 0
+        self.stop_event.clear()
+        self._spawn(initial_status)
+        self.monitor_thread = threading.Thread(target=self._monitor, daemon=True, name="JobSupervisor")
+        self.monitor_thread.start()
+
+    def stop(self):
+        """Asks the child to stop; returns without waiting (on_stopped follows once it has exited)."""
+        self.is_running = False
+        self.stop_event.set()
+        self._send(('stop',))
+
+    def join(self, timeout=None):
+        if self.monitor_thread and self.monitor_thread.is_alive():
+            self.monitor_thread.join(timeout)
+
+    def close(self):
+        pass # The child releases its engine's resources when it exits
+
+    def notify_change(self):
+        """Passes a change notification (see sheets_core.webhook) on to the child's engine."""
+        self._send(('notify',))
+
+    def reconfigure(self, run_cfg):
+        """
+        Passes run_cfg, tick_summary and the log level on to the child's engine (see SheetsEngine.reconfigure);
+        a restarted child starts with them too.
+
+        Returns:
+            list: Names of the changed fields that need a restart.
+        """
+        if self.run_cfg is None:
+            return []
+        self.run_cfg, _, restart = merge_live_changes(self.run_cfg, run_cfg)
+        self._send(('reconfigure', run_cfg, self._child_options()))
+        return restart
+
+    def _child_options(self):
+        """The logging options a child is started and reconfigured with."""
+        return {'tick_summary': self.tick_summary, 'log_level': logging.getLogger().getEffectiveLevel()}
+
+    def _send(self, message):
+        channel = self.channel
+        if channel is None:
+            return
+        try:
+            channel.send(message)
+        except (OSError, ValueError):
+            pass # Child already gone; the monitor deals with it
+
+    def _spawn(self, initial_status):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = PACKAGE_PARENT_DIR + (os.pathsep + env['PYTHONPATH'] if env.get('PYTHONPATH') else '')
+        process = subprocess.Popen([sys.executable, '-m', 'sheets_core.supervisor'], stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, env=env,
+                                   creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        self.process = process
+        self.channel = _Channel(process.stdin)
+        self.started_at = self.last_message_time = time.monotonic()
+        self.last_busy_seconds = 0.0
+        options = dict(self._child_options(), state_file=self.state_file, initial_status=initial_status)
+        self._send(('start', self.run_cfg, options))
+        threading.Thread(target=self._read_messages, args=(process,), daemon=True,
+                         name=f"JobReader-{process.pid}").start()
+        logger.info("[Supervisor] Started polling job in child process %s.", process.pid)
+
+    def _read_messages(self, process):
+        """Dispatches the child's messages until its stdout closes (runs on a reader thread per child)."""
+        while True:
+            try:
+                message = pickle.load(process.stdout)
+            except (EOFError, OSError, pickle.UnpicklingError, ValueError, AttributeError):
+                return
+            if process is not self.process:
+                continue # A replaced child still flushing its last words
+            self.last_message_time = time.monotonic()
+            kind = message[0]
+            if kind == 'heartbeat':
+                self.last_busy_seconds = message[1]
+            elif kind == 'log':
+                record = logging.makeLogRecord(message[1])
+                logging.getLogger(record.name).handle(record)
+            elif kind == 'observe':
+                self.stage_metrics.observe(*message[1:])
+            elif kind == 'status':
+                self.status = (message[1], message[2])
+                self.on_status(message[1], message[2])
+            elif kind == 'error':
+                self.on_error(message[1])
+            elif kind == 'clear_error':
+                self.on_clear_error()
+            elif kind == 'vmix':
+                self.on_vmix_status(message[1], message[2])
+            elif kind == 'sound':
+                self.on_sound(message[1], message[2])
+
+    def _problem(self):
+        """Returns why the child needs a restart, or None while it is healthy."""
+        code = self.process.poll()
+        if code is not None:
+            return f"exited with code {code}"
+        silent = time.monotonic() - self.last_message_time
+        if silent > self.hang_seconds:
+            return f"no heartbeat for {silent:.0f}s"
+        if self.last_busy_seconds > self.hang_seconds:
+            return f"one loop iteration running for {self.last_busy_seconds:.0f}s"
+        return None
+
+    def _kill(self, process):
+        if process.poll() is None:
+            process.kill()
+            try:
+                process.wait(timeout=THREAD_TIMEOUT_SECONDS)
+            except subprocess.TimeoutExpired:
+                logger.error("[Supervisor] Child process %s did not exit after kill.", process.pid)
+        for stream in (process.stdin, process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def _monitor(self):
+        failures_in_row = 0
+        while not self.stop_event.wait(MONITOR_SECONDS):
+            problem = self._problem()
+            if problem is None:
+                if failures_in_row and time.monotonic() - self.started_at > STABLE_RUN_SECONDS:
+                    failures_in_row = 0
+                continue
+            logger.error("[Supervisor] Polling job (process %s) %s; restarting it.", self.process.pid, problem)
+            self.on_error(f"Job restarted: {problem}")
+            self.on_status("ERROR: Job Restarted", "red")
+            self.status = ("ERROR: Job Restarted", "red")
+            self._kill(self.process)
+            delay = RESTART_BACKOFF_SECONDS[min(failures_in_row, len(RESTART_BACKOFF_SECONDS) - 1)]
+            failures_in_row += 1
+            if self.stop_event.wait(delay):
+                break
+            self.restarts += 1
+            self._spawn(("RUNNING", "red"))
+            self.status = ("RUNNING", "red")
+            self.on_status("RUNNING", "red")
+
+        # Stop requested: give the child the same grace the in-process loop gets, then kill it
+        process = self.process
+        try:
+            process.wait(timeout=THREAD_TIMEOUT_SECONDS + 1.0)
+        except subprocess.TimeoutExpired:
+            logger.warning("[Supervisor] Child process %s did not stop in time; killing it.", process.pid)
+        self._kill(process)
+        self.channel = None
+        logger.info("[Supervisor] Polling job stopped (%s restarts).", self.restarts)
+        self.on_stopped()
+
+
+if __name__ == '__main__':
+    sys.exit(child_main())
@@ -0,0 +1,77 @@
+"""
+Thread-safe channel for GUI updates posted by background threads.
+
+Tk widgets may only be touched from the thread running mainloop. The loop,
+worker, vMix and sound threads post (key, callback, args) to a UiUpdateChannel
+and the Tk thread drains it on a timer, running the callbacks. Posting under a
+key that is already pending replaces the pending call, so a burst of status
+changes between two frames costs a single widget update.
+
+EventLoopLagMonitor measures how late each of those timer callbacks ran, which
+is how long the Tk event loop was blocked.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LAG_WARNING_INTERVAL_SECONDS = 10.0 # At most one stall warning per interval
+
+
+class UiUpdateChannel:
+    """Latest-wins queue of GUI callbacks, keyed by what they update."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {} # key -> (callback, args), in first-posted order
+        self.posted = 0
+        self.merged = 0 # Posts that replaced a pending update with the same key
+
+    def post(self, key, callback, *args):
+        """Queues callback(*args) for the Tk thread, replacing any pending update with the same key."""
+        with self._lock:
+            if key in self._pending:
+                self.merged += 1
+            self._pending[key] = (callback, args)
+            self.posted += 1
+
+    def drain(self):
+        """Runs every pending update. Must be called from the Tk thread. Returns how many ran."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+        for key, (callback, args) in pending.items():
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error("UI update '%s' failed: %s", key, e, exc_info=True)
+        return len(pending)
+
+
+class EventLoopLagMonitor:
+    """Tracks how late a periodic Tk callback runs compared to its schedule."""
+
+    def __init__(self, interval_seconds, warn_seconds, stage_metrics=None, stage='ui_lag'):
+        self.interval_seconds = interval_seconds
+        self.warn_seconds = warn_seconds
+        self.stage_metrics = stage_metrics
+        self.stage = stage
+        self.max_lag = 0.0
+        self._expected = None
+        self._last_warning = 0.0
+
+    def beat(self):
+        """Call once per scheduled callback. Returns this beat's lag in seconds."""
+        now = time.monotonic()
+        lag = 0.0 if self._expected is None else max(0.0, now - self._expected)
+        self._expected = now + self.interval_seconds
+        self.max_lag = max(self.max_lag, lag)
+        if self.stage_metrics is not None:
+            self.stage_metrics.observe(self.stage, lag)
+        if lag >= self.warn_seconds and now - self._last_warning >= LAG_WARNING_INTERVAL_SECONDS:
+            self._last_warning = now
+            logger.warning("GUI event loop stalled: update ran %.0f ms late (worst so far %.0f ms).", lag * 1000, self.max_lag * 1000)
+        return lag
@@ -0,0 +1,105 @@
+"""
+Local webhook that lets the sheet announce its own edits.
+
+WebhookReceiver serves POST (or GET) /notify on a local port. Anything that
+knows the sheet changed can call it: an installable Apps Script "On edit"
+trigger going through a tunnel or relay, or a local relay process. Each call
+runs on_notify(), which SheetsEngine.notify_change uses to cut the current
+sleep short and fetch at once, after a short debounce. With a shared secret
+set, requests without it (token query parameter or X-Webhook-Token header)
+are refused with 403.
+"""
+
+import hmac
+import http.server
+import json
+import logging
+import threading
+import urllib.parse
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_PATH = '/notify'
+MAX_BODY_BYTES = 64 * 1024 # Bodies are ignored, but read so keep-alive connections stay usable
+
+
+class _WebhookRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if 0 < length <= MAX_BODY_BYTES:
+            self.rfile.read(length)
+        elif length:
+            self._reply(413, {'ok': False, 'error': "Body too large"})
+            self.close_connection = True
+            return
+        self._handle()
+
+    def do_GET(self):
+        self._handle()
+
+    def _handle(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        if parsed.path != NOTIFY_PATH:
+            self._reply(404, {'ok': False, 'error': f"Only {NOTIFY_PATH} is available"})
+            return
+        receiver = self.server.receiver
+        if receiver.token:
+            supplied = self.headers.get('X-Webhook-Token') or (urllib.parse.parse_qs(parsed.query).get('token') or [''])[0]
+            if not hmac.compare_digest(supplied.encode('utf-8'), receiver.token.encode('utf-8')):
+                logger.warning("[Webhook] Refused a notification from %s with a missing or wrong token.", self.address_string())
+                self._reply(403, {'ok': False, 'error': "Bad token"})
+                return
+        receiver.notify()
+        self._reply(200, {'ok': True})
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("[Webhook] %s - " + format, self.address_string(), *args)
+
+
+class WebhookReceiver:
+    """Opt-in local HTTP endpoint that calls on_notify() for every accepted change notification."""
+
+    def __init__(self, on_notify, port, host='127.0.0.1', token=''):
+        self.on_notify = on_notify
+        self.host = host
+        self.port = port
+        self.token = token
+        self.notifications = 0
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}{NOTIFY_PATH}"
+
+    def start(self):
+        """Binds the port and starts serving. Raises OSError if the port is unavailable."""
+        self._httpd = http.server.ThreadingHTTPServer((self.host, self.port), _WebhookRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.receiver = self
+        self.port = self._httpd.server_address[1] # Resolve port 0 to the bound port
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="WebhookReceiver")
+        self._thread.start()
+        logger.info("[Webhook] Listening for change notifications on %s", self.url)
+
+    def notify(self):
+        self.notifications += 1
+        self.on_notify()
+
+    def stop(self):
+        """Stops serving and releases the port."""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+            logger.info("[Webhook] Webhook receiver stopped after %s notifications.", self.notifications)
@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from sheets_core.multicast import MulticastReceiver, encode_body, fragment_datagrams
+from sheets_core.recording import KIND_DELTA, KIND_KEYFRAME, encode_delta
+
+GROUP = '239.255.42.99'
+STREAM = 7
+
+
+class Feed:
+    """Builds a publisher's datagrams for one stream, numbering them as MulticastPublisher does."""
+
+    def __init__(self, stream=STREAM):
+        self.stream = stream
+        self.sequence = 0
+
+    def keyframe(self, version, values):
+        return self._datagrams(version, KIND_KEYFRAME, values)
+
+    def delta(self, version, previous, values):
+        return self._datagrams(version, KIND_DELTA, encode_delta(previous, values))
+
+    def _datagrams(self, version, kind, body):
+        datagrams = fragment_datagrams(self.stream, self.sequence, version, kind, encode_body(body))
+        self.sequence += len(datagrams)
+        return datagrams
+
+
+@pytest.fixture
+def receiver():
+    """A receiver that is fed with handle() directly; its socket never receives anything."""
+    received = []
+    receiver = MulticastReceiver(GROUP, 0, '127.0.0.1', lambda values, version: received.append((version, values)))
+    receiver.received = received
+    yield receiver
+    receiver.close()
+
+
+def table(marker, rows=3):
+    return [['Name', 'Score']] + [[f"row{row}", marker] for row in range(rows)]
+
+
+def feed(receiver, datagrams):
+    for datagram in datagrams:
+        receiver.handle(datagram)
+
+
+def test_fragments_are_reassembled_in_any_order(receiver):
+    rng = random.Random(1)
+    values = [['Name', 'Text']] + [[str(row), ''.join(rng.choice('abcdefgh') for _ in range(40))] for row in range(400)]
+    datagrams = Feed().keyframe(1, values)
+    assert len(datagrams) >= 3
+    shuffled = datagrams[1:] + datagrams[:1]
+    feed(receiver, shuffled[:-1])
+    assert receiver.received == []
+    feed(receiver, shuffled[-1:])
+    assert receiver.received == [(1, values)]
+    assert receiver.partial == {}
+
+
+def test_dropped_delta_keeps_the_table_until_the_next_keyframe(receiver):
+    source = Feed()
+    v1, v2, v3 = table('1'), table('2'), table('3')
+    feed(receiver, source.keyframe(1, v1))
+    source.delta(2, v1, v2) # Lost on the way
+    feed(receiver, source.delta(3, v2, v3))
+    assert receiver.missed_versions == 1
+    assert receiver.lost_datagrams == 1
+    assert receiver.values == v1
+    assert receiver.version == 1
+    feed(receiver, source.keyframe(3, v3)) # The publisher repeats the table while idle
+    assert receiver.values == v3
+    assert [version for version, _ in receiver.received] == [1, 3]
+
+
+def test_publisher_restart_starts_over_from_its_first_keyframe(receiver):
+    old, new = Feed(stream=1), Feed(stream=2)
+    feed(receiver, old.keyframe(5, table('old')))
+    feed(receiver, new.delta(2, table('new'), table('new2'))) # Joined mid-stream: nothing to apply it to
+    assert receiver.stream == 2
+    assert receiver.values is None # The old stream's table is not a base for the new one's deltas
+    assert receiver.missed_versions == 1
+    assert len(receiver.received) == 1
+    feed(receiver, new.keyframe(1, table('new'))) # Lower version, but a new stream
+    assert receiver.values == table('new')
+    feed(receiver, new.delta(2, table('new'), table('new2')))
+    assert receiver.values == table('new2')
+    assert [version for version, _ in receiver.received] == [5, 1, 2]
+
+
+def test_repeated_keyframes_are_ignored(receiver):
+    source = Feed()
+    values = table('1')
+    for _ in range(3):
+        feed(receiver, source.keyframe(1, values))
+    assert receiver.received == [(1, values)]
+    assert receiver.tables == 1
+    assert receiver.lost_datagrams == 0
@@ -0,0 +1,33 @@
+import logging
+
+from sheets_core.engine import SheetsEngine
+from sheets_core.projection import ColumnProjection
+from sheets_core.run_config import RunConfig
+from sheets_core.snapshot import build_snapshot
+
+VMIX_HEADER = 'vMixCommand'
+
+
+def projected_engine(columns):
+    engine = SheetsEngine()
+    engine.projection = ColumnProjection(columns)
+    run_cfg = RunConfig('sheet', 'Tab', ('key',), 1.0, 'out', False, False, '', 0, True, VMIX_HEADER, columns=columns)
+    return engine, run_cfg
+
+
+def test_vmix_header_in_the_first_data_row_of_the_projection_is_accepted(caplog):
+    # The sheet calls the column 'Cue'; the vMix thread finds it by the cell below, the first row of the CSV
+    engine, run_cfg = projected_engine(('Name', 'Cue'))
+    snapshot = build_snapshot([['Name', 'Cue'], ['Title', VMIX_HEADER], ['Alice', '1,Function=Cut']])
+    with caplog.at_level(logging.WARNING):
+        engine._check_projected_vmix_header(snapshot, run_cfg)
+    assert 'vMix API header' not in caplog.text
+
+
+def test_projection_without_the_vmix_header_column_warns_once(caplog):
+    engine, run_cfg = projected_engine(('Name', 'Score'))
+    snapshot = build_snapshot([['Name', 'Score'], ['Title', 'Points'], ['Alice', '1']])
+    with caplog.at_level(logging.WARNING):
+        engine._check_projected_vmix_header(snapshot, run_cfg)
+        engine._check_projected_vmix_header(snapshot, run_cfg)
+    assert caplog.text.count(f"vMix API header '{VMIX_HEADER}'") == 1
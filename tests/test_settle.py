@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from benchmarks.mock_sheets_server import MockSheetsServer
+from sheets_core.engine import THREAD_TIMEOUT_SECONDS, SheetsEngine
+from sheets_core.run_config import RunConfig
+from sheets_core.settle import changed_columns
+from sheets_core.snapshot import build_snapshot
+
+API_KEY = 'key-one'
+TAB = 'Show'
+VMIX_HEADER = 'vMixCommand'
+SETTLE_SECONDS = 30.0 # Far longer than the tests run: only a bypass column can get a change written
+
+
+def show_table(score='1', command='1,Function=Cut'):
+    # Sheet row 1 holds the sheet's own headers; the vMix header is in row 2, the first row of the CSV
+    return [['Name', 'Score', 'Cue'], ['Title', 'Points', VMIX_HEADER], ['Alice', score, command]]
+
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def transposed_show_table(score='1', command='1,Function=Cut'):
+    # Transposed, the CSV's first row is the sheet's column A below its header
+    return [['Field', 'Value'], ['Score', score], [VMIX_HEADER, command]]
+
+
+@pytest.mark.parametrize('transpose, table', [(False, show_table), (True, transposed_show_table)])
+def test_bypass_name_is_found_like_the_vmix_header(transpose, table):
+    previous = build_snapshot(table())
+    assert changed_columns(build_snapshot(table(command='2,Function=Cut')), previous, (VMIX_HEADER,), transpose) == [VMIX_HEADER]
+    assert changed_columns(build_snapshot(table(score='2')), previous, (VMIX_HEADER,), transpose) == []
+
+
+def test_bypass_name_from_the_sheet_header_row_still_matches():
+    previous = build_snapshot(show_table())
+    assert changed_columns(build_snapshot(show_table(command='2,Function=Cut')), previous, ('Cue',)) == ['Cue']
+    assert changed_columns(build_snapshot(show_table(score='2')), previous, ('Cue',)) == []
+
+
+@pytest.fixture
+def settling_engine(tmp_path):
+    """A running engine with a long settle window and the vMix header as bypass column, and its mock server."""
+    server = MockSheetsServer({TAB: show_table()}).start()
+    engine = SheetsEngine()
+    csv_path = tmp_path / 'out.csv'
+    engine.start(RunConfig(spreadsheet_id=server.spreadsheet_id, worksheet_name=TAB, api_keys=(API_KEY,),
+                           loop_interval=0.05, csv_filename=str(tmp_path / 'out'), transpose=False,
+                           play_sound=False, sound_file='', sound_volume=0, vmix_api_enabled=False,
+                           vmix_api_header=VMIX_HEADER, sheets_api_base_url=server.base_url,
+                           settle_seconds=SETTLE_SECONDS, settle_poll_interval=0.05,
+                           settle_bypass_columns=(VMIX_HEADER,)))
+    assert wait_for(lambda: csv_path.exists() and engine.last_snapshot is not None, 10.0)
+    yield engine, server, csv_path
+    engine.stop()
+    engine.join(THREAD_TIMEOUT_SECONDS)
+    engine.close()
+    server.stop()
+
+
+def set_cell(server, row, column, value):
+    with server.spreadsheet.lock:
+        server.spreadsheet.tabs[TAB][row][column] = value
+
+
+def test_bypass_change_writes_the_held_change_at_once(settling_engine):
+    engine, server, csv_path = settling_engine
+    written = csv_path.read_text()
+    set_cell(server, 2, 1, '2') # Score: held by the settle window
+    assert wait_for(lambda: engine.settle.holding, 5.0)
+    time.sleep(0.3)
+    assert csv_path.read_text() == written
+    set_cell(server, 2, 2, '2,Function=Cut') # Cue: written at once, together with the held score
+    assert wait_for(lambda: '2,Function=Cut' in csv_path.read_text(), 2.0)
+    assert 'Alice,2,' in csv_path.read_text()
+    assert not engine.settle.holding
@@ -0,0 +1,60 @@
+from benchmarks.mock_sheets_server import DEFAULT_SPREADSHEET_ID, GRID_COLUMNS, GRID_ROWS, MockSheetsServer
+from sheets_core.engine import SheetsEngine
+from sheets_core.http_fetch import PooledValuesFetcher
+from sheets_core.run_config import RunConfig
+from sheets_core.sheet_metadata import column_letters
+
+API_KEY = 'key-one'
+TAB = 'Scores'
+
+
+class CountingFetcher(PooledValuesFetcher):
+    """Counts spreadsheets.get requests and remembers the requested ranges."""
+
+    def __init__(self, base_url):
+        super().__init__(base_url)
+        self.metadata_calls = 0
+        self.ranges = []
+
+    def fetch_metadata(self, *args, **kwargs):
+        self.metadata_calls += 1
+        return super().fetch_metadata(*args, **kwargs)
+
+    def fetch(self, spreadsheet_id, worksheet, *args, **kwargs):
+        self.ranges.append(worksheet)
+        return super().fetch(spreadsheet_id, worksheet, *args, **kwargs)
+
+
+def full_grid_engine(rows):
+    """An engine reading a tab whose data fills every column of the grid, and its mock server."""
+    header = [f"H{column}" for column in range(GRID_COLUMNS)]
+    table = [header] + [[f"r{row}c{column}" for column in range(GRID_COLUMNS)] for row in range(rows - 1)]
+    server = MockSheetsServer({TAB: table}).start()
+    fetcher = CountingFetcher(server.base_url)
+    engine = SheetsEngine(fetcher=fetcher)
+    engine.run_cfg = RunConfig(DEFAULT_SPREADSHEET_ID, TAB, (API_KEY,), 1.0, 'out', False, False, '', 0, False, '')
+    return server, fetcher, engine
+
+
+def test_full_grid_tab_fetches_metadata_once():
+    server, fetcher, engine = full_grid_engine(rows=5)
+    try:
+        for _ in range(15):
+            payload = engine.fetch_payload(API_KEY, DEFAULT_SPREADSHEET_ID, TAB)
+            assert len(payload['data'][0]) == GRID_COLUMNS
+        assert fetcher.metadata_calls == 1
+        assert fetcher.ranges[-1] == f"'{TAB}'!A1:{column_letters(GRID_COLUMNS)}"
+    finally:
+        server.stop()
+
+
+def test_rows_added_below_the_grid_are_read_without_a_metadata_refresh():
+    server, fetcher, engine = full_grid_engine(rows=GRID_ROWS)
+    try:
+        assert len(engine.fetch_payload(API_KEY, DEFAULT_SPREADSHEET_ID, TAB)['data']) == GRID_ROWS
+        with server.spreadsheet.lock:
+            server.spreadsheet.tabs[TAB].append(['new'] * GRID_COLUMNS)
+        assert len(engine.fetch_payload(API_KEY, DEFAULT_SPREADSHEET_ID, TAB)['data']) == GRID_ROWS + 1
+        assert fetcher.metadata_calls == 1
+    finally:
+        server.stop()
@@ -0,0 +1,77 @@
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from benchmarks.mock_sheets_server import MockSheetsServer
+from sheets_core.engine import THREAD_TIMEOUT_SECONDS, SheetsEngine
+from sheets_core.run_config import RunConfig
+from sheets_core.webhook import WebhookReceiver
+
+API_KEY = 'key-one'
+TAB = 'Scores'
+TOKEN = 'shared-secret'
+PUSH_INTERVAL = 30.0 # Long enough that only a notification can start another fetch during a test
+PUSH_DEBOUNCE = 0.2
+
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture
+def pushed_engine(tmp_path):
+    """A running engine polling every PUSH_INTERVAL, its WebhookReceiver (with TOKEN) and the mock server."""
+    server = MockSheetsServer({TAB: [['Name', 'Score'], ['a', '1']]}).start()
+    engine = SheetsEngine()
+    receiver = WebhookReceiver(engine.notify_change, 0, token=TOKEN)
+    receiver.start()
+    engine.start(RunConfig(spreadsheet_id=server.spreadsheet_id, worksheet_name=TAB, api_keys=(API_KEY,),
+                           loop_interval=PUSH_INTERVAL, csv_filename=str(tmp_path / 'out'), transpose=False,
+                           play_sound=False, sound_file='', sound_volume=0, vmix_api_enabled=False, vmix_api_header='',
+                           sheets_api_base_url=server.base_url, push_interval=PUSH_INTERVAL, push_debounce=PUSH_DEBOUNCE))
+    # Let the first tick finish, so the loop is asleep until the next notification
+    assert wait_for(lambda: (tmp_path / 'out.csv').exists() and engine.busy_since is None, 10.0)
+    yield engine, receiver, server
+    engine.stop()
+    receiver.stop()
+    engine.join(THREAD_TIMEOUT_SECONDS)
+    engine.close()
+    server.stop()
+
+
+def requests_made(server):
+    return server.key_stats[API_KEY]['requests']
+
+
+def post(url):
+    request = urllib.request.Request(url, data=b'{}', method='POST', headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=2.0) as response:
+        return response.status
+
+
+def test_notification_wakes_the_loop_within_the_debounce(pushed_engine):
+    engine, receiver, server = pushed_engine
+    before = requests_made(server)
+    sent = time.monotonic()
+    assert post(f"{receiver.url}?token={TOKEN}") == 200
+    assert wait_for(lambda: requests_made(server) > before, PUSH_DEBOUNCE + 1.0)
+    assert time.monotonic() - sent >= PUSH_DEBOUNCE
+    assert receiver.notifications == 1
+
+
+def test_wrong_token_is_refused_and_does_not_wake_the_loop(pushed_engine):
+    engine, receiver, server = pushed_engine
+    before = requests_made(server)
+    with pytest.raises(urllib.error.HTTPError) as refused:
+        post(f"{receiver.url}?token=wrong")
+    assert refused.value.code == 403
+    assert not wait_for(lambda: requests_made(server) > before, PUSH_DEBOUNCE + 0.5)
+    assert not engine.wake_event.is_set()
+    assert receiver.notifications == 0